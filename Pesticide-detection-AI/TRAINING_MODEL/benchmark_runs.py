@@ -0,0 +1,215 @@
+"""
+Speed vs accuracy comparison for trained runs (models/pest_Detect_small*).
+
+For each run directory:
+- loads weights/best.pt in a fresh subprocess (so load time and peak RSS are isolated)
+- measures per-image latency (p50/p95) and batch throughput on a fixed image set, CPU only
+- reads imgsz/epochs from args.yaml and the mAP columns from results.csv
+
+Usage (from TRAINING_MODEL/):
+    python benchmark_runs.py                                 # all models/pest_Detect_small*
+    python benchmark_runs.py models/pest_Detect_small4 --min-map50 0.5 --out bench.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import yaml
+
+DEFAULT_RUNS = "models/pest_Detect_small*"
+DEFAULT_IMAGES = "Data/valid/images"
+WEIGHTS = os.path.join("weights", "best.pt")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _bench_worker(weights, images, imgsz, batch, warmup, out_q):
+    """Runs inside a fresh process; reports timings through out_q."""
+    try:
+        import cv2
+        t0 = time.perf_counter()
+        from ultralytics import YOLO
+        model = YOLO(weights)
+        load_s = time.perf_counter() - t0
+
+        frames = [cv2.imread(p) for p in images]
+        frames = [f for f in frames if f is not None]
+        for f in frames[:warmup]:
+            model.predict(source=f, imgsz=imgsz, device="cpu", verbose=False)
+
+        latencies = []
+        for f in frames:
+            t = time.perf_counter()
+            model.predict(source=f, imgsz=imgsz, device="cpu", verbose=False)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        for i in range(0, len(frames), batch):
+            model.predict(source=frames[i:i + batch], imgsz=imgsz, device="cpu", verbose=False)
+        batch_s = time.perf_counter() - t
+
+        out_q.put({
+            "load_s": load_s,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "batch_img_per_s": len(frames) / batch_s if batch_s > 0 else None,
+            "peak_rss_mb": _peak_rss_mb(),
+            "images": len(frames),
+        })
+    except Exception as e:
+        out_q.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def read_args(run_dir):
+    path = os.path.join(run_dir, "args.yaml")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+def read_accuracy(run_dir):
+    """Final-epoch and best mAP from results.csv (empty dict if the run has none)."""
+    path = os.path.join(run_dir, "results.csv")
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        rows = [{k.strip(): v.strip() for k, v in row.items()} for row in csv.DictReader(f)]
+    if not rows:
+        return {}
+
+    def num(row, key):
+        try:
+            return float(row[key])
+        except (KeyError, ValueError):
+            return None
+
+    last = rows[-1]
+    best = max(rows, key=lambda r: num(r, "metrics/mAP50-95(B)") or 0.0)
+    return {
+        "epochs_done": int(float(last.get("epoch", len(rows)))),
+        "precision": num(last, "metrics/precision(B)"),
+        "recall": num(last, "metrics/recall(B)"),
+        "mAP50": num(last, "metrics/mAP50(B)"),
+        "mAP50-95": num(last, "metrics/mAP50-95(B)"),
+        "best_mAP50-95": num(best, "metrics/mAP50-95(B)"),
+        "best_epoch": int(float(best.get("epoch", 0))),
+    }
+
+
+def benchmark_run(run_dir, images, batch, warmup, timeout):
+    args = read_args(run_dir)
+    row = {"run": os.path.basename(os.path.normpath(run_dir)), "imgsz": args.get("imgsz", 640),
+           "epochs": args.get("epochs"), "base_model": args.get("model")}
+    row.update(read_accuracy(run_dir))
+
+    weights = os.path.join(run_dir, WEIGHTS)
+    if not os.path.exists(weights):
+        row["error"] = f"missing {WEIGHTS}"
+        return row
+
+    ctx = mp.get_context("spawn")
+    q = ctx.Queue()
+    proc = ctx.Process(target=_bench_worker, args=(weights, images, row["imgsz"], batch, warmup, q))
+    proc.start()
+    try:
+        row.update(q.get(timeout=timeout))
+    except Exception:
+        row["error"] = "benchmark timed out"
+    proc.join(5)
+    if proc.is_alive():
+        proc.terminate()
+    return row
+
+
+COLUMNS = ["run", "imgsz", "epochs_done", "mAP50", "mAP50-95", "best_mAP50-95",
+           "load_s", "p50_ms", "p95_ms", "batch_img_per_s", "peak_rss_mb", "error"]
+
+
+def print_table(rows):
+    def fmt(v):
+        if v is None:
+            return "-"
+        return f"{v:.3f}" if isinstance(v, float) else str(v)
+    widths = {c: max(len(c), *(len(fmt(r.get(c))) for r in rows)) for c in COLUMNS}
+    print("  ".join(c.ljust(widths[c]) for c in COLUMNS))
+    for r in rows:
+        print("  ".join(fmt(r.get(c)).ljust(widths[c]) for c in COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speed vs accuracy of training runs")
+    parser.add_argument("runs", nargs="*", help=f"run directories (default: {DEFAULT_RUNS})")
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="fixed image set used for timing")
+    parser.add_argument("--limit", type=int, default=50, help="max images to time")
+    parser.add_argument("--batch", type=int, default=8, help="batch size for the throughput pass")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--min-map50", type=float, default=None,
+                        help="report the fastest run whose mAP50 meets this threshold")
+    parser.add_argument("--out", help="write the table to .csv or .json")
+    args = parser.parse_args()
+
+    runs = args.runs or sorted(glob.glob(DEFAULT_RUNS))
+    images = sorted(p for p in glob.glob(os.path.join(args.images, "*")) if p.lower().endswith(IMAGE_EXTS))
+    images = images[:args.limit]
+    if not images:
+        print(f"Error: no images found in {args.images}")
+        sys.exit(1)
+    print(f"Benchmarking {len(runs)} run(s) on {len(images)} images (CPU)")
+
+    rows = []
+    for run_dir in runs:
+        print(f"  - {run_dir}")
+        rows.append(benchmark_run(run_dir, images, args.batch, args.warmup, args.timeout))
+    print()
+    print_table(rows)
+
+    if args.min_map50 is not None:
+        ok = [r for r in rows if r.get("mAP50") is not None and r["mAP50"] >= args.min_map50 and r.get("p50_ms")]
+        if ok:
+            best = min(ok, key=lambda r: r["p50_ms"])
+            print(f"\nFastest run with mAP50 >= {args.min_map50}: {best['run']} ({best['p50_ms']:.1f} ms p50)")
+        else:
+            print(f"\nNo run reaches mAP50 >= {args.min_map50}")
+
+    if args.out:
+        if args.out.endswith(".json"):
+            with open(args.out, "w") as f:
+                json.dump(rows, f, indent=2)
+        else:
+            with open(args.out, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+        print(f"Saved comparison to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Dataset preparation stage for CPU training (run from TRAINING_MODEL/).
+
+1. Validates every YOLO label file (field count, class id range, normalised coords)
+2. Rebuilds each split's labels.cache incrementally: only images / labels whose
+   size or mtime changed since the last run are re-verified
+3. Optionally (--imgsz) writes a pre-resized copy of the dataset to Data_<imgsz>/
+   so training decodes small JPEGs instead of full-size ones
+4. Optionally (--augment N) adds N fixed offline augmentations per training
+   image (flip / HSV / brightness-contrast / blur), generated in parallel
+
+Examples:
+    python prepare_data.py                         # validate + refresh Data/*/labels.cache
+    python prepare_data.py --imgsz 416 --augment 2 # build Data_416/ for train.py
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+DATA_DIR = "Data"
+SPLITS = ("train", "valid")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+MANIFEST_NAME = "labels.manifest.json"
+JPEG_QUALITY = 90
+
+
+# -------------------------
+# Label validation
+# -------------------------
+def validate_label_file(path: str, nc: int):
+    """Return a list of problems found in one YOLO label file (empty list = OK)."""
+    problems = []
+    seen = set()
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 5:
+                problems.append(f"line {n}: expected 5 fields, got {len(parts)}")
+                continue
+            try:
+                cls = int(parts[0])
+                cx, cy, w, h = map(float, parts[1:])
+            except ValueError:
+                problems.append(f"line {n}: non-numeric value")
+                continue
+            if not 0 <= cls < nc:
+                problems.append(f"line {n}: class {cls} outside 0..{nc - 1}")
+            if not all(0.0 <= v <= 1.0 for v in (cx, cy, w, h)):
+                problems.append(f"line {n}: coordinates not normalised to 0..1")
+            if w <= 0 or h <= 0:
+                problems.append(f"line {n}: zero-size box")
+            if line in seen:
+                problems.append(f"line {n}: duplicate box")
+            seen.add(line)
+    return problems
+
+
+def list_images(images_dir: str):
+    files = glob.glob(os.path.join(images_dir, "**", "*.*"), recursive=True)
+    return sorted(os.path.abspath(p) for p in files if p.lower().endswith(IMAGE_EXTS))
+
+
+def label_path_for(im_file: str) -> str:
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    return sb.join(im_file.rsplit(sa, 1)).rsplit(".", 1)[0] + ".txt"
+
+
+def _file_sig(path: str):
+    try:
+        st = os.stat(path)
+        return [st.st_size, int(st.st_mtime_ns)]
+    except OSError:
+        return None
+
+
+# -------------------------
+# Incremental labels.cache rebuild
+# -------------------------
+def rebuild_label_cache(images_dir: str, names, workers: int):
+    """
+    Write <split>/labels.cache in the ultralytics format, re-verifying only changed files.
+    A side manifest records the (size, mtime) signature each cached entry was built from.
+    """
+    from multiprocessing.pool import ThreadPool
+    from ultralytics.data.dataset import DATASET_CACHE_VERSION
+    from ultralytics.data.utils import (get_hash, load_dataset_cache_file, save_dataset_cache_file,
+                                        verify_image_label)
+
+    images_dir = os.path.abspath(images_dir)
+    im_files = list_images(images_dir)
+    label_files = [label_path_for(p) for p in im_files]
+    labels_dir = Path(label_path_for(os.path.join(images_dir, "x.jpg"))).parent
+    cache_path = labels_dir.with_suffix(".cache")
+    manifest_path = labels_dir.parent / MANIFEST_NAME
+
+    old_entries, old_sigs = {}, {}
+    try:
+        old = load_dataset_cache_file(cache_path)
+        if old.get("version") == DATASET_CACHE_VERSION:
+            old_entries = {e["im_file"]: e for e in old["labels"]}
+        with open(manifest_path) as f:
+            old_sigs = json.load(f)
+    except Exception:
+        pass
+
+    sigs, todo, entries = {}, [], {}
+    for im, lb in zip(im_files, label_files):
+        sigs[im] = [_file_sig(im), _file_sig(lb)]
+        if im in old_entries and old_sigs.get(im) == sigs[im]:
+            entries[im] = old_entries[im]
+        else:
+            todo.append((im, lb))
+
+    msgs, nm, nf, ne, ncorrupt = [], 0, 0, 0, 0
+    if todo:
+        args = [(im, lb, "", False, len(names), 0, 0, False) for im, lb in todo]
+        with ThreadPool(workers) as pool:
+            for im_file, lb, shape, segments, keypoint, nm_f, nf_f, ne_f, nc_f, msg in pool.imap(verify_image_label, args):
+                nm += nm_f; nf += nf_f; ne += ne_f; ncorrupt += nc_f
+                if msg:
+                    msgs.append(msg)
+                if im_file:
+                    entries[im_file] = {
+                        "im_file": im_file, "shape": shape, "cls": lb[:, 0:1], "bboxes": lb[:, 1:],
+                        "segments": segments, "keypoints": keypoint, "normalized": True, "bbox_format": "xywh",
+                    }
+    # entries reused from the old cache count as found / empty
+    reverified = {im for im, _ in todo}
+    for im in im_files:
+        if im in entries and im not in reverified:
+            if len(entries[im]["cls"]):
+                nf += 1
+            else:
+                ne += 1
+
+    x = {
+        "labels": [entries[im] for im in im_files if im in entries],
+        "hash": get_hash(label_files + im_files),
+        "results": (nf, nm, ne, ncorrupt, len(im_files)),
+        "msgs": msgs,
+    }
+    save_dataset_cache_file("", cache_path, x, DATASET_CACHE_VERSION)
+    with open(manifest_path, "w") as f:
+        json.dump(sigs, f)
+    return {"images": len(im_files), "reverified": len(todo), "reused": len(im_files) - len(todo),
+            "corrupt": ncorrupt, "cache": str(cache_path)}
+
+
+# -------------------------
+# Pre-resize + offline augmentation
+# -------------------------
+def _augment(img: np.ndarray, labels: np.ndarray, rng: np.random.Generator):
+    """Label-preserving photometric + flip augmentation. labels: (n, 5) cls cx cy w h."""
+    out = img
+    labels = labels.copy()
+    if rng.random() < 0.5:
+        out = cv2.flip(out, 1)
+        if len(labels):
+            labels[:, 1] = 1.0 - labels[:, 1]
+    hsv = cv2.cvtColor(out, cv2.COLOR_BGR2HSV).astype(np.float32)
+    gains = rng.uniform([-0.015, 0.6, 0.6], [0.015, 1.4, 1.4])
+    hsv[..., 0] = (hsv[..., 0] + gains[0] * 180) % 180
+    hsv[..., 1] *= gains[1]
+    hsv[..., 2] *= gains[2]
+    out = cv2.cvtColor(np.clip(hsv, 0, 255).astype(np.uint8), cv2.COLOR_HSV2BGR)
+    alpha, beta = rng.uniform(0.8, 1.2), rng.uniform(-20, 20)
+    out = cv2.convertScaleAbs(out, alpha=alpha, beta=beta)
+    if rng.random() < 0.2:
+        out = cv2.GaussianBlur(out, (3, 3), 0)
+    return out, labels
+
+
+def _read_labels(path: str) -> np.ndarray:
+    if not os.path.exists(path):
+        return np.zeros((0, 5), dtype=np.float32)
+    data = np.loadtxt(path, ndmin=2, dtype=np.float32)
+    return data.reshape(-1, 5) if data.size else np.zeros((0, 5), dtype=np.float32)
+
+
+def _write_labels(path: str, labels: np.ndarray) -> None:
+    with open(path, "w") as f:
+        for row in labels:
+            f.write(f"{int(row[0])} {row[1]:.6f} {row[2]:.6f} {row[3]:.6f} {row[4]:.6f}\n")
+
+
+def _up_to_date(dst: str, *sources: str) -> bool:
+    if not os.path.exists(dst):
+        return False
+    dst_m = os.path.getmtime(dst)
+    return all(not os.path.exists(s) or os.path.getmtime(s) <= dst_m for s in sources)
+
+
+def _prepare_one(job):
+    """Worker: resize one image (+ write its augmentations). Returns number of files written."""
+    src_img, src_lbl, dst_img_dir, dst_lbl_dir, imgsz, n_aug = job
+    stem = os.path.splitext(os.path.basename(src_img))[0]
+    outputs = [(stem, None)] + [(f"{stem}_aug{k}", k) for k in range(n_aug)]
+    if all(_up_to_date(os.path.join(dst_img_dir, f"{name}.jpg"), src_img, src_lbl) for name, _ in outputs):
+        return 0
+
+    img = cv2.imread(src_img)
+    if img is None:
+        return 0
+    h, w = img.shape[:2]
+    scale = imgsz / max(h, w)
+    if scale < 1:
+        # aspect-preserving resize keeps normalised YOLO labels valid as-is
+        img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    labels = _read_labels(src_lbl)
+
+    written = 0
+    for name, k in outputs:
+        out_img, out_lbl = img, labels
+        if k is not None:
+            # seed from file name + index so the augmented set is reproducible
+            rng = np.random.default_rng(zlib.crc32(f"{stem}:{k}".encode()))
+            out_img, out_lbl = _augment(img, labels, rng)
+        cv2.imwrite(os.path.join(dst_img_dir, f"{name}.jpg"), out_img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        _write_labels(os.path.join(dst_lbl_dir, f"{name}.txt"), out_lbl)
+        written += 1
+    return written
+
+
+def build_resized_dataset(data_cfg, imgsz: int, n_aug: int, workers: int) -> str:
+    out_dir = os.path.abspath(f"{DATA_DIR}_{imgsz}")
+    jobs = []
+    for split in SPLITS:
+        src_images = os.path.join(DATA_DIR, split, "images")
+        dst_img_dir = os.path.join(out_dir, split, "images")
+        dst_lbl_dir = os.path.join(out_dir, split, "labels")
+        os.makedirs(dst_img_dir, exist_ok=True)
+        os.makedirs(dst_lbl_dir, exist_ok=True)
+        aug = n_aug if split == "train" else 0  # never augment the validation split
+        for im in list_images(src_images):
+            jobs.append((im, label_path_for(im), dst_img_dir, dst_lbl_dir, imgsz, aug))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(_prepare_one, jobs, chunksize=8))
+    print(f"Prepared {len(jobs)} source images into {out_dir} ({written} files written, "
+          f"{n_aug} augmentation(s) per train image)")
+
+    cfg = {"path": out_dir, "train": "train/images", "val": "valid/images",
+           "nc": data_cfg["nc"], "names": data_cfg["names"]}
+    with open(os.path.join(out_dir, "data.yaml"), "w") as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate labels, rebuild caches, pre-resize/augment dataset")
+    parser.add_argument("--imgsz", type=int, default=None, help="write a pre-resized copy to Data_<imgsz>/")
+    parser.add_argument("--augment", type=int, default=0, help="offline augmentations per train image")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="skip the labels.cache rebuild")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    with open(os.path.join(DATA_DIR, "data.yaml")) as f:
+        data_cfg = yaml.safe_load(f)
+    nc = int(data_cfg["nc"])
+
+    bad = 0
+    for split in SPLITS:
+        for im in list_images(os.path.join(DATA_DIR, split, "images")):
+            lbl = label_path_for(im)
+            if not os.path.exists(lbl):
+                continue  # background image
+            problems = validate_label_file(lbl, nc)
+            if problems:
+                bad += 1
+                print(f"  {os.path.relpath(lbl)}: " + "; ".join(problems))
+    print(f"Label validation: {bad} file(s) with problems")
+
+    dirs = [os.path.join(DATA_DIR, s, "images") for s in SPLITS]
+    if args.imgsz:
+        out_dir = build_resized_dataset(data_cfg, args.imgsz, args.augment, workers)
+        dirs += [os.path.join(out_dir, s, "images") for s in SPLITS]
+    elif args.augment:
+        print("Error: --augment needs --imgsz (augmented files are written to the prepared copy)")
+        sys.exit(1)
+
+    if not args.no_cache:
+        for images_dir in dirs:
+            stats = rebuild_label_cache(images_dir, data_cfg["names"], workers)
+            print(f"labels.cache {images_dir}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
+import os
 from ultralytics import YOLO
 
 model = YOLO("yolov8n.pt")
 
+# Use the pre-resized / augmented copy from prepare_data.py when it exists
+# (python prepare_data.py --imgsz 416 --augment 2), otherwise the raw dataset.
+DATA = "Data_416/data.yaml" if os.path.exists("Data_416/data.yaml") else "Data/data.yaml"
+
 model.train(
-        data="Data/data.yaml",
+        data=DATA,
         epochs=50,
         imgsz=416,
         batch=4,
         device='cpu',
+        workers=os.cpu_count() or 8,
         name="pest_Detect_small",
         project="models"
     )
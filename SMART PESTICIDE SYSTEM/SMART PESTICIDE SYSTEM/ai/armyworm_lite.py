@@ -0,0 +1,74 @@
+"""
+Armyworm RGB+thermal classifier on a TFLite interpreter instead of full TensorFlow.
+
+- same contract as the Keras model: predict(rgb, th) (or Keras-style
+  predict([rgb, th])) takes the float [0, 1] batches from preprocess_frame and
+  returns an (N, 1) array of "infested" probabilities
+- runs float, dynamic-range and full-INT8 models from ai.tflite_convert;
+  int8 / uint8 inputs are quantized and the output dequantized here
+- interpreter: tflite_runtime, then ai_edge_litert, then tf.lite as a last
+  resort (which imports all of TensorFlow again)
+"""
+
+import importlib
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_MODEL = "armyworm_rgb_thermal_int8.tflite"
+
+
+def _interpreter_class():
+    for name in ("tflite_runtime.interpreter", "ai_edge_litert.interpreter"):
+        try:
+            return importlib.import_module(name).Interpreter
+        except ImportError:
+            continue
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def _quantize(x: np.ndarray, detail: dict) -> np.ndarray:
+    dtype = detail["dtype"]
+    if dtype not in (np.int8, np.uint8):
+        return x.astype(dtype)
+    scale, zero_point = detail["quantization"]
+    info = np.iinfo(dtype)
+    return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(dtype)
+
+
+def _dequantize(y: np.ndarray, detail: dict) -> np.ndarray:
+    if detail["dtype"] not in (np.int8, np.uint8):
+        return y.astype(np.float32)
+    scale, zero_point = detail["quantization"]
+    return (y.astype(np.float32) - zero_point) * scale
+
+
+class LiteModel:
+    def __init__(self, model_path: str = DEFAULT_MODEL, num_threads: Optional[int] = None):
+        kwargs = {"model_path": model_path}
+        if num_threads is not None:
+            kwargs["num_threads"] = num_threads
+        self.interpreter = _interpreter_class()(**kwargs)
+        self.interpreter.allocate_tensors()
+        # the converter may reorder inputs; tell the branches apart by channel count
+        inputs = {int(d["shape"][-1]): d for d in self.interpreter.get_input_details()}
+        self._rgb, self._th = inputs[3], inputs[1]
+        self._out = self.interpreter.get_output_details()[0]
+
+    def predict(self, rgb, th=None) -> np.ndarray:
+        if th is None:
+            rgb, th = rgb
+        rgb = np.asarray(rgb, dtype=np.float32)
+        th = np.asarray(th, dtype=np.float32)
+        if rgb.ndim == 3:
+            rgb, th = rgb[None], th[None]
+        if th.ndim == 3:
+            th = th[..., None]
+        out = np.empty((len(rgb), 1), dtype=np.float32)
+        for i in range(len(rgb)):  # the converted graph has a fixed batch of 1
+            self.interpreter.set_tensor(self._rgb["index"], _quantize(rgb[i:i + 1], self._rgb))
+            self.interpreter.set_tensor(self._th["index"], _quantize(th[i:i + 1], self._th))
+            self.interpreter.invoke()
+            out[i, 0] = _dequantize(self.interpreter.get_tensor(self._out["index"]), self._out).reshape(-1)[0]
+        return out
@@ -0,0 +1,160 @@
+"""
+Bounded battery-voltage history with downsampling and a remaining-runtime estimate.
+
+- raw samples live in a fixed-size ring; 1-minute and 10-minute tiers keep
+  (start, mean, min, max, count) buckets in their own rings, each closed bucket
+  pushed once when its period ends, so memory is constant however long the robot runs
+- the runtime estimate is a time-decayed (exponentially weighted) least-squares
+  line through the samples. Its running sums are updated per sample, so
+  estimate() is O(1) and never scans the history
+- remaining runtime = time until the fitted line reaches the cut-off voltage,
+  starting from an EWMA of the voltage (smooths ADC noise and load sag)
+
+Run this file directly for an update / query cost benchmark.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+TIERS = (("1m", 60.0), ("10m", 600.0))
+
+
+class BatteryHistory:
+    def __init__(self, raw_size: int = 720, tier_sizes: Optional[Dict[str, int]] = None,
+                 tau_s: float = 900.0, ewma_alpha: float = 0.2):
+        tier_sizes = tier_sizes or {"1m": 1440, "10m": 1008}  # one day of minutes, one week of 10 minutes
+        self.raw = deque(maxlen=raw_size)  # (t, v)
+        self.tiers = {name: deque(maxlen=tier_sizes[name]) for name, _ in TIERS}
+        self._open: Dict[str, Optional[list]] = {name: None for name, _ in TIERS}  # [start, sum, min, max, n]
+        self.tau_s = tau_s
+        self.ewma_alpha = ewma_alpha
+        self.ewma: Optional[float] = None
+        self._lock = threading.Lock()
+        # time-decayed regression sums over (t - t0, v)
+        self._t0: Optional[float] = None
+        self._t_last: Optional[float] = None
+        self._sw = self._st = self._sv = self._stt = self._stv = 0.0
+        self.samples = 0
+
+    def add(self, v: float, t: Optional[float] = None) -> None:
+        t = time.time() if t is None else t
+        with self._lock:
+            self.raw.append((t, v))
+            self.samples += 1
+            for name, period in TIERS:
+                start = t - t % period
+                bucket = self._open[name]
+                if bucket is not None and bucket[0] != start:
+                    self._close(name)
+                    bucket = None
+                if bucket is None:
+                    self._open[name] = [start, v, v, v, 1]
+                else:
+                    bucket[1] += v
+                    bucket[2] = min(bucket[2], v)
+                    bucket[3] = max(bucket[3], v)
+                    bucket[4] += 1
+            self.ewma = v if self.ewma is None else self.ewma + self.ewma_alpha * (v - self.ewma)
+            if self._t0 is None:
+                self._t0 = t
+            else:
+                decay = math.exp(-max(t - self._t_last, 0.0) / self.tau_s)
+                self._sw *= decay
+                self._st *= decay
+                self._sv *= decay
+                self._stt *= decay
+                self._stv *= decay
+                if t - self._t0 > 50 * self.tau_s:
+                    self._rebase(self._t_last)
+            x = t - self._t0
+            self._sw += 1.0
+            self._st += x
+            self._sv += v
+            self._stt += x * x
+            self._stv += x * v
+            self._t_last = t
+
+    def _rebase(self, t0: float) -> None:
+        # shift the time origin so x stays small and sw*stt - st^2 doesn't lose precision
+        d = t0 - self._t0
+        self._stt += -2.0 * d * self._st + d * d * self._sw
+        self._stv -= d * self._sv
+        self._st -= d * self._sw
+        self._t0 = t0
+
+    def _close(self, name: str) -> None:
+        start, total, lo, hi, n = self._open[name]
+        self.tiers[name].append((start, total / n, lo, hi, n))
+        self._open[name] = None
+
+    def slope_v_per_s(self) -> Optional[float]:
+        with self._lock:
+            if self.samples < 3:
+                return None
+            var = self._sw * self._stt - self._st * self._st
+            if var <= 1e-9 * max(self._sw * self._stt, 1.0):
+                return None
+            return (self._sw * self._stv - self._st * self._sv) / var
+
+    def runtime_s(self, cutoff_v: float) -> Optional[float]:
+        """Seconds until the voltage trend reaches cutoff_v; None while the trend is flat or rising."""
+        slope = self.slope_v_per_s()
+        if slope is None or slope >= 0 or self.ewma is None:
+            return None
+        return max(0.0, (self.ewma - cutoff_v) / -slope)
+
+    def estimate(self, low_v: float, critical_v: float) -> Dict[str, Optional[float]]:
+        slope = self.slope_v_per_s()
+        return {
+            "voltage_ewma": None if self.ewma is None else round(self.ewma, 3),
+            "slope_v_per_h": None if slope is None else round(slope * 3600, 4),
+            "runtime_to_low_s": _round(self.runtime_s(low_v)),
+            "runtime_to_critical_s": _round(self.runtime_s(critical_v)),
+            "samples": self.samples,
+        }
+
+    def series(self, resolution: str = "raw", since: Optional[float] = None) -> List[dict]:
+        """Samples ("raw") or closed + currently open buckets ("1m" / "10m"), oldest first."""
+        with self._lock:
+            if resolution == "raw":
+                rows = [{"t": t, "v": v} for t, v in self.raw]
+            elif resolution in self.tiers:
+                buckets = list(self.tiers[resolution])
+                if self._open[resolution] is not None:
+                    start, total, lo, hi, n = self._open[resolution]
+                    buckets.append((start, total / n, lo, hi, n))
+                rows = [{"t": s, "mean": round(m, 4), "min": lo, "max": hi, "n": n} for s, m, lo, hi, n in buckets]
+            else:
+                raise KeyError(resolution)
+        if since is not None:
+            rows = [r for r in rows if r["t"] >= since]
+        return rows
+
+
+def _round(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v, 1)
+
+
+if __name__ == "__main__":
+    # 3 h of a 12.6 V -> 10.5 V, 4 h discharge sampled every 2 s, with ADC noise
+    hist = BatteryHistory()
+    t0 = 1_700_000_000.0
+    n = 5400
+    start = time.perf_counter()
+    for i in range(n):
+        t = t0 + 2.0 * i
+        hist.add(12.6 - 2.1 * (2.0 * i) / (4 * 3600) + random.gauss(0, 0.03), t)
+    add_us = (time.perf_counter() - start) / n * 1e6
+    start = time.perf_counter()
+    for _ in range(10000):
+        est = hist.estimate(11.0, 10.5)
+    est_us = (time.perf_counter() - start) / 10000 * 1e6
+    true_left = 4 * 3600 - 2.0 * (n - 1)
+    print(f"add: {add_us:.2f} us/sample, estimate: {est_us:.2f} us/query")
+    print(f"runtime to critical: estimated {est['runtime_to_critical_s'] / 60:.1f} min, actual {true_left / 60:.1f} min")
+    print(f"slope {est['slope_v_per_h']} V/h (actual {-2.1 / 4:.4f}); retained raw={len(hist.raw)}, "
+          f"1m={len(hist.tiers['1m'])}, 10m={len(hist.tiers['10m'])}")
@@ -0,0 +1,201 @@
+"""
+Camera -> arm-plane calibration for turning YOLO boxes into Arm.move_to(x, y) targets.
+
+- Lens model: chessboard intrinsics + distortion (cv2.calibrateCamera)
+- Plane model: homography from undistorted pixels to arm-plane millimetres,
+  fitted from measured point pairs (RANSAC)
+- Both are baked into one dense remap table (H x W x 2, float32) plus a
+  reachability mask for the 2-link arm workspace, so a whole frame of box
+  centres converts with a single vectorised lookup
+
+CLI (run from the SMART PESTICIDE SYSTEM folder):
+    python -m ai.calibration fit --chessboard "calib/*.jpg" --points calib/points.json --out calibration.npz
+    python -m ai.calibration bench [--map calibration.npz] [--boxes 200]
+
+points.json is a list of {"pixel": [u, v], "arm": [x_mm, y_mm]} pairs (>= 4).
+"""
+
+import argparse
+import glob
+import json
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_FRAME_SIZE = (640, 480)  # (w, h), matches basic_main_program.py capture size
+
+
+def _arm_lengths() -> Tuple[float, float]:
+    """Link lengths (mm) from Config in hardware.py, imported only when a map is built without them."""
+    try:
+        from .hardware import Config
+    except ImportError:
+        from hardware import Config
+    return Config.L1, Config.L2
+
+
+# -------------------------
+# Fitting
+# -------------------------
+def fit_intrinsics(image_paths, pattern: Tuple[int, int] = (9, 6), square_mm: float = 25.0):
+    """Camera matrix and distortion coefficients from chessboard images."""
+    objp = np.zeros((pattern[0] * pattern[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:pattern[0], 0:pattern[1]].T.reshape(-1, 2) * square_mm
+    obj_pts, img_pts, size = [], [], None
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    for path in image_paths:
+        grey = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if grey is None:
+            continue
+        size = grey.shape[::-1]
+        found, corners = cv2.findChessboardCorners(grey, pattern)
+        if not found:
+            continue
+        corners = cv2.cornerSubPix(grey, corners, (11, 11), (-1, -1), criteria)
+        obj_pts.append(objp)
+        img_pts.append(corners)
+    if len(obj_pts) < 3:
+        raise ValueError(f"need >= 3 chessboard views, found {len(obj_pts)}")
+    rms, camera_matrix, dist, _, _ = cv2.calibrateCamera(obj_pts, img_pts, size, None, None)
+    return camera_matrix, dist, rms
+
+
+def fit_homography(pixel_pts, arm_pts, camera_matrix: Optional[np.ndarray] = None,
+                   dist: Optional[np.ndarray] = None) -> np.ndarray:
+    """Homography from (undistorted) pixel coordinates to arm-plane millimetres."""
+    pixel_pts = np.asarray(pixel_pts, dtype=np.float64).reshape(-1, 1, 2)
+    arm_pts = np.asarray(arm_pts, dtype=np.float64).reshape(-1, 1, 2)
+    if len(pixel_pts) < 4:
+        raise ValueError("need >= 4 point pairs for a homography")
+    if camera_matrix is not None:
+        pixel_pts = cv2.undistortPoints(pixel_pts, camera_matrix, dist, P=camera_matrix)
+    H, _ = cv2.findHomography(pixel_pts, arm_pts, cv2.RANSAC, 3.0)
+    if H is None:
+        raise ValueError("homography fit failed (degenerate points?)")
+    return H
+
+
+# -------------------------
+# Dense lookup table
+# -------------------------
+class PixelToArmMap:
+    """Precomputed pixel -> arm-plane (mm) table with a reachability mask."""
+
+    def __init__(self, table: np.ndarray, reachable: np.ndarray, step: int = 1):
+        self.table = table            # (h / step, w / step, 2) float32, arm x/y in mm
+        self.reachable = reachable    # (h / step, w / step) bool
+        self.step = step
+        self.height = table.shape[0] * step
+        self.width = table.shape[1] * step
+
+    @classmethod
+    def build(cls, H: np.ndarray, frame_size=DEFAULT_FRAME_SIZE, camera_matrix: Optional[np.ndarray] = None,
+              dist: Optional[np.ndarray] = None, l1: Optional[float] = None, l2: Optional[float] = None,
+              step: int = 1) -> "PixelToArmMap":
+        """l1 / l2 default to the arm's Config.L1 / Config.L2."""
+        if l1 is None or l2 is None:
+            cfg_l1, cfg_l2 = _arm_lengths()
+            l1 = cfg_l1 if l1 is None else l1
+            l2 = cfg_l2 if l2 is None else l2
+        w, h = frame_size
+        us = np.arange(0, w, step, dtype=np.float32) + (step - 1) / 2
+        vs = np.arange(0, h, step, dtype=np.float32) + (step - 1) / 2
+        grid = np.stack(np.meshgrid(us, vs), axis=-1).reshape(-1, 1, 2)
+        if camera_matrix is not None:
+            grid = cv2.undistortPoints(grid, camera_matrix, dist, P=camera_matrix)
+        arm = cv2.perspectiveTransform(grid.astype(np.float64), H).reshape(len(vs), len(us), 2).astype(np.float32)
+        r = np.hypot(arm[..., 0], arm[..., 1])
+        reachable = (r <= l1 + l2) & (r >= abs(l1 - l2))
+        return cls(arm, reachable, step)
+
+    def map_points(self, uv: np.ndarray):
+        """(N, 2) pixel points -> ((N, 2) arm mm, (N,) reachable). Out-of-frame points are unreachable."""
+        uv = np.asarray(uv, dtype=np.float32).reshape(-1, 2)
+        col = (uv[:, 0] // self.step).astype(np.int64)
+        row = (uv[:, 1] // self.step).astype(np.int64)
+        inside = (col >= 0) & (row >= 0) & (col < self.table.shape[1]) & (row < self.table.shape[0])
+        np.clip(col, 0, self.table.shape[1] - 1, out=col)
+        np.clip(row, 0, self.table.shape[0] - 1, out=row)
+        return self.table[row, col], self.reachable[row, col] & inside
+
+    def map_boxes(self, xyxy: np.ndarray):
+        """Box centres of an (N, 4) xyxy array -> ((N, 2) arm mm, (N,) reachable)."""
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        centres = (xyxy[:, :2] + xyxy[:, 2:]) * 0.5
+        return self.map_points(centres)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, table=self.table, reachable=self.reachable, step=self.step)
+
+    @classmethod
+    def load(cls, path: str) -> "PixelToArmMap":
+        data = np.load(path)
+        return cls(data["table"], data["reachable"], int(data["step"]))
+
+
+# -------------------------
+# CLI
+# -------------------------
+def _synthetic_map() -> PixelToArmMap:
+    """Camera looking down at the arm plane: 640x480 px covering ~320x240 mm in front of the arm."""
+    px = [[0, 0], [640, 0], [640, 480], [0, 480]]
+    mm = [[-160, 240], [160, 240], [160, 0], [-160, 0]]
+    return PixelToArmMap.build(fit_homography(px, mm))
+
+
+def _cmd_fit(args) -> None:
+    K = dist = None
+    if args.chessboard:
+        K, dist, rms = fit_intrinsics(sorted(glob.glob(args.chessboard)), tuple(args.pattern), args.square_mm)
+        print(f"Intrinsics fitted (RMS reprojection error {rms:.3f} px)")
+    with open(args.points) as f:
+        pairs = json.load(f)
+    H = fit_homography([p["pixel"] for p in pairs], [p["arm"] for p in pairs], K, dist)
+    cmap = PixelToArmMap.build(H, tuple(args.frame_size), K, dist, args.l1, args.l2, args.step)
+    cmap.save(args.out)
+    print(f"Saved {cmap.table.shape[1]}x{cmap.table.shape[0]} map to {args.out} "
+          f"({cmap.reachable.mean() * 100:.1f}% of the frame reachable)")
+
+
+def _cmd_bench(args) -> None:
+    cmap = PixelToArmMap.load(args.map) if args.map else _synthetic_map()
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, [cmap.width - 20, cmap.height - 20], size=(args.boxes, 2))
+    boxes = np.hstack([xy, xy + 20]).astype(np.float32)
+    for _ in range(10):
+        cmap.map_boxes(boxes)
+    n = 2000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        cmap.map_boxes(boxes)
+    per_frame = (time.perf_counter() - t0) / n
+    print(f"map_boxes: {args.boxes} boxes/frame -> {per_frame * 1e6:.1f} us/frame "
+          f"({per_frame / args.boxes * 1e9:.0f} ns/box)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pixel -> arm calibration")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    fit = sub.add_parser("fit", help="fit and save a calibration map")
+    fit.add_argument("--chessboard", help="glob of chessboard images for lens undistortion (optional)")
+    fit.add_argument("--pattern", type=int, nargs=2, default=[9, 6], help="inner corners per row / column")
+    fit.add_argument("--square-mm", type=float, default=25.0)
+    fit.add_argument("--points", required=True, help="JSON list of {pixel: [u, v], arm: [x, y]} pairs")
+    fit.add_argument("--frame-size", type=int, nargs=2, default=list(DEFAULT_FRAME_SIZE))
+    fit.add_argument("--l1", type=float, help="upper arm link in mm (default: Config.L1)")
+    fit.add_argument("--l2", type=float, help="forearm link in mm (default: Config.L2)")
+    fit.add_argument("--step", type=int, default=1, help="table resolution in pixels")
+    fit.add_argument("--out", default="calibration.npz")
+    fit.set_defaults(func=_cmd_fit)
+    bench = sub.add_parser("bench", help="microbenchmark map_boxes")
+    bench.add_argument("--map", help="saved map (default: synthetic top-down map)")
+    bench.add_argument("--boxes", type=int, default=150)
+    bench.set_defaults(func=_cmd_bench)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+Row-coverage navigation: boustrophedon plan + encoder odometry + closed-loop wheel speed.
+
+- plan_boustrophedon() turns a field (rows along the start heading, next rows to
+  the left or right) into legs: row / turn / shift / turn / row ...
+- CoverageDriver.step() is called at a fixed rate with the encoder counts and
+  returns signed wheel duties. Each wheel has a PI speed loop with feed-forward;
+  on straights the wheel set-points are steered by heading and cross-track error
+  against the *planned* line, so motor mismatch and turn errors do not accumulate
+  from row to row
+- straights pause while the ultrasonic range is below the obstacle distance or
+  a detection stop (hold) is active; the integrators are reset so the restart is clean
+- a wheel commanded to move whose encoder stays still for stall_s aborts the run
+
+hardware.py runs the driver inside MotorController (POST /coverage). Run this
+file for a simulated benchmark against timed open-loop driving (FWD_T / LEFT /
+RIGHT at full duty, the way rows are driven today):
+    python -m ai.coverage --width 6 --length 20 --swath 0.5
+"""
+
+import argparse
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+# legs: ("row", metres), ("shift", metres), ("turn", radians, + = left)
+Leg = Tuple[str, float]
+
+
+def plan_boustrophedon(width_m: float, length_m: float, swath_m: float, first_turn: str = "right") -> List[Leg]:
+    if width_m <= 0 or length_m <= 0 or swath_m <= 0:
+        raise ValueError("width, length and swath must be positive")
+    if first_turn not in ("left", "right"):
+        raise ValueError("first_turn must be 'left' or 'right'")
+    rows = max(1, math.ceil(width_m / swath_m - 1e-9))
+    sign = 1.0 if first_turn == "left" else -1.0
+    legs: List[Leg] = []
+    for i in range(rows):
+        legs.append(("row", length_m))
+        if i == rows - 1:
+            break
+        legs += [("turn", sign * math.pi / 2), ("shift", swath_m), ("turn", sign * math.pi / 2)]
+        sign = -sign
+    return legs
+
+
+def _wrap(a: float) -> float:
+    return (a + math.pi) % (2 * math.pi) - math.pi
+
+
+def _clamp(v: float, lo: float, hi: float) -> float:
+    return lo if v < lo else hi if v > hi else v
+
+
+class Odometry:
+    """Differential-drive dead reckoning from encoder tick deltas."""
+    def __init__(self, ticks_per_m: float, track_m: float):
+        self.ticks_per_m = ticks_per_m
+        self.track_m = track_m
+        self.x = self.y = self.theta = 0.0
+        self.distance_m = 0.0
+
+    def update(self, d_ticks_l: int, d_ticks_r: int) -> Tuple[float, float]:
+        dl, dr = d_ticks_l / self.ticks_per_m, d_ticks_r / self.ticks_per_m
+        ds, dth = (dl + dr) / 2, (dr - dl) / self.track_m
+        self.x += ds * math.cos(self.theta + dth / 2)
+        self.y += ds * math.sin(self.theta + dth / 2)
+        self.theta = _wrap(self.theta + dth)
+        self.distance_m += (abs(dl) + abs(dr)) / 2
+        return dl, dr
+
+
+class PIController:
+    """PI with feed-forward and conditional-integration anti-windup; output clamped to [-1, 1]."""
+    def __init__(self, kp: float, ki: float, ff: float = 0.0):
+        self.kp, self.ki, self.ff = kp, ki, ff
+        self.integral = 0.0
+
+    def update(self, setpoint: float, measured: float, dt: float) -> float:
+        err = setpoint - measured
+        u = self.ff * setpoint + self.kp * err + self.ki * (self.integral + err * dt)
+        out = _clamp(u, -1.0, 1.0)
+        if out == u or (u > 1.0) != (err > 0):  # don't wind up further into saturation
+            self.integral += err * dt
+        return out
+
+    def reset(self) -> None:
+        self.integral = 0.0
+
+
+DEFAULTS = {
+    "speed_mps": 0.35, "turn_speed_mps": 0.15, "kp": 1.2, "ki": 6.0, "max_speed_mps": 0.5,
+    "heading_k": 2.5, "cross_track_k": 4.0, "max_omega": 1.0, "ramp_m": 0.3, "min_speed_mps": 0.06,
+    "turn_tolerance_rad": math.radians(1.5), "obstacle_m": 0.4, "stall_s": 2.0, "speed_filter": 0.5,
+}
+
+
+class CoverageDriver:
+    """
+    Fixed-rate closed loop over a leg plan. step() -> (duty_l, duty_r) in [-1, 1];
+    state is running / paused / done / stalled. Poses are in the odometry frame
+    (start pose = origin, x along the first row).
+    """
+    def __init__(self, legs: List[Leg], ticks_per_m: float, track_m: float, swath_m: float, **params):
+        unknown = set(params) - set(DEFAULTS)
+        if unknown:
+            raise TypeError(f"unknown coverage parameters: {sorted(unknown)}")
+        self.p = dict(DEFAULTS, **params)
+        self.legs = legs
+        self.swath_m = swath_m
+        self.odom = Odometry(ticks_per_m, track_m)
+        ff = 1.0 / self.p["max_speed_mps"]
+        self.pi_l = PIController(self.p["kp"], self.p["ki"], ff)
+        self.pi_r = PIController(self.p["kp"], self.p["ki"], ff)
+        self.refs = self._planned_poses(legs)
+        self.leg = 0
+        self.state = "running"
+        self.pause_reason: Optional[str] = None
+        self.paused_s = 0.0
+        self.elapsed_s = 0.0
+        self.area_m2 = 0.0
+        self._progress = 0.0  # along the current leg
+        self._last_ticks: Optional[Tuple[int, int]] = None
+        self._v = [0.0, 0.0]  # filtered wheel speeds
+        self._stalled_for = 0.0
+
+    @staticmethod
+    def _planned_poses(legs: List[Leg]) -> List[Tuple[float, float, float]]:
+        x = y = th = 0.0
+        poses = []
+        for kind, value in legs:
+            poses.append((x, y, th))
+            if kind == "turn":
+                th = _wrap(th + value)
+            else:
+                x += value * math.cos(th)
+                y += value * math.sin(th)
+        return poses
+
+    def step(self, ticks_l: int, ticks_r: int, dt: float, range_m: Optional[float] = None,
+             hold: bool = False) -> Tuple[float, float]:
+        if self._last_ticks is None:
+            self._last_ticks = (ticks_l, ticks_r)
+        dl, dr = self.odom.update(ticks_l - self._last_ticks[0], ticks_r - self._last_ticks[1])
+        self._last_ticks = (ticks_l, ticks_r)
+        a = self.p["speed_filter"]
+        self._v[0] += a * (dl / dt - self._v[0])
+        self._v[1] += a * (dr / dt - self._v[1])
+        if self.state in ("done", "stalled"):
+            return 0.0, 0.0
+        self.elapsed_s += dt
+
+        kind, value = self.legs[self.leg]
+        rx, ry, rth = self.refs[self.leg]
+        if kind == "turn":
+            sp_l, sp_r = self._turn_setpoints(rth + value)
+        else:
+            sp_l, sp_r = self._straight_setpoints(kind, value, rx, ry, rth)
+        if self.state == "done":
+            return 0.0, 0.0
+
+        reason = None
+        if hold:
+            reason = "detection stop"
+        elif kind != "turn" and range_m is not None and range_m < self.p["obstacle_m"]:
+            reason = "obstacle"
+        if reason is not None:
+            self.state, self.pause_reason = "paused", reason
+            self.paused_s += dt
+            self.pi_l.reset()
+            self.pi_r.reset()
+            self._stalled_for = 0.0
+            return 0.0, 0.0
+        self.state, self.pause_reason = "running", None
+
+        moving = max(abs(sp_l), abs(sp_r)) > 0.02
+        self._stalled_for = self._stalled_for + dt if moving and dl == 0 and dr == 0 else 0.0
+        if self._stalled_for >= self.p["stall_s"]:
+            self.state = "stalled"
+            return 0.0, 0.0
+        return self.pi_l.update(sp_l, self._v[0], dt), self.pi_r.update(sp_r, self._v[1], dt)
+
+    def _straight_setpoints(self, kind: str, length: float, rx: float, ry: float, rth: float) -> Tuple[float, float]:
+        o, p = self.odom, self.p
+        c, s = math.cos(rth), math.sin(rth)
+        progress = (o.x - rx) * c + (o.y - ry) * s
+        if kind == "row" and progress > self._progress:
+            self.area_m2 += (min(progress, length) - max(self._progress, 0.0)) * self.swath_m
+        self._progress = max(self._progress, progress)
+        remaining = length - progress
+        if remaining <= 0:
+            self._next_leg()
+            return 0.0, 0.0
+        v = _clamp(p["speed_mps"] * remaining / p["ramp_m"], p["min_speed_mps"], p["speed_mps"])
+        cross = -(o.x - rx) * s + (o.y - ry) * c
+        omega = _clamp(-p["heading_k"] * _wrap(o.theta - rth) - p["cross_track_k"] * cross,
+                       -p["max_omega"], p["max_omega"])
+        half = omega * o.track_m / 2
+        return v - half, v + half
+
+    def _turn_setpoints(self, target: float) -> Tuple[float, float]:
+        err = _wrap(target - self.odom.theta)
+        if abs(err) <= self.p["turn_tolerance_rad"]:
+            self._next_leg()
+            return 0.0, 0.0
+        w = _clamp(self.p["heading_k"] * abs(err) * self.odom.track_m / 2,
+                   self.p["min_speed_mps"], self.p["turn_speed_mps"])
+        return (-w, w) if err > 0 else (w, -w)
+
+    def _next_leg(self) -> None:
+        self.leg += 1
+        self._progress = 0.0
+        self.pi_l.reset()
+        self.pi_r.reset()
+        if self.leg >= len(self.legs):
+            self.leg = len(self.legs)
+            self.state = "done"
+
+    def stats(self) -> Dict[str, object]:
+        o = self.odom
+        return {
+            "state": self.state, "pause_reason": self.pause_reason,
+            "leg": min(self.leg + 1, len(self.legs)), "legs": len(self.legs),
+            "current": self.legs[self.leg][0] if self.leg < len(self.legs) else None,
+            "area_m2": round(self.area_m2, 2), "distance_m": round(o.distance_m, 2),
+            "elapsed_s": round(self.elapsed_s, 1), "paused_s": round(self.paused_s, 1),
+            "pose": {"x": round(o.x, 3), "y": round(o.y, 3), "theta_deg": round(math.degrees(o.theta), 1)},
+        }
+
+
+# -------------------------
+# Simulation
+# -------------------------
+class SimDiffDrive:
+    """
+    Differential-drive plant for the benchmark (and for hardware.py in GPIO-mock mode):
+    first-order wheel response to duty, unequal left / right motor gains, speed
+    sagging with battery charge, wheel noise, quantized encoders, battery drain
+    that grows with duty, and optional circular obstacles for the range sensor.
+    """
+    def __init__(self, ticks_per_m: float = 600.0, track_m: float = 0.35, max_speed_mps: float = 0.5,
+                 tau_s: float = 0.12, gains: Tuple[float, float] = (0.97, 1.0), battery_wh: float = 60.0,
+                 idle_w: float = 6.0, motor_w: float = 30.0, sag: float = 0.12, noise: float = 0.02, seed: int = 0):
+        self.ticks_per_m, self.track_m, self.max_speed = ticks_per_m, track_m, max_speed_mps
+        self.tau_s, self.gains = tau_s, gains
+        self.battery_wh, self.idle_w, self.motor_w, self.sag, self.noise = battery_wh, idle_w, motor_w, sag, noise
+        self.rng = random.Random(seed)
+        self.x = self.y = self.theta = 0.0
+        self.v = [0.0, 0.0]
+        self.duty = (0.0, 0.0)
+        self._ticks = [0.0, 0.0]
+        self.used_wh = 0.0
+        self.t = 0.0
+        # [x, y, radius, clears_after_s, first_seen]: gone clears_after_s after it is first in range
+        self.obstacles: List[list] = []
+
+    def set_duty(self, duty_l: float, duty_r: float) -> None:
+        self.duty = (_clamp(duty_l, -1.0, 1.0), _clamp(duty_r, -1.0, 1.0))
+
+    def step(self, dt: float) -> Tuple[float, float]:
+        """Advance dt; returns the true (left, right) wheel travel."""
+        charge = 1.0 - self.sag * self.used_wh / self.battery_wh
+        travel = []
+        for i in (0, 1):
+            target = self.duty[i] * self.gains[i] * self.max_speed * charge
+            self.v[i] += (target - self.v[i]) * min(dt / self.tau_s, 1.0)
+            d = self.v[i] * dt * (1.0 + self.rng.gauss(0, self.noise))
+            self._ticks[i] += d * self.ticks_per_m
+            travel.append(d)
+        dl, dr = travel
+        ds, dth = (dl + dr) / 2, (dr - dl) / self.track_m
+        self.x += ds * math.cos(self.theta + dth / 2)
+        self.y += ds * math.sin(self.theta + dth / 2)
+        self.theta = _wrap(self.theta + dth)
+        self.used_wh += (self.idle_w + self.motor_w * (abs(self.duty[0]) + abs(self.duty[1])) / 2) * dt / 3600
+        self.t += dt
+        return dl, dr
+
+    def ticks(self) -> Tuple[int, int]:
+        return int(self._ticks[0]), int(self._ticks[1])
+
+    def battery_pct_used(self) -> float:
+        return 100.0 * self.used_wh / self.battery_wh
+
+    def add_obstacle(self, x: float, y: float, radius: float, clears_after_s: float) -> None:
+        self.obstacles.append([x, y, radius, clears_after_s, None])
+
+    def range_m(self, beam_half_angle: float = math.radians(15), max_range_m: float = 4.0) -> float:
+        best = max_range_m
+        for ob in self.obstacles:
+            ox, oy, r, clears_after, seen = ob
+            if seen is not None and self.t - seen >= clears_after:
+                continue
+            dx, dy = ox - self.x, oy - self.y
+            if abs(_wrap(math.atan2(dy, dx) - self.theta)) <= beam_half_angle:
+                dist = max(math.hypot(dx, dy) - r, 0.0)
+                if seen is None and dist < 1.0:
+                    ob[4] = self.t
+                best = min(best, dist)
+        return best
+
+
+class CoverageGrid:
+    """Which cells of the field rectangle the spray swath has passed over, and in how many rows."""
+    def __init__(self, x0: float, y0: float, x1: float, y1: float, cell_m: float = 0.05):
+        self.x0, self.y0, self.cell = x0, y0, cell_m
+        self.nx, self.ny = int(math.ceil((x1 - x0) / cell_m)), int(math.ceil((y1 - y0) / cell_m))
+        self.passes = bytearray(self.nx * self.ny)
+        self._last_row = [-1] * (self.nx * self.ny)
+
+    def mark(self, x: float, y: float, theta: float, swath_m: float, row: int) -> None:
+        nx_, ny_ = -math.sin(theta), math.cos(theta)
+        n = int(swath_m / self.cell) + 1
+        for k in range(n):
+            off = -swath_m / 2 + swath_m * k / (n - 1)
+            i = int((x + nx_ * off - self.x0) / self.cell)
+            j = int((y + ny_ * off - self.y0) / self.cell)
+            if 0 <= i < self.nx and 0 <= j < self.ny:
+                idx = j * self.nx + i
+                if self._last_row[idx] != row and self.passes[idx] < 255:
+                    self._last_row[idx] = row
+                    self.passes[idx] += 1
+
+    def covered_m2(self) -> float:
+        return sum(1 for h in self.passes if h) * self.cell * self.cell
+
+    def overlap_m2(self) -> float:
+        """Area sprayed by more than one row."""
+        return sum(1 for h in self.passes if h > 1) * self.cell * self.cell
+
+    def field_m2(self) -> float:
+        return self.nx * self.ny * self.cell * self.cell
+
+
+def _field(width_m: float, length_m: float, swath_m: float, first_turn: str) -> Tuple[float, float, float, float]:
+    # the robot starts in the middle of the first swath; rows stack towards first_turn
+    if first_turn == "left":
+        return 0.0, -swath_m / 2, length_m, width_m - swath_m / 2
+    return 0.0, swath_m / 2 - width_m, length_m, swath_m / 2
+
+
+def _detection_points(legs: List[Leg], per_m: float, rng: random.Random) -> Dict[int, List[float]]:
+    """Distances along each row at which the camera stops the robot."""
+    points = {}
+    for i, (kind, length) in enumerate(legs):
+        if kind == "row":
+            n = sum(1 for _ in range(int(length * 10)) if rng.random() < per_m / 10)
+            points[i] = sorted(rng.uniform(0.2, length - 0.2) for _ in range(n))
+    return points
+
+
+def simulate_closed_loop(legs: List[Leg], field: Tuple[float, float, float, float], swath_m: float,
+                         stops: Dict[int, List[float]], stop_s: float, rate_hz: float = 20.0, substeps: int = 10,
+                         obstacles=(), seed: int = 0, max_s: float = 7200.0, **plant_kw) -> Dict[str, float]:
+    plant = SimDiffDrive(seed=seed, **plant_kw)
+    for ob in obstacles:
+        plant.add_obstacle(*ob)
+    drv = CoverageDriver(legs, plant.ticks_per_m, plant.track_m, swath_m, max_speed_mps=plant.max_speed)
+    grid = CoverageGrid(*field)
+    dt = 1.0 / rate_hz
+    hold_until, pending, row_travel, leg = 0.0, [], 0.0, -1
+    while drv.state not in ("done", "stalled") and plant.t < max_s:
+        if drv.leg != leg:
+            leg, row_travel = drv.leg, 0.0
+            pending = list(stops.get(leg, []))
+        hold = plant.t < hold_until
+        duty = drv.step(*plant.ticks(), dt, range_m=plant.range_m(), hold=hold)
+        plant.set_duty(*duty)
+        for _ in range(substeps):
+            dl, dr = plant.step(dt / substeps)
+            if leg < len(legs) and legs[leg][0] == "row":
+                row_travel += (dl + dr) / 2
+                grid.mark(plant.x, plant.y, plant.theta, swath_m, leg)
+        if pending and row_travel >= pending[0] and not hold:
+            pending.pop(0)
+            hold_until = plant.t + stop_s
+    return _result(plant, grid, drv.state, drv.paused_s)
+
+
+def simulate_open_loop(legs: List[Leg], field: Tuple[float, float, float, float], swath_m: float,
+                       stops: Dict[int, List[float]], stop_s: float, dt: float = 0.005, seed: int = 0,
+                       **plant_kw) -> Dict[str, float]:
+    """Timed full-duty driving: each leg runs for distance / nominal speed, pauses extend the timer."""
+    plant = SimDiffDrive(seed=seed, **plant_kw)
+    grid = CoverageGrid(*field)
+    nominal = plant.max_speed  # calibrated on a fresh battery with the motors at full duty
+    paused = 0.0
+    for i, (kind, value) in enumerate(legs):
+        if kind == "turn":
+            duration = abs(value) * plant.track_m / 2 / nominal
+            duty = (-1.0, 1.0) if value > 0 else (1.0, -1.0)
+        else:
+            duration = value / nominal
+            duty = (1.0, 1.0)
+        pending = list(stops.get(i, []))
+        driven, row_travel = 0.0, 0.0
+        while driven < duration:
+            plant.set_duty(*duty)
+            dl, dr = plant.step(dt)
+            driven += dt
+            if kind == "row":
+                row_travel += (dl + dr) / 2
+                grid.mark(plant.x, plant.y, plant.theta, swath_m, i)
+            if pending and row_travel >= pending[0]:
+                pending.pop(0)
+                plant.set_duty(0.0, 0.0)
+                for _ in range(int(stop_s / dt)):
+                    plant.step(dt)  # coasts to a stop; the timer does not run
+                paused += stop_s
+        plant.set_duty(0.0, 0.0)
+        for _ in range(int(0.2 / dt)):  # settle between legs, as the queued STOP does
+            plant.step(dt)
+    return _result(plant, grid, "done", paused)
+
+
+def _result(plant: SimDiffDrive, grid: CoverageGrid, state: str, paused_s: float) -> Dict[str, float]:
+    covered = grid.covered_m2()
+    pct = plant.battery_pct_used()
+    minutes = plant.t / 60
+    return {
+        "state": state,
+        "minutes": round(minutes, 2),
+        "paused_s": round(paused_s, 1),
+        "covered_m2": round(covered, 2),
+        "coverage_pct": round(100 * covered / grid.field_m2(), 1),
+        "m2_per_min": round(covered / minutes, 2),
+        "battery_pct": round(pct, 2),
+        "m2_per_battery_pct": round(covered / pct, 1),
+        "overlap_pct": round(100 * grid.overlap_m2() / covered, 1) if covered else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated row coverage: closed loop vs timed open loop")
+    parser.add_argument("--width", type=float, default=6.0, help="field width across rows (m)")
+    parser.add_argument("--length", type=float, default=20.0, help="row length (m)")
+    parser.add_argument("--swath", type=float, default=0.5, help="spray swath / row spacing (m)")
+    parser.add_argument("--first-turn", choices=["left", "right"], default="right")
+    parser.add_argument("--detections-per-m", type=float, default=0.15)
+    parser.add_argument("--stop-s", type=float, default=2.0, help="pause per detection stop")
+    parser.add_argument("--rate", type=float, default=20.0, help="closed-loop rate (Hz)")
+    parser.add_argument("--mismatch", type=float, default=0.03, help="left motor this much weaker than right")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    legs = plan_boustrophedon(args.width, args.length, args.swath, args.first_turn)
+    field = _field(args.width, args.length, args.swath, args.first_turn)
+    stops = _detection_points(legs, args.detections_per_m, random.Random(args.seed))
+    n_stops = sum(len(v) for v in stops.values())
+    print(f"Field {args.width} x {args.length} m, swath {args.swath} m: "
+          f"{sum(1 for k, _ in legs if k == 'row')} rows, {n_stops} detection stops of {args.stop_s} s")
+    # someone standing 5 m into the second row, stepping away 5 s after the robot gets close
+    rx, ry, rth = CoverageDriver._planned_poses(legs)[min(4, len(legs) - 1)]
+    person = (rx + 5.0 * math.cos(rth), ry + 5.0 * math.sin(rth), 0.2, 5.0)
+    plant = {"seed": args.seed, "gains": (1.0 - args.mismatch, 1.0)}
+    results = {
+        "open loop (timed FWD_T)": simulate_open_loop(legs, field, args.swath, stops, args.stop_s, **plant),
+        "closed loop": simulate_closed_loop(legs, field, args.swath, stops, args.stop_s, args.rate, **plant),
+        "closed loop + obstacle": simulate_closed_loop(legs, field, args.swath, stops, args.stop_s, args.rate,
+                                                       obstacles=[person], **plant),
+    }
+    cols = ["minutes", "coverage_pct", "overlap_pct", "m2_per_min", "battery_pct", "m2_per_battery_pct", "paused_s"]
+    print(f"{'mode':<26}" + "".join(f"{c:>19}" for c in cols))
+    for name, r in results.items():
+        print(f"{name:<26}" + "".join(f"{r[c]:>19}" for c in cols) + ("" if r["state"] == "done" else f"  ({r['state']})"))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,12 @@ Robust Robot Server for SMART PESTICIDE SYSTEM
 - Flask API for control and reporting
 - Simulation mode when RPi.GPIO is missing (so you can test on PC)
 - Improved error handling, logging, and graceful shutdown
+- Fast cold start: the Robot is built lazily / in the background, GET /ready
+  reports when subsystems are up, `--profile-startup` prints per-phase timings
+- Row coverage (POST /coverage): boustrophedon rows driven by a fixed-rate
+  closed loop on encoder odometry, pausing for obstacles and detection stops
+- Thread supervisor: per-thread heartbeats and wake-lag histograms, stalled /
+  dead workers flagged in the status file, live view at GET /threads
 """
 
 import os
@@ -16,8 +22,15 @@ import threading
 import sqlite3
 import logging
 import signal
+import socket
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Dict, Any, List, Callable
+
+_import_started = time.perf_counter()
+_import_phases: List[Tuple[str, float]] = []
 
 # Try to import RPi.GPIO; if not available, use a simple mock for desktop testing.
 try:
@@ -29,15 +42,26 @@ except Exception:
     GPIO = mock.MagicMock()
     HW_AVAILABLE = False
     print("⚠️ RPi.GPIO not available — running in SIMULATION mode (GPIO mocked).")
+_import_phases.append(("import gpio", time.perf_counter() - _import_started))
 
 # Networking + server
+_t = time.perf_counter()
 from flask import Flask, request, jsonify
+_import_phases.append(("import flask", time.perf_counter() - _t))
 
-# requests used optionally for battery webhook
+# Sibling helpers (works both as package module and as a script)
 try:
-    import requests
-except Exception:
-    requests = None
+    from .battery_history import BatteryHistory
+    from .coverage import CoverageDriver, SimDiffDrive, plan_boustrophedon
+    from .metrics import REGISTRY
+    from .spray_index import SprayIndex
+except ImportError:
+    from battery_history import BatteryHistory
+    from coverage import CoverageDriver, SimDiffDrive, plan_boustrophedon
+    from metrics import REGISTRY
+    from spray_index import SprayIndex
+
+# requests (battery webhook only) is imported on first use; it costs ~0.1-0.3 s on a Pi
 
 # -------------------------
 # Logging setup
@@ -77,6 +101,9 @@ class Config:
     PUMP_FLOW_ML_PER_S = 10.0
     DEFAULT_SPRAY_AREA_M2 = 0.5
     SPRAY_MAX_DURATION = 30.0
+    # Skip sprays within this radius (same units as spray x/y) of a spray made in the last TTL seconds
+    SPRAY_EXCLUSION_RADIUS = 30.0
+    SPRAY_HISTORY_TTL_S = 600
 
     # Ultrasonic
     US_TRIG, US_ECHO = 25, 8
@@ -86,6 +113,19 @@ class Config:
 
     # Arm geometry (mm)
     L1, L2 = 120.0, 120.0
+    # Pixel -> arm-plane map from `python -m ai.calibration fit`
+    CALIBRATION_PATH = os.path.join(os.getcwd(), "calibration.npz")
+
+    # Field heatmaps (GET /heatmap): extent x0, y0, x1, y1 and cell size in spray x/y units
+    HEATMAP_EXTENT = (0.0, 0.0, 5000.0, 5000.0)
+    HEATMAP_CELL = 50.0
+    HEATMAP_REFRESH_S = 5.0
+    HEATMAP_STATE_PATH = os.path.join(os.getcwd(), "heatmap_state.npz")
+
+    # Fleet sync (ai/log_sync.py pulls GET /sync/pesticide_log); must be unique per robot.
+    # Set PEST_ROBOT_ID to the name the fleet store uses for this robot (default: hostname)
+    ROBOT_ID = os.environ.get("PEST_ROBOT_ID") or socket.gethostname()
+    SYNC_MAX_BATCH_ROWS = 50000
 
     # DB & status paths
     DB_PATH = os.path.join(os.getcwd(), "pesticide_log.db")
@@ -95,16 +135,101 @@ class Config:
     MOTOR_STALL_TIMEOUT = 2.0
     MOTOR_STALL_MIN_TICKS = 2
 
+    # Drive geometry and speed control (row coverage)
+    WHEEL_TICKS_PER_M = 600.0
+    WHEEL_TRACK_M = 0.35
+    MOTOR_MAX_SPEED_MPS = 0.5       # at full duty on a charged battery (feed-forward)
+    MOTOR_PWM_FREQ = 200
+
+    # Row coverage (POST /coverage)
+    COVERAGE_RATE_HZ = 20
+    COVERAGE_SPEED_MPS = 0.35
+    COVERAGE_SWATH_M = 0.5
+    COVERAGE_RANGE_EVERY = 2        # ultrasonic read every N control ticks (a read can take ~25 ms)
+    COVERAGE_OBSTACLE_CM = 40
+    COVERAGE_OBSTACLE_TIMEOUT_S = 60.0
+    COVERAGE_DETECTION_STOP_S = 2.0  # pause per POST /detections batch while covering
+
     # Battery monitoring
     BATTERY_POLL_INTERVAL_S = 30
+    # polling speeds up linearly to BATTERY_POLL_MIN_INTERVAL_S as the voltage falls
+    # from BATTERY_LOW_VOLTAGE + BATTERY_FAST_POLL_MARGIN_V to BATTERY_LOW_VOLTAGE
+    BATTERY_POLL_MIN_INTERVAL_S = 2.0
+    BATTERY_FAST_POLL_MARGIN_V = 0.5
+    # status file is rewritten only when the voltage moved at least this much
+    BATTERY_STATUS_DELTA_V = 0.05
     BATTERY_LOW_VOLTAGE = 11.0
     BATTERY_CRITICAL_VOLTAGE = 10.5
+    BATTERY_FULL_VOLTAGE = 12.6      # 100 % for coverage area-per-battery-percent
     BATTERY_WEBHOOK_URL = None  # e.g. "http://your-server/hook"
 
+    # Batch commands (POST /commands)
+    COMMAND_MAX_OPS = 500
+    COMMAND_MAX_DRIVE_S = 30.0
+    COMMAND_MAX_WAIT_S = 300.0
+    COMMAND_STEP_TIMEOUT_S = 30.0   # on top of the step's own duration
+    COMMAND_JOBS_KEPT = 50
+
+    # Thread supervisor (GET /threads)
+    SUPERVISOR_INTERVAL_S = 0.25
+    THREAD_STALL_S = 5.0   # no heartbeat for this long = stalled (longer than any single blocking step)
+
     # Webserver
     WEB_HOST = "0.0.0.0"
     WEB_PORT = 5000
 
+    # Emergency-stop fast path (localhost only; see EStopListener)
+    ESTOP_HOST = "127.0.0.1"
+    ESTOP_PORT = 5001
+
+    # Requests arriving while subsystems are still initialising wait this long, then get 503
+    ROBOT_INIT_WAIT_S = 10.0
+
+# -------------------------
+# Emergency stop latch: set by Robot.emergency_stop, cleared by Robot.start_robot.
+# While set, workers drop dequeued motion/spray commands.
+# -------------------------
+ESTOP_LATCH = threading.Event()
+
+# A threading.Event put on a subsystem queue is a completion marker: the worker
+# sets it when it dequeues it, i.e. once everything queued before it has run.
+# The /commands sequencer uses this to run one step at a time. Markers are set
+# even while the e-stop latch is engaged so nobody waits on a dropped command.
+
+# -------------------------
+# Startup profile (served at /ready, printed by --profile-startup)
+# -------------------------
+class StartupProfile:
+    """Wall-clock duration of each import / init phase, in the order they ran."""
+    def __init__(self, started: float, phases: Optional[List[Tuple[str, float]]] = None):
+        self.started = started
+        self.phases: List[Tuple[str, float]] = list(phases or [])
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = [{"phase": n, "ms": round(sec * 1000, 1)} for n, sec in self.phases]
+        ready_ms = None if self.ready_at is None else round((self.ready_at - self.started) * 1000, 1)
+        return {"phases": phases, "ready_after_ms": ready_ms}
+
+STARTUP = StartupProfile(_import_started, _import_phases)
+
 # -------------------------
 # UTIL: Safe JSON write for status
 # -------------------------
@@ -117,6 +242,175 @@ def write_status_file(status: Dict[str, Any]) -> None:
     except Exception as e:
         logging.exception("Failed to write status file: %s", e)
 
+# -------------------------
+# Per-subsystem metrics (exposed at /metrics)
+# -------------------------
+class SubsystemMetrics:
+    """Processed/error counters, processing-time histogram and queue depth for one thread."""
+    def __init__(self, name: str, q: Optional[queue.Queue] = None):
+        labels = {"subsystem": name}
+        self.processed = REGISTRY.counter("robot_subsystem_items_total", "Items processed by subsystem thread", labels)
+        self.errors = REGISTRY.counter("robot_subsystem_errors_total", "Errors raised while processing items", labels)
+        self.seconds = REGISTRY.histogram("robot_subsystem_process_seconds", "Time spent processing one item", labels)
+        if q is not None:
+            REGISTRY.gauge("robot_subsystem_queue_depth", "Items waiting in the subsystem queue", labels).set_function(q.qsize)
+
+    def done(self, started: float, ok: bool = True) -> None:
+        self.seconds.observe(time.perf_counter() - started)
+        self.processed.inc()
+        if not ok:
+            self.errors.inc()
+
+# -------------------------
+# Thread heartbeats and wake-up lag (exposed at /threads and /metrics)
+# -------------------------
+LAG_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class Heartbeat:
+    """
+    Liveness and scheduling jitter for one worker loop. The loop calls get() / wait()
+    instead of queue.get / Event.wait: every return is a heartbeat, and every timeout
+    records how late the thread woke past its deadline. That lag is time spent waiting
+    for the GIL / CPU, not work, so it shows contention with Flask and inference.
+    Long waits are sliced so an idle thread still beats every WAIT_SLICE_S.
+    """
+    WAIT_SLICE_S = 1.0
+
+    def __init__(self, name: str, stall_after_s: Optional[float] = None):
+        self.name = name
+        self.stall_after_s = Config.THREAD_STALL_S if stall_after_s is None else stall_after_s
+        self.last = time.monotonic()
+        self.beats = 0
+        self.max_lag = 0.0
+        labels = {"thread": name}
+        self.lag = REGISTRY.histogram("robot_thread_wake_lag_seconds", "Wake-up delay past a poll timeout", labels,
+                                      buckets=LAG_BUCKETS)
+        REGISTRY.gauge("robot_thread_heartbeat_age_seconds", "Seconds since the thread's last heartbeat", labels
+                       ).set_function(self.age)
+
+    def beat(self) -> None:
+        self.last = time.monotonic()
+        self.beats += 1
+
+    def _woke(self, deadline: float) -> None:
+        self.beat()
+        late = max(self.last - deadline, 0.0)
+        self.lag.observe(late)
+        if late > self.max_lag:
+            self.max_lag = late
+
+    def get(self, q: queue.Queue, timeout: float) -> Any:
+        """q.get(timeout=timeout); raises queue.Empty like it."""
+        deadline = time.monotonic() + timeout
+        try:
+            item = q.get(timeout=timeout)
+        except queue.Empty:
+            self._woke(deadline)
+            raise
+        self.beat()
+        return item
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """event.wait(timeout), beating at least every WAIT_SLICE_S."""
+        end = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            slice_s = min(end - now, self.WAIT_SLICE_S)
+            if slice_s <= 0:
+                self.beat()
+                return event.is_set()
+            if event.wait(slice_s):
+                self.beat()
+                return True
+            self._woke(now + slice_s)
+            if self.last >= end:
+                return False
+
+    def age(self) -> float:
+        return time.monotonic() - self.last
+
+    def snapshot(self) -> Dict[str, Any]:
+        lag = self.lag.snapshot()
+        ms = lambda v: None if v is None or v == float("inf") else round(v * 1000, 2)
+        return {
+            "heartbeat_age_s": round(self.age(), 3),
+            "stall_after_s": self.stall_after_s,
+            "beats": self.beats,
+            "wake_lag_ms": {
+                "count": lag["count"],
+                "mean": ms(lag["sum"] / lag["count"]) if lag["count"] else None,
+                # bucket upper bounds
+                "p50": ms(lag.get("p50")), "p95": ms(lag.get("p95")), "p99": ms(lag.get("p99")),
+                "max": ms(self.max_lag),
+            },
+        }
+
+class ThreadSupervisor(threading.Thread):
+    """
+    Checks the worker threads every SUPERVISOR_INTERVAL_S. A thread that exited is
+    DEAD; one whose heartbeat is older than its stall_after_s is STALLED (e.g. the
+    sprayer stuck in its pump loop, the DB logger blocked on a locked database).
+    State changes go to the status file as component "thread_<name>" and raise an
+    error; the supervisor's own wake lag is a canary for GIL contention.
+    """
+    def __init__(self, status: "StatusManager", workers: Dict[str, threading.Thread]):
+        super().__init__(daemon=True)
+        self.status = status
+        self.workers = dict(workers)  # each has a .heartbeat
+        self.states = {name: "OK" for name in self.workers}
+        self._stop_event = threading.Event()
+        self.heartbeat = Heartbeat("supervisor")
+        for name, t in self.workers.items():
+            REGISTRY.gauge("robot_thread_up", "1 while the worker thread is alive", {"thread": name}
+                           ).set_function(lambda t=t: float(t.is_alive()))
+        self.start()
+
+    def run(self) -> None:
+        while not self.heartbeat.wait(self._stop_event, Config.SUPERVISOR_INTERVAL_S):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Thread supervisor check failed")
+
+    def check(self) -> Dict[str, str]:
+        for name, t in self.workers.items():
+            hb = t.heartbeat
+            if not t.is_alive():
+                state = "DEAD"
+            elif hb.age() > hb.stall_after_s:
+                state = "STALLED"
+            else:
+                state = "OK"
+            if state != self.states[name]:
+                self._transition(name, state, hb)
+        return dict(self.states)
+
+    def _transition(self, name: str, state: str, hb: Heartbeat) -> None:
+        prev, self.states[name] = self.states[name], state
+        comp = f"thread_{name}"
+        self.status.update_component(comp, state)
+        if state == "DEAD":
+            self.status.set_error(comp, "worker thread exited", ["uncaught exception in worker loop"])
+        elif state == "STALLED":
+            self.status.set_error(comp, f"no heartbeat for {hb.age():.1f} s",
+                                  ["blocked on I/O or a lock", "stuck in a hardware wait"])
+        else:
+            logging.info("Thread %s recovered (%s -> OK)", name, prev)
+
+    def snapshot(self) -> Dict[str, Any]:
+        threads = {}
+        for name, t in self.workers.items():
+            threads[name] = {"state": self.states[name], "alive": t.is_alive(), **t.heartbeat.snapshot()}
+        return {
+            "interval_s": Config.SUPERVISOR_INTERVAL_S,
+            "switch_interval_ms": round(sys.getswitchinterval() * 1000, 3),
+            "supervisor": self.heartbeat.snapshot(),
+            "threads": threads,
+        }
+
+    def stop_thread(self) -> None:
+        self._stop_event.set()
+
 # -------------------------
 # STATUS MANAGER
 # -------------------------
@@ -177,13 +471,22 @@ class StatusManager:
 
     def update_component(self, comp: str, val: Any) -> None:
         with self.lock:
+            if self.status["components"].get(comp) == val:
+                return
             self.status["components"][comp] = val
             write_status_file(self.status)
 
     def update_battery(self, voltage: Optional[float]) -> None:
         with self.lock:
-            self.status["battery_v"] = voltage
-            self.status["components"]["battery"] = "OK" if voltage is not None else "UNKNOWN"
+            old = self.status["battery_v"]
+            state = "OK" if voltage is not None else "UNKNOWN"
+            moved = (voltage is None) != (old is None) or (
+                voltage is not None and abs(voltage - old) >= Config.BATTERY_STATUS_DELTA_V)
+            if not moved and self.status["components"]["battery"] == state:
+                return
+            if moved:
+                self.status["battery_v"] = voltage
+            self.status["components"]["battery"] = state
             write_status_file(self.status)
 
     def set_power(self, p: str) -> None:
@@ -202,8 +505,11 @@ class DBLogger(threading.Thread):
     def __init__(self, db_path: str):
         super().__init__(daemon=True)
         self.db_path = db_path
-        self.queue: "queue.Queue[Tuple[float, float, Optional[float], Optional[float], Optional[float]]]" = queue.Queue()
+        # items are (sql, params); the timestamp is taken when the row is written
+        self.queue: "queue.Queue[Tuple[str, tuple]]" = queue.Queue()
         self._stop_event = threading.Event()
+        self.metrics = SubsystemMetrics("db", self.queue)
+        self.heartbeat = Heartbeat("db")
         self._init_db()
         self.start()
 
@@ -217,7 +523,21 @@ class DBLogger(threading.Thread):
                         area_m2 REAL,
                         x REAL,
                         y REAL,
-                        duration_s REAL
+                        duration_s REAL,
+                        partial INTEGER NOT NULL DEFAULT 0
+                    )""")
+        # databases created before the partial flag existed
+        if "partial" not in {row[1] for row in c.execute("PRAGMA table_info(pesticide_log)")}:
+            c.execute("ALTER TABLE pesticide_log ADD COLUMN partial INTEGER NOT NULL DEFAULT 0")
+        c.execute("""CREATE TABLE IF NOT EXISTS detection_log (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        ts TEXT,
+                        pest TEXT,
+                        conf REAL,
+                        x REAL,
+                        y REAL,
+                        track_id INTEGER,
+                        camera INTEGER
                     )""")
         conn.commit()
         conn.close()
@@ -228,20 +548,29 @@ class DBLogger(threading.Thread):
         c = conn.cursor()
         while not self._stop_event.is_set():
             try:
-                item = self.queue.get(timeout=0.5)
+                item = self.heartbeat.get(self.queue, 0.5)
             except queue.Empty:
                 continue
+            started = time.perf_counter()
             try:
-                ml, area, x, y, dur = item
-                c.execute("INSERT INTO pesticide_log (ts, ml_used, area_m2, x, y, duration_s) VALUES (?, ?, ?, ?, ?, ?)",
-                          (datetime.utcnow().isoformat(), ml, area, x, y, dur))
+                sql, params = item
+                c.execute(sql, (datetime.utcnow().isoformat(),) + params)
                 conn.commit()
+                self.metrics.done(started)
             except Exception:
+                self.metrics.done(started, ok=False)
                 logging.exception("DBLogger failed to insert record: %s", item)
         conn.close()
 
-    def log(self, ml: float, area: float, x: Optional[float] = None, y: Optional[float] = None, dur: Optional[float] = None) -> None:
-        self.queue.put((ml, area, x, y, dur))
+    def log(self, ml: float, area: float, x: Optional[float] = None, y: Optional[float] = None, dur: Optional[float] = None,
+            partial: bool = False) -> None:
+        self.queue.put(("INSERT INTO pesticide_log (ts, ml_used, area_m2, x, y, duration_s, partial) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (ml, area, x, y, dur, int(partial))))
+
+    def log_detection(self, pest: str, conf: Optional[float] = None, x: Optional[float] = None,
+                      y: Optional[float] = None, track_id: Optional[int] = None, camera: Optional[int] = None) -> None:
+        self.queue.put(("INSERT INTO detection_log (ts, pest, conf, x, y, track_id, camera) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (pest, conf, x, y, track_id, camera)))
 
     def daily_report(self, day: Optional[date] = None) -> Dict[str, Any]:
         conn = sqlite3.connect(self.db_path)
@@ -259,22 +588,95 @@ class DBLogger(threading.Thread):
             {"ts": r[0], "ml_used": r[1], "area_m2": r[2], "x": r[3], "y": r[4], "duration_s": r[5]} for r in rows
         ]}
 
+    def recent_locations(self, since_s: float) -> List[Tuple[float, float, float]]:
+        """(x, y, epoch_ts) of completed sprays with coordinates logged in the last since_s seconds."""
+        conn = sqlite3.connect(self.db_path)
+        c = conn.cursor()
+        cutoff = (datetime.utcnow() - timedelta(seconds=since_s)).isoformat()
+        c.execute("SELECT x, y, ts FROM pesticide_log WHERE ts >= ? AND x IS NOT NULL AND y IS NOT NULL "
+                  "AND partial = 0 ORDER BY ts",
+                  (cutoff,))
+        rows = c.fetchall()
+        conn.close()
+        epoch = datetime(1970, 1, 1)
+        return [(r[0], r[1], (datetime.fromisoformat(r[2]) - epoch).total_seconds()) for r in rows]
+
     def stop(self) -> None:
         self._stop_event.set()
 
+# -------------------------
+# Row coverage job (POST /coverage); runs inside MotorController
+# -------------------------
+def battery_pct(voltage: Optional[float]) -> Optional[float]:
+    if voltage is None:
+        return None
+    span = Config.BATTERY_FULL_VOLTAGE - Config.BATTERY_CRITICAL_VOLTAGE
+    return min(max((voltage - Config.BATTERY_CRITICAL_VOLTAGE) / span, 0.0), 1.0) * 100
+
+class CoverageJob:
+    def __init__(self, legs: List[Tuple[str, float]], swath_m: float, speed_mps: float,
+                 range_fn: Callable[[], Optional[float]], voltage_fn: Callable[[], Optional[float]]):
+        self.id = os.urandom(6).hex()
+        self.driver = CoverageDriver(legs, Config.WHEEL_TICKS_PER_M, Config.WHEEL_TRACK_M, swath_m,
+                                     speed_mps=speed_mps, max_speed_mps=Config.MOTOR_MAX_SPEED_MPS,
+                                     obstacle_m=Config.COVERAGE_OBSTACLE_CM / 100.0,
+                                     stall_s=Config.MOTOR_STALL_TIMEOUT)
+        self.range_fn = range_fn      # cm or None
+        self.voltage_fn = voltage_fn
+        self.state = "queued"         # queued / running / done / cancelled / aborted
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.hold_until = 0.0         # monotonic; detection stop while in the future
+        self.overruns = 0             # control ticks that started a full period late
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.v_start: Optional[float] = None
+
+    def hold(self, seconds: float) -> None:
+        self.hold_until = max(self.hold_until, time.monotonic() + seconds)
+
+    def abort(self, reason: str) -> None:
+        self.cancel_event.set()
+        if self.state == "queued":
+            self.state, self.error, self.finished = "aborted", reason, time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = self.driver.stats()
+        minutes = progress["elapsed_s"] / 60
+        start_pct, now_pct = battery_pct(self.v_start), battery_pct(self.voltage_fn())
+        used = None if start_pct is None or now_pct is None else round(start_pct - now_pct, 2)
+        return {"job_id": self.id, "state": self.state, "error": self.error, "progress": progress,
+                "area_m2_per_min": round(progress["area_m2"] / minutes, 2) if minutes > 0 else None,
+                "battery_pct_used": used,
+                # None until the voltage has visibly dropped
+                "area_m2_per_battery_pct": round(progress["area_m2"] / used, 1) if used and used > 0.1 else None,
+                "overruns": self.overruns, "created": self.created, "started": self.started,
+                "finished": self.finished}
+
 # -------------------------
 # Motor Controller
 # -------------------------
 class MotorController(threading.Thread):
+    # direction -> (left fwd, left bwd, right fwd, right bwd)
+    DRIVE_PINS = {"FWD": (1, 0, 1, 0), "BWD": (0, 1, 0, 1), "LEFT": (0, 1, 1, 0), "RIGHT": (1, 0, 0, 1)}
+
     def __init__(self, status: StatusManager):
         super().__init__(daemon=True)
         self.status = status
         self.cmd_q: "queue.Queue[Any]" = queue.Queue()
         self._stop_event = threading.Event()
+        self.metrics = SubsystemMetrics("motors", self.cmd_q)
+        self.heartbeat = Heartbeat("motors")
         self._init_gpio()
         self.enabled = False
         self.enc_counts = {"L": 0, "R": 0}
         self.enc_lock = threading.Lock()
+        self.coverage: Optional[CoverageJob] = None
+        self._pwm: Optional[Dict[int, Any]] = None
+        # without real encoders, coverage runs against a simulated drive so the API can be exercised
+        self.sim_drive = None if HW_AVAILABLE else SimDiffDrive(Config.WHEEL_TICKS_PER_M, Config.WHEEL_TRACK_M,
+                                                                Config.MOTOR_MAX_SPEED_MPS)
         self.start()
 
     def _init_gpio(self) -> None:
@@ -309,9 +711,16 @@ class MotorController(threading.Thread):
     def run(self) -> None:
         while not self._stop_event.is_set():
             try:
-                cmd = self.cmd_q.get(timeout=0.05)
+                cmd = self.heartbeat.get(self.cmd_q, 0.05)
             except queue.Empty:
                 continue
+            if isinstance(cmd, threading.Event):
+                cmd.set()
+                continue
+            started = time.perf_counter()
+            ok = True
+            if ESTOP_LATCH.is_set() and cmd not in ("STOP", "DISABLE"):
+                continue
             try:
                 if cmd == "ENABLE":
                     try:
@@ -346,8 +755,16 @@ class MotorController(threading.Thread):
                     self._set(0, 0, 0, 0)
                 elif isinstance(cmd, tuple) and cmd[0] == "FWD_T":
                     self._set(1, 0, 1, 0)
-                    time.sleep(cmd[1])
+                    self.heartbeat.wait(ESTOP_LATCH, cmd[1])  # returns early on e-stop
+                    self._set(0, 0, 0, 0)
+                elif isinstance(cmd, tuple) and cmd[0] == "DRIVE_T":
+                    self._set(*self.DRIVE_PINS[cmd[1]])
+                    self.heartbeat.wait(ESTOP_LATCH, cmd[2])
                     self._set(0, 0, 0, 0)
+                elif isinstance(cmd, CoverageJob):
+                    self._run_coverage(cmd)
+                    self.metrics.done(started, cmd.state == "done")
+                    continue  # the closed loop watches the encoders itself; the check below would see a stopped robot
                 # after movement, optionally check stall
                 if Config.USE_ENCODERS:
                     if self.check_stall(timeout=Config.MOTOR_STALL_TIMEOUT):
@@ -355,7 +772,9 @@ class MotorController(threading.Thread):
                         self._set(0, 0, 0, 0)
                         self.status.set_error("motors", "stall detected", ["mechanical jam", "driver", "battery low"])
             except Exception:
+                ok = False
                 logging.exception("MotorController command failed: %s", cmd)
+            self.metrics.done(started, ok)
 
     def _set(self, lf: int, lb: int, rf: int, rb: int) -> None:
         try:
@@ -367,6 +786,101 @@ class MotorController(threading.Thread):
         except Exception:
             logging.exception("Failed to set motor GPIO outputs")
 
+    # ---- row coverage: PWM on the driver inputs, fixed-rate loop on this thread ----
+    def _pwm_start(self) -> None:
+        if self._pwm is None:
+            self._pwm = {p: GPIO.PWM(p, Config.MOTOR_PWM_FREQ)
+                         for p in (Config.LEFT_FWD, Config.LEFT_BWD, Config.RIGHT_FWD, Config.RIGHT_BWD)}
+        for pwm in self._pwm.values():
+            pwm.start(0)
+
+    def _pwm_stop(self) -> None:
+        for pwm in (self._pwm or {}).values():
+            pwm.stop()
+        self._set(0, 0, 0, 0)
+
+    def _drive(self, duty_l: float, duty_r: float) -> None:
+        for fwd, bwd, d in ((Config.LEFT_FWD, Config.LEFT_BWD, duty_l), (Config.RIGHT_FWD, Config.RIGHT_BWD, duty_r)):
+            self._pwm[fwd].ChangeDutyCycle(max(d, 0.0) * 100)
+            self._pwm[bwd].ChangeDutyCycle(max(-d, 0.0) * 100)
+        if self.sim_drive is not None:
+            self.sim_drive.set_duty(duty_l, duty_r)
+
+    def _ticks(self, dt: float) -> Tuple[int, int]:
+        if self.sim_drive is not None:
+            for _ in range(5):
+                self.sim_drive.step(dt / 5)
+            return self.sim_drive.ticks()
+        enc = self.get_encoders()
+        return enc["L"], enc["R"]
+
+    def _run_coverage(self, job: CoverageJob) -> None:
+        if job.state != "queued":  # aborted while waiting in the queue
+            return
+        job.state, job.started, job.v_start = "running", time.time(), job.voltage_fn()
+        drv = job.driver
+        period = 1.0 / Config.COVERAGE_RATE_HZ
+        tick, range_m, blocked_since = 0, None, None
+        last = next_t = time.monotonic()
+        self._pwm_start()
+        try:
+            while drv.state not in ("done", "stalled"):
+                if ESTOP_LATCH.is_set():
+                    job.state, job.error = "aborted", "emergency stop"
+                    return
+                if job.cancel_event.is_set() or self._stop_event.is_set():
+                    job.state = "cancelled"
+                    return
+                now = time.monotonic()
+                ticks = self._ticks(now - last)
+                if tick % Config.COVERAGE_RANGE_EVERY == 0:
+                    cm = job.range_fn()
+                    range_m = None if cm is None else cm / 100.0
+                duty = drv.step(*ticks, max(now - last, 1e-3), range_m, hold=now < job.hold_until)
+                self._drive(*duty)
+                if drv.pause_reason == "obstacle":
+                    blocked_since = blocked_since or now
+                    if now - blocked_since > Config.COVERAGE_OBSTACLE_TIMEOUT_S:
+                        job.state, job.error = "aborted", f"row blocked for {Config.COVERAGE_OBSTACLE_TIMEOUT_S:.0f} s"
+                        self.status.set_error("motors", "coverage aborted: obstacle did not clear", ["obstacle in row"])
+                        return
+                else:
+                    blocked_since = None
+                last, tick = now, tick + 1
+                next_t += period
+                delay = next_t - time.monotonic()
+                if delay < -period:
+                    job.overruns += 1
+                    next_t = time.monotonic()  # don't burst to catch up
+                self.heartbeat.wait(job.cancel_event, max(delay, 0.0))
+            if drv.state == "stalled":
+                job.state, job.error = "aborted", "no encoder ticks while driving"
+                self.status.set_error("motors", "stall detected during coverage", ["mechanical jam", "driver", "battery low"])
+            else:
+                job.state = "done"
+        except Exception as e:
+            job.state, job.error = "aborted", str(e)
+            raise
+        finally:
+            self._pwm_stop()
+            job.finished = time.time()
+            self.status.update_op({"coverage": {"job_id": job.id, "state": job.state,
+                                                "area_m2": round(drv.area_m2, 2)}})
+
+    def cover(self, job: CoverageJob) -> None:
+        self.coverage = job
+        self.cmd_q.put(job)
+
+    def active_coverage(self) -> Optional[CoverageJob]:
+        """The coverage run that still owns the drive (queued or running), if any."""
+        job = self.coverage
+        return job if job is not None and job.state in ("queued", "running") else None
+
+    def abort_coverage(self, reason: str = "cancelled") -> None:
+        job = self.active_coverage()
+        if job is not None:
+            job.abort(reason)
+
     def enable(self) -> bool:
         # Put ENABLE command and wait a short time
         self.cmd_q.put("ENABLE")
@@ -390,8 +904,11 @@ class MotorController(threading.Thread):
     def backward(self) -> None: self.cmd_q.put("BWD")
     def left(self) -> None: self.cmd_q.put("LEFT")
     def right(self) -> None: self.cmd_q.put("RIGHT")
-    def stop(self) -> None: self.cmd_q.put("STOP")
+    def stop(self) -> None:
+        self.abort_coverage("stopped")
+        self.cmd_q.put("STOP")
     def forward_for(self, t: float) -> None: self.cmd_q.put(("FWD_T", t))
+    def drive_for(self, direction: str, t: float) -> None: self.cmd_q.put(("DRIVE_T", direction, t))
 
     def reset_encoders(self) -> None:
         with self.enc_lock:
@@ -412,6 +929,14 @@ class MotorController(threading.Thread):
             return True
         return False
 
+    def halt_pins(self) -> None:
+        """E-stop: all motor driver pins low, bypassing the command queue."""
+        for p in (Config.LEFT_FWD, Config.LEFT_BWD, Config.RIGHT_FWD, Config.RIGHT_BWD, Config.MOTOR_ENABLE):
+            GPIO.output(p, GPIO.LOW)
+        for pwm in (self._pwm or {}).values():  # a coverage run drives the inputs by PWM
+            pwm.ChangeDutyCycle(0)
+        self.enabled = False
+
     def stop_thread(self) -> None:
         self._stop_event.set()
 
@@ -424,6 +949,9 @@ class Arm(threading.Thread):
         self.status = status
         self.cmd_q: "queue.Queue[Tuple[float, float]]" = queue.Queue()
         self._stop_event = threading.Event()
+        self.metrics = SubsystemMetrics("arm", self.cmd_q)
+        self.heartbeat = Heartbeat("arm")
+        self._pixel_map = None
         self._init_gpio()
         self.start()
 
@@ -448,6 +976,8 @@ class Arm(threading.Thread):
         return 2.0 + (ang / 18.0)
 
     def _move_pwm(self, pwm, ang: float) -> None:
+        if ESTOP_LATCH.is_set():
+            return
         if pwm is None:
             logging.info("Simulated servo move to %s degrees", ang)
             time.sleep(0.3)
@@ -459,15 +989,22 @@ class Arm(threading.Thread):
     def run(self) -> None:
         while not self._stop_event.is_set():
             try:
-                x, y = self.cmd_q.get(timeout=0.05)
+                item = self.heartbeat.get(self.cmd_q, 0.05)
             except queue.Empty:
                 continue
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            x, y = item
+            started = time.perf_counter()
             try:
                 shoulder_ang, elbow_ang = self.ik_2link(x, y)
                 self._move_pwm(self.shoulder_pwm, shoulder_ang)
                 self._move_pwm(self.elbow_pwm, elbow_ang)
                 self.status.update_op({"arm_move": {"x": x, "y": y}})
+                self.metrics.done(started)
             except Exception as e:
+                self.metrics.done(started, ok=False)
                 self.status.set_error("arm", f"IK error: {e}")
 
     def move_to(self, x: float, y: float) -> None:
@@ -476,6 +1013,28 @@ class Arm(threading.Thread):
         except Exception as e:
             self.status.set_error("arm", f"arm move failed: {e}")
 
+    def _get_pixel_map(self):
+        # Loaded lazily so numpy/cv2 are only imported when pixel targets are used
+        if self._pixel_map is None:
+            try:
+                from .calibration import PixelToArmMap
+            except ImportError:
+                from calibration import PixelToArmMap
+            self._pixel_map = PixelToArmMap.load(Config.CALIBRATION_PATH)
+        return self._pixel_map
+
+    def move_to_pixels(self, boxes: List[List[float]]) -> Dict[str, Any]:
+        """Map pixel-space xyxy boxes to arm mm with the calibration table; queue reachable ones."""
+        try:
+            arm_xy, reachable = self._get_pixel_map().map_boxes(boxes)
+        except Exception as e:
+            self.status.set_error("arm", f"pixel mapping failed: {e}", ["missing calibration", "bad boxes"])
+            return {"status": "error", "message": str(e)}
+        targets = [(float(x), float(y)) for (x, y), ok in zip(arm_xy, reachable) if ok]
+        for x, y in targets:
+            self.move_to(x, y)
+        return {"status": "queued", "targets": targets, "unreachable": int(len(reachable) - len(targets))}
+
     def ik_2link(self, x: float, y: float) -> Tuple[float, float]:
         # Corrected inverse kinematics math (squared lengths)
         r = math.hypot(x, y)
@@ -493,6 +1052,12 @@ class Arm(threading.Thread):
         elbow_servo_angle = 90 + (elbow_deg - 90)
         return shoulder_servo_angle, elbow_servo_angle
 
+    def halt_pins(self) -> None:
+        """E-stop: stop servo pulses (0% duty) so no joint keeps driving."""
+        for pwm in (self.base_pwm, self.shoulder_pwm, self.elbow_pwm):
+            if pwm is not None:
+                pwm.ChangeDutyCycle(0)
+
     def cleanup(self) -> None:
         try:
             if self.base_pwm: self.base_pwm.stop()
@@ -512,8 +1077,14 @@ class Sprayer(threading.Thread):
         super().__init__(daemon=True)
         self.status = status
         self.db = db_logger
-        self.cmd_q: "queue.Queue[Tuple[float, Optional[float], Optional[float], Optional[float]]]" = queue.Queue()
+        # (duration_s, x, y, req_id, force)
+        self.cmd_q: "queue.Queue[Tuple[float, Optional[float], Optional[float], Optional[str], bool]]" = queue.Queue()
         self._stop_event = threading.Event()
+        self.metrics = SubsystemMetrics("sprayer", self.cmd_q)
+        self.heartbeat = Heartbeat("sprayer")
+        self.suppressed = REGISTRY.counter("robot_sprays_suppressed_total", "Sprays skipped by the spray-history index")
+        self.history = SprayIndex(Config.SPRAY_EXCLUSION_RADIUS, Config.SPRAY_HISTORY_TTL_S)
+        self._warm_start_history()
         try:
             GPIO.setup(Config.SPRAYER_PIN, GPIO.OUT)
             GPIO.output(Config.SPRAYER_PIN, GPIO.LOW)
@@ -521,14 +1092,37 @@ class Sprayer(threading.Thread):
             pass
         self.start()
 
+    def _warm_start_history(self) -> None:
+        try:
+            rows = self.db.recent_locations(Config.SPRAY_HISTORY_TTL_S)
+            for x, y, ts in rows:
+                self.history.add(x, y, ts)
+            logging.info("Spray history warm-started with %d recent locations", len(rows))
+        except Exception:
+            logging.exception("Spray history warm start failed")
+
     def run(self) -> None:
         while not self._stop_event.is_set():
             try:
-                dur, x, y, req_id = self.cmd_q.get(timeout=0.1)
+                item = self.heartbeat.get(self.cmd_q, 0.1)
             except queue.Empty:
                 continue
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            dur, x, y, req_id, force = item
+            started = time.perf_counter()
+            if ESTOP_LATCH.is_set():
+                continue
             try:
                 if dur is None or dur <= 0:
+                    self.metrics.done(started, ok=False)
+                    continue
+                located = x is not None and y is not None
+                # an earlier queued spray may have treated this spot since it was accepted
+                if located and not force and self.history.check(x, y):
+                    self.suppressed.inc()
+                    self.metrics.done(started)
                     continue
                 if dur > Config.SPRAY_MAX_DURATION:
                     self.status.set_error("sprayer", "excessive duration clipped", ["bad command"])
@@ -539,21 +1133,31 @@ class Sprayer(threading.Thread):
                 except Exception:
                     logging.info("Simulated sprayer on for %s seconds", dur)
                 t0 = time.time()
+                cut = False
                 while time.time() - t0 < dur:
-                    if self._stop_event.is_set():
+                    if self._stop_event.is_set() or self.heartbeat.wait(ESTOP_LATCH, 0.05):
+                        cut = True
                         break
-                    time.sleep(0.05)
                 try:
                     GPIO.output(Config.SPRAYER_PIN, GPIO.LOW)
                 except Exception:
                     pass
+                # cut short by e-stop / shutdown: log what was pumped, but the spot is not treated
+                partial = cut or ESTOP_LATCH.is_set()
+                dur = min(dur, time.time() - t0)
                 ml = dur * Config.PUMP_FLOW_ML_PER_S
-                self.db.log(ml, Config.DEFAULT_SPRAY_AREA_M2, x, y, dur)
-                self.status.update_op({"spray": {"ml": ml, "x": x, "y": y}})
+                self.db.log(ml, Config.DEFAULT_SPRAY_AREA_M2, x, y, dur, partial)
+                if located and not partial:
+                    self.history.add(x, y)
+                self.status.update_op({"spray": {"ml": ml, "x": x, "y": y, "partial": partial}})
+                self.metrics.done(started)
             except Exception:
+                self.metrics.done(started, ok=False)
                 logging.exception("Sprayer run error")
 
-    def spray(self, duration_s: Optional[float] = None, volume_ml: Optional[float] = None, x: Optional[float] = None, y: Optional[float] = None, req_id: Optional[str] = None) -> Dict[str, Any]:
+    def spray(self, duration_s: Optional[float] = None, volume_ml: Optional[float] = None, x: Optional[float] = None, y: Optional[float] = None, req_id: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        if ESTOP_LATCH.is_set():
+            return {"status": "rejected", "message": "emergency stop engaged; POST /start to resume"}
         try:
             if duration_s is None:
                 if volume_ml is None:
@@ -562,12 +1166,21 @@ class Sprayer(threading.Thread):
                     duration_s = volume_ml / max(1e-6, Config.PUMP_FLOW_ML_PER_S)
             if duration_s <= 0:
                 raise ValueError("duration must be positive")
-            self.cmd_q.put((duration_s, x, y, req_id))
+            # skip spots treated within the exclusion radius / TTL (unless forced);
+            # the worker records the spot once the pump has actually run
+            if x is not None and y is not None and not force and self.history.check(x, y):
+                self.suppressed.inc()
+                return {"status": "skipped", "reason": "spot sprayed recently", "x": x, "y": y}
+            self.cmd_q.put((duration_s, x, y, req_id, force))
             return {"status": "queued", "duration_s": duration_s}
         except Exception as e:
             self.status.set_error("sprayer", f"spray failed: {e}")
             return {"status": "error", "message": str(e)}
 
+    def halt_pins(self) -> None:
+        """E-stop: pump off, bypassing the command queue."""
+        GPIO.output(Config.SPRAYER_PIN, GPIO.LOW)
+
     def stop_thread(self) -> None:
         self._stop_event.set()
 
@@ -619,6 +1232,14 @@ class BatteryMonitor(threading.Thread):
         self._stop_event = threading.Event()
         # read_adc_fn is an optional function to read real ADC voltage
         self.read_adc_fn = read_adc_fn
+        self.metrics = SubsystemMetrics("battery")
+        self.heartbeat = Heartbeat("battery")
+        self.voltage_gauge = REGISTRY.gauge("robot_battery_voltage", "Last battery voltage reading")
+        self.history = BatteryHistory()
+        self.poll_interval_s = Config.BATTERY_POLL_INTERVAL_S
+        self._level = "OK"  # OK / LOW / CRITICAL / READ_FAILED; errors are raised on transitions only
+        REGISTRY.gauge("robot_battery_runtime_seconds", "Estimated runtime until critical voltage (NaN if unknown)"
+                       ).set_function(self._runtime_or_nan)
         self.start()
 
     def read_voltage(self) -> Optional[float]:
@@ -633,47 +1254,366 @@ class BatteryMonitor(threading.Thread):
             logging.exception("Battery read failed")
             return None
 
+    def next_interval(self, voltage: Optional[float]) -> float:
+        """Poll faster as the voltage approaches BATTERY_LOW_VOLTAGE (fastest at / below it)."""
+        if voltage is None:
+            return Config.BATTERY_POLL_MIN_INTERVAL_S
+        frac = (voltage - Config.BATTERY_LOW_VOLTAGE) / Config.BATTERY_FAST_POLL_MARGIN_V
+        frac = min(max(frac, 0.0), 1.0)
+        lo, hi = Config.BATTERY_POLL_MIN_INTERVAL_S, Config.BATTERY_POLL_INTERVAL_S
+        return lo + frac * (hi - lo)
+
+    def _runtime_or_nan(self) -> float:
+        runtime = self.history.runtime_s(Config.BATTERY_CRITICAL_VOLTAGE)
+        return float("nan") if runtime is None else runtime
+
+    def estimate(self) -> Dict[str, Any]:
+        est = self.history.estimate(Config.BATTERY_LOW_VOLTAGE, Config.BATTERY_CRITICAL_VOLTAGE)
+        est.update(voltage=self.voltage, poll_interval_s=round(self.poll_interval_s, 2))
+        return est
+
     def run(self) -> None:
         while not self._stop_event.is_set():
+            started = time.perf_counter()
             voltage = self.read_voltage()
+            self.metrics.done(started, ok=voltage is not None)
+            if voltage is not None:
+                self.voltage_gauge.set(voltage)
+                self.history.add(voltage)
             self.status.update_battery(voltage)
             if voltage is None:
-                # cannot read battery
-                self.status.set_error("battery", "read failed")
+                level = "READ_FAILED"
+            elif voltage < Config.BATTERY_CRITICAL_VOLTAGE:
+                level = "CRITICAL"
+            elif voltage < Config.BATTERY_LOW_VOLTAGE:
+                level = "LOW"
             else:
-                if voltage < Config.BATTERY_CRITICAL_VOLTAGE:
-                    self.status.set_error("battery", f"critical voltage {voltage}")
-                    if Config.BATTERY_WEBHOOK_URL and requests:
-                        try:
-                            requests.post(Config.BATTERY_WEBHOOK_URL, json={"voltage": voltage})
-                        except Exception:
-                            pass
-                elif voltage < Config.BATTERY_LOW_VOLTAGE:
-                    self.status.set_error("battery", f"low voltage {voltage}")
-                else:
-                    # clear battery error
-                    self.status.update_component("battery", "OK")
-            time.sleep(Config.BATTERY_POLL_INTERVAL_S)
+                level = "OK"
+            if level != self._level:
+                self._on_level_change(level, voltage)
+            self.poll_interval_s = self.next_interval(voltage)
+            self.heartbeat.wait(self._stop_event, self.poll_interval_s)
+
+    def _on_level_change(self, level: str, voltage: Optional[float]) -> None:
+        self._level = level
+        if level == "READ_FAILED":
+            # cannot read battery
+            self.status.set_error("battery", "read failed")
+        elif level == "CRITICAL":
+            self.status.set_error("battery", f"critical voltage {voltage}")
+            if Config.BATTERY_WEBHOOK_URL:
+                try:
+                    import requests
+                    requests.post(Config.BATTERY_WEBHOOK_URL, json={"voltage": voltage})
+                except Exception:
+                    pass
+        elif level == "LOW":
+            self.status.set_error("battery", f"low voltage {voltage}")
+        else:
+            # clear battery error
+            self.status.update_component("battery", "OK")
 
     def stop(self) -> None:
         self._stop_event.set()
 
+# -------------------------
+# Batch command sequencer (POST /commands)
+# -------------------------
+class CommandError(ValueError):
+    pass
+
+DRIVE_DIRECTIONS = {"forward": "FWD", "backward": "BWD", "left": "LEFT", "right": "RIGHT"}
+
+def _number(op: Dict[str, Any], key: str, lo: float, hi: float, default: Optional[float] = None) -> float:
+    v = op.get(key, default)
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        raise CommandError(f"'{key}' must be a number")
+    if not lo <= v <= hi:
+        raise CommandError(f"'{key}' must be within [{lo}, {hi}]")
+    return float(v)
+
+def validate_commands(ops: Any, arm: "Arm") -> List[Dict[str, Any]]:
+    """Normalise a /commands op list; raises CommandError listing every invalid op."""
+    if not isinstance(ops, list) or not ops:
+        raise CommandError("'ops' must be a non-empty list")
+    if len(ops) > Config.COMMAND_MAX_OPS:
+        raise CommandError(f"at most {Config.COMMAND_MAX_OPS} ops per job")
+    out, errors = [], []
+    for i, op in enumerate(ops):
+        try:
+            if not isinstance(op, dict):
+                raise CommandError("op must be an object")
+            kind = op.get("op")
+            if kind == "drive":
+                direction = DRIVE_DIRECTIONS.get(op.get("direction", "forward"))
+                if direction is None:
+                    raise CommandError(f"'direction' must be one of {sorted(DRIVE_DIRECTIONS)}")
+                out.append({"op": "drive", "direction": direction,
+                            "duration_s": _number(op, "duration_s", 0.0, Config.COMMAND_MAX_DRIVE_S)})
+            elif kind == "stop":
+                out.append({"op": "stop"})
+            elif kind == "arm":
+                x, y = _number(op, "x", -1e6, 1e6), _number(op, "y", -1e6, 1e6)
+                try:
+                    arm.ik_2link(x, y)
+                except ValueError:
+                    raise CommandError(f"arm target ({x}, {y}) is unreachable")
+                out.append({"op": "arm", "x": x, "y": y})
+            elif kind == "spray":
+                if "duration_s" not in op and "volume_ml" not in op:
+                    raise CommandError("spray needs 'duration_s' or 'volume_ml'")
+                if "duration_s" in op:
+                    dur = _number(op, "duration_s", 1e-3, Config.SPRAY_MAX_DURATION)
+                else:
+                    dur = _number(op, "volume_ml", 1e-3, Config.SPRAY_MAX_DURATION * Config.PUMP_FLOW_ML_PER_S) \
+                        / Config.PUMP_FLOW_ML_PER_S
+                xy = [None if op.get(k) is None else _number(op, k, -1e6, 1e6) for k in ("x", "y")]
+                out.append({"op": "spray", "duration_s": dur, "x": xy[0], "y": xy[1], "force": bool(op.get("force"))})
+            elif kind == "wait":
+                out.append({"op": "wait", "seconds": _number(op, "seconds", 0.0, Config.COMMAND_MAX_WAIT_S)})
+            else:
+                raise CommandError("'op' must be one of drive, stop, arm, spray, wait")
+        except CommandError as e:
+            errors.append(f"op {i}: {e}")
+    if errors:
+        raise CommandError("; ".join(errors))
+    return out
+
+class CommandJob:
+    def __init__(self, ops: List[Dict[str, Any]]):
+        self.id = os.urandom(6).hex()
+        self.ops = ops
+        self.state = "queued"        # queued / running / done / failed / aborted / cancelled
+        self.completed = 0
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.abort_reason: Optional[str] = None  # set by Robot.stop_robot
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"job_id": self.id, "state": self.state, "total": len(self.ops), "completed": self.completed,
+                "current": self.ops[self.completed] if self.state == "running" and self.completed < len(self.ops)
+                else None,
+                "results": self.results, "error": self.error, "created": self.created,
+                "started": self.started, "finished": self.finished}
+
+class CommandSequencer(threading.Thread):
+    """
+    Runs accepted jobs one at a time, op by op. Each op is queued on its
+    subsystem's cmd_q followed by a completion marker, and the next op starts
+    only after the marker fires, so a job needs no client round-trips between steps.
+    """
+    def __init__(self, robot: "Robot"):
+        super().__init__(daemon=True)
+        self.robot = robot
+        self.jobs_q: "queue.Queue[CommandJob]" = queue.Queue()
+        self.jobs: "OrderedDict[str, CommandJob]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.metrics = SubsystemMetrics("commands", self.jobs_q)
+        self.heartbeat = Heartbeat("commands")
+        self.start()
+
+    def submit(self, ops: Any) -> CommandJob:
+        if ESTOP_LATCH.is_set():
+            raise CommandError("emergency stop engaged; POST /start to resume")
+        # the motor thread is busy with the coverage run and would not reach the job's ops
+        coverage = self.robot.motors.active_coverage()
+        if coverage is not None:
+            raise CommandError(f"coverage run {coverage.id} is {coverage.state}; cancel it or wait")
+        job = CommandJob(validate_commands(ops, self.robot.arm))
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+            while len(self.jobs) > Config.COMMAND_JOBS_KEPT:
+                old_id, old = next(iter(self.jobs.items()))
+                if old.state in ("queued", "running"):
+                    break
+                del self.jobs[old_id]
+        self.jobs_q.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[CommandJob]:
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def active_job(self) -> Optional[CommandJob]:
+        """The oldest job still queued or running, if any."""
+        with self._jobs_lock:
+            return next((j for j in self.jobs.values() if j.state in ("queued", "running")), None)
+
+    def cancel(self, job_id: str) -> Optional[CommandJob]:
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+        return job
+
+    def abort_all(self, reason: str) -> int:
+        """Abort every queued or running job: the running one at its current step, queued ones before they start."""
+        with self._jobs_lock:
+            active = [j for j in self.jobs.values() if j.state in ("queued", "running")]
+        for job in active:
+            job.abort_reason = reason
+            job.cancel_event.set()
+        return len(active)
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                job = self.heartbeat.get(self.jobs_q, 0.1)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            self._run_job(job)
+            self.metrics.done(started, ok=job.state == "done")
+
+    def _run_job(self, job: CommandJob) -> None:
+        job.started = time.time()
+        job.state = "running"
+        try:
+            for op in job.ops:
+                if job.abort_reason is not None:
+                    job.state = "aborted"
+                    job.error = job.abort_reason
+                    return
+                if job.cancel_event.is_set():
+                    job.state = "cancelled"
+                    return
+                if ESTOP_LATCH.is_set():
+                    job.state = "aborted"
+                    job.error = "emergency stop"
+                    return
+                job.results.append(self._run_op(job, op))
+                job.completed += 1
+            job.state = "done"
+        except CommandError as e:
+            job.state = "aborted" if ESTOP_LATCH.is_set() or job.abort_reason is not None else "failed"
+            job.error = str(e)
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            logging.exception("Command job %s failed", job.id)
+        finally:
+            job.finished = time.time()
+            if job.state != "done":
+                # leave the robot still: stop the wheels if a drive was cut short
+                self.robot.motors.stop()
+
+    def _await(self, job: CommandJob, q: queue.Queue, expected_s: float) -> None:
+        marker = threading.Event()
+        q.put(marker)
+        deadline = time.monotonic() + expected_s + Config.COMMAND_STEP_TIMEOUT_S
+        while not self.heartbeat.wait(marker, 0.05):
+            if ESTOP_LATCH.is_set():
+                raise CommandError("emergency stop")
+            if job.abort_reason is not None:
+                raise CommandError(job.abort_reason)
+            if time.monotonic() > deadline:
+                raise CommandError("step timed out (queue flushed or subsystem stuck)")
+        if job.abort_reason is not None:  # marker released by stop_robot, not by the subsystem
+            raise CommandError(job.abort_reason)
+
+    def _run_op(self, job: CommandJob, op: Dict[str, Any]) -> Dict[str, Any]:
+        kind = op["op"]
+        robot = self.robot
+        if kind == "drive":
+            robot.motors.drive_for(op["direction"], op["duration_s"])
+            self._await(job, robot.motors.cmd_q, op["duration_s"] + Config.MOTOR_STALL_TIMEOUT)
+            return {"op": kind, "status": "ok"}
+        if kind == "stop":
+            robot.motors.stop()
+            self._await(job, robot.motors.cmd_q, Config.MOTOR_STALL_TIMEOUT)
+            return {"op": kind, "status": "ok"}
+        if kind == "arm":
+            robot.arm.move_to(op["x"], op["y"])
+            self._await(job, robot.arm.cmd_q, 1.0)
+            return {"op": kind, "status": "ok"}
+        if kind == "spray":
+            res = robot.sprayer.spray(duration_s=op["duration_s"], x=op["x"], y=op["y"],
+                                      req_id=f"job-{job.id}", force=op["force"])
+            if res.get("status") in ("rejected", "error"):
+                raise CommandError(f"spray {res.get('status')}: {res.get('message')}")
+            if res.get("status") != "queued":
+                return {"op": kind, "status": res.get("status"), "reason": res.get("reason")}
+            self._await(job, robot.sprayer.cmd_q, op["duration_s"])
+            return {"op": kind, "status": "ok"}
+        # wait: interruptible by e-stop and cancel
+        deadline = time.monotonic() + op["seconds"]
+        while time.monotonic() < deadline:
+            if ESTOP_LATCH.is_set():
+                raise CommandError("emergency stop")
+            if self.heartbeat.wait(job.cancel_event, min(0.05, max(deadline - time.monotonic(), 0.0))):
+                break
+        return {"op": kind, "status": "ok"}
+
+    def stop_thread(self) -> None:
+        self._stop_event.set()
+
 # -------------------------
 # Robot wrapper
 # -------------------------
 class Robot:
     def __init__(self, read_adc_fn: Optional[callable] = None):
-        self.status = StatusManager()
-        self.db = DBLogger(Config.DB_PATH)
-        self.motors = MotorController(self.status)
-        self.arm = Arm(self.status)
-        self.sprayer = Sprayer(self.status, self.db)
-        self.us = Ultrasonic(self.status)
-        self.battery = BatteryMonitor(self.status, read_adc_fn)
+        with STARTUP.phase("init status"):
+            self.status = StatusManager()
+        with STARTUP.phase("init db"):
+            self.db = DBLogger(Config.DB_PATH)
+        with STARTUP.phase("init motors"):
+            self.motors = MotorController(self.status)
+        with STARTUP.phase("init arm"):
+            self.arm = Arm(self.status)
+        with STARTUP.phase("init sprayer"):
+            self.sprayer = Sprayer(self.status, self.db)
+        with STARTUP.phase("init ultrasonic"):
+            self.us = Ultrasonic(self.status)
+        with STARTUP.phase("init battery"):
+            self.battery = BatteryMonitor(self.status, read_adc_fn)
+        self.commands = CommandSequencer(self)
+        self.supervisor = ThreadSupervisor(self.status, {
+            "db": self.db, "motors": self.motors, "arm": self.arm, "sprayer": self.sprayer,
+            "battery": self.battery, "commands": self.commands})
         self._lock = threading.Lock()
+        self._estop_lock = threading.Lock()
+        self.estop_latency = REGISTRY.histogram("robot_estop_latency_seconds", "E-stop trigger to all pins low",
+                                                buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1))
+
+    def coverage_conflict(self) -> Optional[str]:
+        """Why a coverage run can't take the drive right now (None if it can)."""
+        if ESTOP_LATCH.is_set():
+            return "emergency stop engaged; POST /start to resume"
+        current = self.motors.active_coverage()
+        if current is not None:
+            return f"coverage run {current.id} is still {current.state}"
+        if not self.motors.enabled:
+            return "motors are not enabled; POST /start first"
+        job = self.commands.active_job()
+        if job is not None:
+            return f"command job {job.id} is {job.state}; cancel it or wait"
+        return None
+
+    def start_coverage(self, params: Dict[str, Any]) -> CoverageJob:
+        """Validate a POST /coverage body and queue the run; raises CommandError."""
+        conflict = self.coverage_conflict()
+        if conflict is not None:
+            raise CommandError(conflict)
+        swath = _number(params, "swath_m", 0.05, 5.0, Config.COVERAGE_SWATH_M)
+        legs = plan_boustrophedon(_number(params, "width_m", swath, 1000.0),
+                                  _number(params, "length_m", 0.5, 1000.0), swath,
+                                  params.get("first_turn", "right"))
+        speed = _number(params, "speed_mps", 0.05, Config.MOTOR_MAX_SPEED_MPS, Config.COVERAGE_SPEED_MPS)
+        if self.motors.sim_drive is not None:
+            range_fn = lambda: self.motors.sim_drive.range_m() * 100
+        else:
+            range_fn = self.us.get_distance_cm
+        job = CoverageJob(legs, swath, speed, range_fn, lambda: self.battery.voltage)
+        self.motors.cover(job)
+        return job
 
     def start_robot(self) -> Dict[str, Any]:
         with self._lock:
+            ESTOP_LATCH.clear()
             success = self.motors.enable()
             if not success:
                 return {"ok": False, "error": "motors not responding; check connections"}
@@ -692,10 +1632,13 @@ class Robot:
         with self._lock:
             try:
                 self.motors.stop()
-                # clear sprayer queue immediately
+                self.commands.abort_all("robot stopped")
+                # clear sprayer queue immediately; release CommandSequencer markers rather than dropping them
                 try:
                     while not self.sprayer.cmd_q.empty():
-                        self.sprayer.cmd_q.get_nowait()
+                        item = self.sprayer.cmd_q.get_nowait()
+                        if isinstance(item, threading.Event):
+                            item.set()
                 except Exception:
                     pass
                 self.motors.disable()
@@ -709,10 +1652,54 @@ class Robot:
                 return {"ok": False, "error": str(e)}
             return {"ok": True, "message": "robot powered OFF"}
 
+    def _halt_all_pins(self) -> None:
+        for sub in (self.sprayer, self.motors, self.arm):
+            try:
+                sub.halt_pins()
+            except Exception:
+                logging.exception("E-stop: failed to drive %s pins low", type(sub).__name__)
+
+    @staticmethod
+    def _flush(q: queue.Queue) -> int:
+        # drop everything under the queue's own mutex so nothing slips in between
+        with q.mutex:
+            n = len(q.queue)
+            q.queue.clear()
+            q.unfinished_tasks = 0
+            q.all_tasks_done.notify_all()
+            q.not_full.notify_all()
+        return n
+
+    def emergency_stop(self, source: str = "api", triggered_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Fast path: latch, drive motor / pump / servo pins low directly, then flush the
+        motor, arm and sprayer queues. Does not wait behind queued commands or
+        self._lock. Latency is measured from `triggered_at` (perf_counter) to pins low.
+        """
+        t_trigger = triggered_at if triggered_at is not None else time.perf_counter()
+        with self._estop_lock:
+            ESTOP_LATCH.set()
+            self._halt_all_pins()
+            latency = time.perf_counter() - t_trigger
+            flushed = sum(self._flush(q) for q in (self.motors.cmd_q, self.arm.cmd_q, self.sprayer.cmd_q))
+            self.motors.abort_coverage("emergency stop")
+            # a worker may have dequeued a command just before the latch; assert low once more
+            self._halt_all_pins()
+        self.estop_latency.observe(latency)
+        # slower bookkeeping only after the hardware is safe
+        self.status.set_power("OFF")
+        self.status.set_error("estop", f"emergency stop via {source}", ["operator request"])
+        logging.warning("EMERGENCY STOP via %s: pins low in %.3f ms, %d queued commands dropped",
+                        source, latency * 1000, flushed)
+        return {"success": True, "message": "emergency stop engaged", "latency_ms": round(latency * 1000, 3),
+                "flushed": flushed}
+
     def cleanup(self) -> None:
         logging.info("Robot cleanup initiated")
         try:
-            # stop subsystems
+            # stop subsystems (supervisor first, so stopped workers don't read as DEAD)
+            self.supervisor.stop_thread()
+            self.commands.stop_thread()
             self.motors.stop_thread()
             self.arm.stop_thread()
             self.sprayer.stop_thread()
@@ -723,21 +1710,159 @@ class Robot:
         except Exception:
             logging.exception("Error during robot cleanup")
 
+# -------------------------
+# Lazy robot singleton
+# -------------------------
+# Importing this module no longer builds the Robot (threads, GPIO, SQLite, status
+# file). init_robot_async() builds it in the background while the API and the
+# e-stop listener are already answering; get_robot() waits for it.
+class RobotNotReady(RuntimeError):
+    pass
+
+_robot: Optional[Robot] = None
+_robot_error: Optional[str] = None
+_robot_ready = threading.Event()
+_robot_init_lock = threading.Lock()
+_robot_init_started = False
+
+def _build_robot() -> None:
+    global _robot, _robot_error
+    try:
+        _robot = Robot()
+        STARTUP.mark_ready()
+        logging.info("Robot subsystems ready %.0f ms after import", STARTUP.report()["ready_after_ms"])
+    except Exception as e:
+        _robot_error = repr(e)
+        logging.exception("Robot initialisation failed")
+    finally:
+        _robot_ready.set()
+
+def init_robot_async() -> None:
+    """Start building the Robot in a background thread (no-op if already started)."""
+    global _robot_init_started
+    with _robot_init_lock:
+        if _robot_init_started:
+            return
+        _robot_init_started = True
+    threading.Thread(target=_build_robot, name="robot-init", daemon=True).start()
+
+def get_robot(timeout: Optional[float] = None) -> Robot:
+    """The shared Robot, built on first use; raises RobotNotReady if init is slow or failed."""
+    init_robot_async()
+    if not _robot_ready.wait(Config.ROBOT_INIT_WAIT_S if timeout is None else timeout):
+        raise RobotNotReady("robot subsystems are still initialising")
+    if _robot is None:
+        raise RobotNotReady(f"robot initialisation failed: {_robot_error}")
+    return _robot
+
+def emergency_stop(source: str = "api", triggered_at: Optional[float] = None) -> Dict[str, Any]:
+    """E-stop that never waits for init: before the Robot exists, latching is enough."""
+    if _robot is None:
+        ESTOP_LATCH.set()
+        return {"success": True, "message": "emergency stop latched (subsystems not initialised yet)",
+                "latency_ms": 0.0, "flushed": 0}
+    return _robot.emergency_stop(source, triggered_at)
+
+def __getattr__(name: str):
+    # `hardware.robot` is the Robot once it is built, and never blocks or builds it:
+    # until then it is missing (hasattr() is False); call get_robot() to wait for it
+    if name == "robot":
+        if _robot is not None:
+            return _robot
+        raise AttributeError(f"module {__name__!r} has no attribute 'robot' yet; use get_robot()")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# -------------------------
+# Emergency-stop listener (pre-opened local socket)
+# -------------------------
+class EStopListener(threading.Thread):
+    """
+    Line protocol on ESTOP_HOST:ESTOP_PORT. Clients (server.js, emergency_stop.py)
+    keep the connection open and send:
+        STOP  -> engage e-stop, reply {"success": true, "latency_ms": ...}
+        PING  -> {"success": true, "latched": bool}
+    One reply line (JSON) per request.
+    """
+    def __init__(self, host: str = Config.ESTOP_HOST, port: int = Config.ESTOP_PORT):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+
+    def run(self) -> None:
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return  # socket closed
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        buf = b""
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(256)
+                except OSError:
+                    return
+                received = time.perf_counter()
+                if not data:
+                    return
+                buf += data
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    cmd = line.strip().upper()
+                    if cmd == b"STOP":
+                        res = emergency_stop("socket", triggered_at=received)
+                    elif cmd == b"PING":
+                        res = {"success": True, "latched": ESTOP_LATCH.is_set()}
+                    else:
+                        res = {"success": False, "error": f"unknown command {cmd.decode(errors='replace')}"}
+                    try:
+                        conn.sendall(json.dumps(res).encode() + b"\n")
+                    except OSError:
+                        return
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
 # -------------------------
 # Flask API
 # -------------------------
 app = Flask(__name__)
-robot = Robot()
+
+@app.errorhandler(RobotNotReady)
+def _robot_not_ready(e):
+    return jsonify({"status": "error", "message": str(e)}), 503
+
+@app.route("/ready", methods=["GET"])
+def api_ready():
+    """Readiness probe: never blocks on init; 503 until every subsystem is up."""
+    ready = _robot is not None
+    body = {"ready": ready, "error": _robot_error, "startup": STARTUP.report()}
+    return jsonify(body), (200 if ready else 503)
 
 @app.route("/start", methods=["POST"])
 def api_start():
+    robot = get_robot()
     res = robot.start_robot()
     if not res.get("ok"):
         return jsonify(res), 500
     return jsonify(res)
 
+@app.route("/emergency_stop", methods=["POST"])
+def api_emergency_stop():
+    return jsonify(emergency_stop("http"))
+
 @app.route("/stop", methods=["POST"])
 def api_stop():
+    robot = get_robot()
     res = robot.stop_robot()
     if not res.get("ok"):
         return jsonify(res), 500
@@ -745,13 +1870,15 @@ def api_stop():
 
 @app.route("/spray", methods=["POST"])
 def api_spray():
+    robot = get_robot()
     data = request.json or {}
     duration = data.get("duration_s")
     volume = data.get("volume_ml")
     x = data.get("x")
     y = data.get("y")
     try:
-        res = robot.sprayer.spray(duration_s=duration, volume_ml=volume, x=x, y=y, req_id=data.get("req_id"))
+        res = robot.sprayer.spray(duration_s=duration, volume_ml=volume, x=x, y=y, req_id=data.get("req_id"),
+                                  force=bool(data.get("force", False)))
         if res.get("status") == "error":
             return jsonify(res), 500
         return jsonify(res)
@@ -760,12 +1887,173 @@ def api_spray():
         logging.exception("API spray exception")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route("/arm/pixel_targets", methods=["POST"])
+def api_arm_pixel_targets():
+    robot = get_robot()
+    data = request.json or {}
+    boxes = data.get("boxes") or []
+    res = robot.arm.move_to_pixels(boxes)
+    if res.get("status") == "error":
+        return jsonify(res), 500
+    return jsonify(res)
+
+@app.route("/detections", methods=["POST"])
+def api_detections():
+    robot = get_robot()
+    data = request.json or {}
+    events = data.get("detections") or []
+    try:
+        for ev in events:
+            robot.db.log_detection(str(ev["pest"]), ev.get("conf"), ev.get("x"), ev.get("y"),
+                                   ev.get("track_id"), ev.get("camera"))
+    except (KeyError, TypeError) as e:
+        return jsonify({"status": "error", "message": f"bad detection record: {e}"}), 400
+    job = robot.motors.coverage
+    if events and job is not None and job.state == "running":
+        job.hold(Config.COVERAGE_DETECTION_STOP_S)  # detection stop: let the arm / sprayer act
+    return jsonify({"status": "queued", "count": len(events)})
+
+_heatmap = None
+_heatmap_lock = threading.Lock()
+
+def get_heatmap():
+    # numpy / cv2 are only imported once somebody asks for a heatmap
+    global _heatmap
+    with _heatmap_lock:
+        if _heatmap is None:
+            try:
+                from .heatmap import HeatmapService
+            except ImportError:
+                from heatmap import HeatmapService
+            _heatmap = HeatmapService(Config.DB_PATH, Config.HEATMAP_EXTENT, Config.HEATMAP_CELL,
+                                      Config.HEATMAP_STATE_PATH, Config.HEATMAP_REFRESH_S)
+        return _heatmap
+
+@app.route("/heatmap/layers", methods=["GET"])
+def api_heatmap_layers():
+    return jsonify(get_heatmap().layers())
+
+@app.route("/heatmap", methods=["GET"])
+def api_heatmap():
+    layer = request.args.get("layer", "all")
+    try:
+        if request.args.get("format", "png") == "json":
+            return jsonify(get_heatmap().json(layer))
+        tile = request.args.get("tile")
+        tile = tuple(int(v) for v in tile.split(",")) if tile else None
+        png = get_heatmap().png(layer, int(request.args.get("px", 4)), tile)
+        return png, 200, {"Content-Type": "image/png", "Cache-Control": "no-cache"}
+    except KeyError as e:
+        return jsonify({"status": "error", "message": f"no such layer / tile: {e}"}), 404
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/sync/pesticide_log", methods=["GET"])
+def api_sync_pesticide_log():
+    # rows with id > after, as a compressed binary batch (see ai/log_sync.py)
+    try:
+        from .log_sync import read_batch
+    except ImportError:
+        from log_sync import read_batch
+    try:
+        after = int(request.args.get("after", 0))
+        limit = min(int(request.args.get("limit", Config.SYNC_MAX_BATCH_ROWS)), Config.SYNC_MAX_BATCH_ROWS)
+    except ValueError:
+        return jsonify({"status": "error", "message": "after / limit must be integers"}), 400
+    body = read_batch(Config.DB_PATH, Config.ROBOT_ID, after, limit)
+    return body, 200, {"Content-Type": "application/octet-stream"}
+
+@app.route("/commands", methods=["POST"])
+def api_commands():
+    robot = get_robot()
+    data = request.json or {}
+    try:
+        job = robot.commands.submit(data.get("ops"))
+    except CommandError as e:
+        busy = robot.motors.active_coverage() is not None
+        return jsonify({"status": "error", "message": str(e)}), (409 if ESTOP_LATCH.is_set() or busy else 400)
+    return jsonify({"status": "queued", "job_id": job.id, "total": len(job.ops),
+                    "jobs_ahead": max(robot.commands.jobs_q.qsize() - 1, 0)}), 202
+
+@app.route("/commands/<job_id>", methods=["GET"])
+def api_command_job(job_id):
+    robot = get_robot()
+    job = robot.commands.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/commands/<job_id>", methods=["DELETE"])
+def api_command_cancel(job_id):
+    robot = get_robot()
+    job = robot.commands.cancel(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "unknown job"}), 404
+    return jsonify({"status": "cancelling", "job_id": job_id, "state": job.state})
+
+@app.route("/coverage", methods=["POST"])
+def api_coverage_start():
+    robot = get_robot()
+    try:
+        job = robot.start_coverage(request.json or {})
+    except CommandError as e:
+        busy = robot.coverage_conflict() is not None
+        return jsonify({"status": "error", "message": str(e)}), (409 if busy else 400)
+    except ValueError as e:  # plan_boustrophedon
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(job.to_dict()), 202
+
+@app.route("/coverage", methods=["GET"])
+def api_coverage():
+    robot = get_robot()
+    job = robot.motors.coverage
+    if job is None:
+        return jsonify({"status": "error", "message": "no coverage run"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/coverage", methods=["DELETE"])
+def api_coverage_cancel():
+    robot = get_robot()
+    robot.motors.abort_coverage("cancelled")
+    job = robot.motors.coverage
+    return jsonify({"status": "cancelling", "state": job.state if job else None})
+
+@app.route("/coverage/hold", methods=["POST"])
+def api_coverage_hold():
+    robot = get_robot()
+    job = robot.motors.coverage
+    if job is None or job.state != "running":
+        return jsonify({"status": "error", "message": "no coverage run in progress"}), 409
+    try:
+        seconds = _number(request.json or {}, "seconds", 0.0, 600.0, Config.COVERAGE_DETECTION_STOP_S)
+    except CommandError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    job.hold(seconds)
+    return jsonify({"status": "ok", "hold_s": seconds})
+
+@app.route("/spray/history", methods=["GET"])
+def api_spray_history():
+    robot = get_robot()
+    return jsonify(robot.sprayer.history.stats())
+
+@app.route("/metrics", methods=["GET"])
+def api_metrics():
+    return REGISTRY.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.route("/threads", methods=["GET"])
+def api_threads():
+    robot = get_robot()
+    # live view: heartbeat age, OK / STALLED / DEAD and wake-lag percentiles per worker thread
+    return jsonify(robot.supervisor.snapshot())
+
 @app.route("/status", methods=["GET"])
 def api_status():
+    robot = get_robot()
     return jsonify(robot.status.get_snapshot())
 
 @app.route("/report", methods=["GET"])
 def api_report():
+    robot = get_robot()
     date_str = request.args.get("date")
     try:
         date_obj = None
@@ -778,6 +2066,7 @@ def api_report():
 
 @app.route("/motors/forward", methods=["POST"])
 def api_motors_forward():
+    robot = get_robot()
     if not robot.motors:
         return jsonify({"status": "error", "message": "motors not available"}), 500
     try:
@@ -789,6 +2078,7 @@ def api_motors_forward():
 
 @app.route("/motors/stop", methods=["POST"])
 def api_motors_stop():
+    robot = get_robot()
     try:
         robot.motors.stop()
         return jsonify({"status": "ok"})
@@ -796,9 +2086,26 @@ def api_motors_stop():
         robot.status.set_error("motors", f"stop failed: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route("/battery", methods=["GET"])
+def api_battery():
+    robot = get_robot()
+    # O(1): reads the running fit, no history scan
+    return jsonify(robot.battery.estimate())
+
+@app.route("/battery/history", methods=["GET"])
+def api_battery_history():
+    robot = get_robot()
+    resolution = request.args.get("resolution", "raw")
+    since = request.args.get("since", type=float)
+    try:
+        return jsonify({"resolution": resolution, "samples": robot.battery.history.series(resolution, since)})
+    except KeyError:
+        return jsonify({"status": "error", "message": "resolution must be raw, 1m or 10m"}), 400
+
 # Optional endpoint: trigger manual battery read
 @app.route("/battery/read", methods=["GET"])
 def api_battery_read():
+    robot = get_robot()
     try:
         v = robot.battery.read_voltage()
         return jsonify({"status": "ok", "voltage": v})
@@ -809,6 +2116,7 @@ def api_battery_read():
 # Manual shutdown endpoint (robot-level, not Pi OS shutdown)
 @app.route("/manual_shutdown", methods=["POST"])
 def api_manual_shutdown():
+    robot = get_robot()
     try:
         res = robot.stop_robot()
         robot.cleanup()
@@ -827,8 +2135,9 @@ def api_manual_shutdown():
 def _graceful_exit(signum, frame):
     logging.info("Received signal %s — shutting down gracefully", signum)
     try:
-        robot.stop_robot()
-        robot.cleanup()
+        if _robot is not None:
+            _robot.stop_robot()
+            _robot.cleanup()
         try:
             GPIO.cleanup()
         except Exception:
@@ -842,24 +2151,49 @@ def _graceful_exit(signum, frame):
 signal.signal(signal.SIGINT, _graceful_exit)
 signal.signal(signal.SIGTERM, _graceful_exit)
 
+STARTUP.add("import ai.hardware (total)", time.perf_counter() - _import_started)
+
+def print_startup_profile() -> None:
+    """Build the Robot in the foreground and print how long each phase took."""
+    get_robot(timeout=60)
+    rep = STARTUP.report()
+    width = max(len(p["phase"]) for p in rep["phases"])
+    for p in rep["phases"]:
+        print(f"{p['phase']:<{width}}  {p['ms']:>8.1f} ms")
+    print(f"{'ready after':<{width}}  {rep['ready_after_ms']:>8.1f} ms")
+
 # -------------------------
 # MAIN
 # -------------------------
 if __name__ == "__main__":
-    # Setup GPIO mode (if available)
+    # Setup GPIO mode (if available) before any subsystem claims pins
     try:
         if HW_AVAILABLE:
             GPIO.setmode(Config.GPIO_MODE)
     except Exception:
         logging.warning("Failed to set GPIO mode (simulation?)")
 
+    if "--profile-startup" in sys.argv:
+        print_startup_profile()
+        _robot.cleanup()
+        sys.exit(0)
+
+    try:
+        EStopListener().start()
+        logging.info("E-stop listener on %s:%s", Config.ESTOP_HOST, Config.ESTOP_PORT)
+    except OSError:
+        logging.exception("E-stop listener failed to start; only POST /emergency_stop is available")
+
+    # subsystems come up in the background; /ready reports when they are done
+    init_robot_async()
     logging.info("Starting Robot Server on %s:%s", Config.WEB_HOST, Config.WEB_PORT)
     try:
         app.run(host=Config.WEB_HOST, port=Config.WEB_PORT)
     finally:
         logging.info("Shutting down Robot Server main")
         try:
-            robot.cleanup()
+            if _robot is not None:
+                _robot.cleanup()
             GPIO.cleanup()
         except Exception:
             pass
@@ -0,0 +1,330 @@
+"""
+Field heatmaps of pest pressure (per detection class) and spraying, from the robot's log DB.
+
+- HeatmapGrid keeps one count grid per layer ("all", "spray", and one per pest
+  class). A batch of new events is binned with one np.bincount over
+  (class, cell) indices, i.e. a 2-D histogram per class of just that batch,
+  added onto the grids
+- HeatmapService pulls only detection_log / pesticide_log rows with id above its
+  high-water marks (at most once per refresh_s), so the grids are never rebuilt
+  from scratch; grids and marks are persisted to an .npz so restarts resume
+- rendered PNGs / JSON grids are cached per layer and reused until that layer's
+  version changes
+
+Coordinates are field units (same as spray x / y); events outside the extent are
+counted in `dropped`.
+
+Run from the SMART PESTICIDE SYSTEM folder:
+    python -m ai.heatmap render --layer aphid --out aphid.png [--db pesticide_log.db]
+    python -m ai.heatmap bench [--events 5000000]
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_EXTENT = (0.0, 0.0, 5000.0, 5000.0)  # x0, y0, x1, y1
+DEFAULT_CELL = 50.0
+ALL_LAYER = "all"
+SPRAY_LAYER = "spray"
+MAX_PX_PER_CELL = 16  # 100 x 100 cells -> at most a 1600 x 1600 PNG
+CACHE_ENTRIES = 64
+
+
+def _check_px(px_per_cell: int) -> None:
+    if not 1 <= px_per_cell <= MAX_PX_PER_CELL:
+        raise ValueError(f"px must be between 1 and {MAX_PX_PER_CELL}")
+
+
+class HeatmapGrid:
+    def __init__(self, extent: Tuple[float, float, float, float] = DEFAULT_EXTENT, cell: float = DEFAULT_CELL):
+        x0, y0, x1, y1 = extent
+        if cell <= 0 or x1 <= x0 or y1 <= y0:
+            raise ValueError("need a positive cell size and a non-empty extent")
+        self.extent = (float(x0), float(y0), float(x1), float(y1))
+        self.cell = float(cell)
+        self.nx = int(np.ceil((x1 - x0) / cell))
+        self.ny = int(np.ceil((y1 - y0) / cell))
+        self.layers: Dict[str, np.ndarray] = {}
+        self.versions: Dict[str, int] = {}
+        self.dropped = 0
+
+    def _layer(self, name: str) -> np.ndarray:
+        if name not in self.layers:
+            self.layers[name] = np.zeros((self.ny, self.nx), np.int64)
+            self.versions[name] = 0
+        return self.layers[name]
+
+    def _cells(self, x, y):
+        """Flat cell index of every point, and the mask of points inside the extent."""
+        x0, y0, _, _ = self.extent
+        ix = np.floor((np.asarray(x, np.float64) - x0) / self.cell).astype(np.int64)
+        iy = np.floor((np.asarray(y, np.float64) - y0) / self.cell).astype(np.int64)
+        inside = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        self.dropped += int(inside.size - np.count_nonzero(inside))
+        return iy * self.nx + ix, inside
+
+    def _accumulate(self, layer: str, counts: np.ndarray) -> None:
+        grid = self._layer(layer)
+        grid += counts.reshape(self.ny, self.nx)
+        self.versions[layer] += 1
+
+    def add(self, layer: str, x, y) -> int:
+        """Bin a batch of points into `layer`; returns how many landed inside the extent."""
+        flat, inside = self._cells(x, y)
+        flat = flat[inside]
+        if flat.size:
+            self._accumulate(layer, np.bincount(flat, minlength=self.nx * self.ny))
+        return int(flat.size)
+
+    def add_classified(self, classes, x, y) -> int:
+        """Bin detections into the "all" layer and one layer per class label, in one bincount."""
+        codes_of: Dict[str, int] = {}
+        codes = np.fromiter((codes_of.setdefault(c, len(codes_of)) for c in classes), np.int64, count=len(classes))
+        flat, inside = self._cells(x, y)
+        if not inside.any():
+            return 0
+        ncells = self.nx * self.ny
+        counts = np.bincount(codes[inside] * ncells + flat[inside], minlength=len(codes_of) * ncells)
+        counts = counts.reshape(len(codes_of), ncells)
+        for label, code in codes_of.items():
+            if counts[code].any():
+                self._accumulate(str(label), counts[code])
+        self._accumulate(ALL_LAYER, counts.sum(axis=0))
+        return int(np.count_nonzero(inside))
+
+    # --- output ---
+    def to_json(self, layer: str) -> Dict:
+        grid = self.layers.get(layer)
+        if grid is None:
+            raise KeyError(layer)
+        return {"layer": layer, "extent": list(self.extent), "cell": self.cell, "shape": [self.ny, self.nx],
+                "total": int(grid.sum()), "max": int(grid.max()), "counts": grid.tolist()}
+
+    def render_png(self, layer: str, px_per_cell: int = 4, tile: Optional[Tuple[int, int]] = None,
+                   tile_cells: int = 64) -> bytes:
+        """Log-scaled colour-mapped PNG of a layer (or of one tile_cells x tile_cells tile)."""
+        import cv2
+        _check_px(px_per_cell)
+        grid = self.layers.get(layer)
+        if grid is None:
+            raise KeyError(layer)
+        if tile is not None:
+            tx, ty = tile
+            grid = grid[ty * tile_cells:(ty + 1) * tile_cells, tx * tile_cells:(tx + 1) * tile_cells]
+            if grid.size == 0:
+                raise KeyError(f"tile {tile} outside the grid")
+        # log scale so a few hot spots don't wash out the rest; normalised to the whole layer's max
+        peak = np.log1p(self.layers[layer].max()) or 1.0
+        img = (np.log1p(grid) * (255.0 / peak)).astype(np.uint8)
+        img = cv2.applyColorMap(img, cv2.COLORMAP_INFERNO)
+        img = cv2.resize(img, (img.shape[1] * px_per_cell, img.shape[0] * px_per_cell),
+                         interpolation=cv2.INTER_NEAREST)
+        img = cv2.flip(img, 0)  # field y grows upwards, image rows grow downwards
+        ok, buf = cv2.imencode(".png", img)
+        if not ok:
+            raise RuntimeError("PNG encoding failed")
+        return buf.tobytes()
+
+    # --- persistence ---
+    def save(self, path: str, marks: Dict[str, int]) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, extent=np.array(self.extent), cell=self.cell, dropped=self.dropped,
+                 layer_names=np.array(list(self.layers), dtype=str),
+                 marks=np.array([marks.get("detections", 0), marks.get("spray", 0)]),
+                 **{f"layer_{i}": g for i, g in enumerate(self.layers.values())})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, extent, cell) -> Tuple["HeatmapGrid", Dict[str, int]]:
+        """Saved grids if they match extent / cell, else an empty grid (marks reset to 0)."""
+        grid = cls(extent, cell)
+        try:
+            data = np.load(path)
+        except (OSError, ValueError):
+            return grid, {"detections": 0, "spray": 0}
+        if tuple(data["extent"]) != grid.extent or float(data["cell"]) != grid.cell:
+            return grid, {"detections": 0, "spray": 0}
+        for i, name in enumerate(data["layer_names"]):
+            grid.layers[str(name)] = data[f"layer_{i}"].astype(np.int64)
+            grid.versions[str(name)] = 0
+        grid.dropped = int(data["dropped"])
+        det, spray = (int(v) for v in data["marks"])
+        return grid, {"detections": det, "spray": spray}
+
+
+class _Recreated(Exception):
+    pass
+
+
+class HeatmapService:
+    """Thread-safe, incrementally refreshed heatmaps over the robot's SQLite log."""
+
+    def __init__(self, db_path: str, extent=DEFAULT_EXTENT, cell: float = DEFAULT_CELL,
+                 state_path: Optional[str] = None, refresh_s: float = 5.0):
+        self.db_path = db_path
+        self.state_path = state_path
+        self.refresh_s = refresh_s
+        self._lock = threading.Lock()
+        if state_path:
+            self.grid, self.marks = HeatmapGrid.load(state_path, extent, cell)
+        else:
+            self.grid, self.marks = HeatmapGrid(extent, cell), {"detections": 0, "spray": 0}
+        self._refreshed_at = 0.0
+        # key -> (layer version, rendered output), least recently used first
+        self._cache: "OrderedDict[tuple, Tuple[int, object]]" = OrderedDict()
+
+    def _new_rows(self, conn, table: str, cols: str, mark: int):
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            return mark, []
+        max_id = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+        if max_id < mark:
+            raise _Recreated()
+        rows = conn.execute(f"SELECT {cols} FROM {table} WHERE id > ? AND id <= ? "
+                            "AND x IS NOT NULL AND y IS NOT NULL", (mark, max_id)).fetchall()
+        return max_id, rows
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.refresh_s:
+                return
+            self._refreshed_at = time.monotonic()
+            if not os.path.exists(self.db_path):
+                return
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=2.0)
+            try:
+                try:
+                    det_mark, det_rows = self._new_rows(conn, "detection_log", "pest, x, y", self.marks["detections"])
+                    spray_mark, spray_rows = self._new_rows(conn, "pesticide_log", "x, y", self.marks["spray"])
+                except _Recreated:
+                    # database was recreated: start over from its first row
+                    self.grid = HeatmapGrid(self.grid.extent, self.grid.cell)
+                    self.marks = {"detections": 0, "spray": 0}
+                    self._cache.clear()
+                    det_mark, det_rows = self._new_rows(conn, "detection_log", "pest, x, y", 0)
+                    spray_mark, spray_rows = self._new_rows(conn, "pesticide_log", "x, y", 0)
+            finally:
+                conn.close()
+            if det_rows:
+                pest, x, y = zip(*det_rows)
+                self.grid.add_classified(pest, np.array(x), np.array(y))
+            if spray_rows:
+                x, y = zip(*spray_rows)
+                self.grid.add(SPRAY_LAYER, np.array(x), np.array(y))
+            changed = (det_mark, spray_mark) != (self.marks["detections"], self.marks["spray"])
+            self.marks = {"detections": det_mark, "spray": spray_mark}
+            if changed and self.state_path:
+                self.grid.save(self.state_path, self.marks)
+
+    def _cached(self, key: tuple, layer: str, build):
+        with self._lock:
+            if layer not in self.grid.layers:
+                raise KeyError(layer)
+            version = self.grid.versions[layer]
+            hit = self._cache.get(key)
+            if hit is not None and hit[0] == version:
+                self._cache.move_to_end(key)
+                return hit[1]
+            out = build()
+            self._cache[key] = (version, out)
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+            return out
+
+    def layers(self) -> Dict:
+        self.refresh()
+        with self._lock:
+            return {"layers": {name: int(g.sum()) for name, g in self.grid.layers.items()},
+                    "dropped": self.grid.dropped, "extent": list(self.grid.extent), "cell": self.grid.cell}
+
+    def json(self, layer: str = ALL_LAYER) -> Dict:
+        self.refresh()
+        return self._cached(("json", layer), layer, lambda: self.grid.to_json(layer))
+
+    def png(self, layer: str = ALL_LAYER, px_per_cell: int = 4, tile: Optional[Tuple[int, int]] = None) -> bytes:
+        _check_px(px_per_cell)
+        self.refresh()
+        return self._cached(("png", layer, px_per_cell, tile), layer,
+                            lambda: self.grid.render_png(layer, px_per_cell, tile))
+
+
+# -------------------------
+# CLI
+# -------------------------
+def _cmd_render(args) -> None:
+    svc = HeatmapService(args.db, cell=args.cell)
+    svc.refresh(force=True)
+    with open(args.out, "wb") as f:
+        f.write(svc.png(args.layer, args.px))
+    print(f"Wrote {args.out}: {svc.layers()}")
+
+
+def _cmd_bench(args) -> None:
+    rng = np.random.default_rng(0)
+    classes = np.array(["aphid", "fruit fly", "scale_insect"])
+    n = args.events
+    x0, y0, x1, y1 = DEFAULT_EXTENT
+    # clustered pressure: a few hot spots plus uniform background
+    centres = rng.uniform([x0, y0], [x1, y1], size=(8, 2))
+    pts = centres[rng.integers(0, 8, n)] + rng.normal(0, 250, (n, 2))
+    labels = classes[rng.integers(0, 3, n)].tolist()  # str column, as read from SQLite
+    grid = HeatmapGrid(DEFAULT_EXTENT, args.cell)
+
+    t0 = time.perf_counter()
+    grid.add_classified(labels, pts[:, 0], pts[:, 1])
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ref, _, _ = np.histogram2d(pts[:, 1], pts[:, 0], bins=(grid.ny, grid.nx), range=((y0, y0 + grid.ny * args.cell),
+                                                                                    (x0, x0 + grid.nx * args.cell)))
+    hist2d = time.perf_counter() - t0
+    assert np.array_equal(ref.astype(np.int64), grid.layers[ALL_LAYER])
+
+    batch = 1000
+    t0 = time.perf_counter()
+    for _ in range(100):
+        grid.add_classified(labels[:batch], pts[:batch, 0], pts[:batch, 1])
+    incr = (time.perf_counter() - t0) / 100
+
+    t0 = time.perf_counter()
+    png = grid.render_png("aphid")
+    render = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    grid.to_json("aphid")
+    as_json = time.perf_counter() - t0
+
+    print(f"Grid {grid.nx}x{grid.ny} cells of {args.cell:g} units, {n:,} events, 3 classes")
+    print(f"{'full build (all 4 layers, one bincount)':<40}{build * 1000:>9.1f} ms")
+    print(f"{'np.histogram2d, all-class layer only':<40}{hist2d * 1000:>9.1f} ms")
+    print(f"{'incremental add of 1,000 events':<40}{incr * 1000:>9.2f} ms")
+    print(f"{'render PNG (uncached)':<40}{render * 1000:>9.1f} ms  ({len(png) / 1024:.0f} KiB)")
+    print(f"{'JSON grid (uncached)':<40}{as_json * 1000:>9.1f} ms")
+    print("cached PNG / JSON: dictionary lookup until the layer changes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pest-pressure / spray heatmaps from the robot log DB")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    render = sub.add_parser("render", help="write one layer as a PNG")
+    render.add_argument("--db", default="pesticide_log.db")
+    render.add_argument("--layer", default=ALL_LAYER)
+    render.add_argument("--cell", type=float, default=DEFAULT_CELL)
+    render.add_argument("--px", type=int, default=4, help=f"pixels per grid cell (1-{MAX_PX_PER_CELL})")
+    render.add_argument("--out", default="heatmap.png")
+    render.set_defaults(func=_cmd_render)
+    bench = sub.add_parser("bench", help="binning / rendering cost at scale")
+    bench.add_argument("--events", type=int, default=5_000_000)
+    bench.add_argument("--cell", type=float, default=DEFAULT_CELL)
+    bench.set_defaults(func=_cmd_bench)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
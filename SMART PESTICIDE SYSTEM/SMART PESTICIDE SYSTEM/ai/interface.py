@@ -1,18 +1,23 @@
 # Wrapper interface to avoid modifying original AI/hardware files.
 # Exposes safe functions for robot_server.
 
-try:
-    from . import real_time_ai
-except Exception:
-    real_time_ai = None
+import importlib
 
-try:
-    from . import hardware as orig_hardware
-except Exception:
-    orig_hardware = None
+# Modules are imported on first use, not at import time: real_time_ai pulls in
+# TensorFlow and hardware brings up GPIO, so importing this wrapper stays cheap.
+_modules = {}
+
+def _load(name):
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(f".{name}", __package__)
+        except Exception:
+            _modules[name] = None
+    return _modules[name]
 
 def detect_pest():
     """Call AI detector and return (coords, pest)."""
+    real_time_ai = _load("real_time_ai")
     if real_time_ai is None:
         return None, None
     for name in ('detect_pest', 'run_detection', 'infer', 'detect'):
@@ -31,6 +36,7 @@ def detect_pest():
     return None, None
 
 def read_battery():
+    orig_hardware = _load("hardware")
     if orig_hardware is None:
         return 0
     for name in ('read_battery', 'get_battery_percent', 'battery_level'):
@@ -43,6 +49,7 @@ def read_battery():
     return 0
 
 def move_to(coords):
+    orig_hardware = _load("hardware")
     if orig_hardware is None: return
     for name in ('move_to', 'goto', 'move'):
         fn = getattr(orig_hardware, name, None)
@@ -51,6 +58,7 @@ def move_to(coords):
             except Exception: continue
 
 def buzzer_alert():
+    orig_hardware = _load("hardware")
     if orig_hardware is None: return
     for name in ('buzzer_alert', 'buzzer_on', 'buzz'):
         fn = getattr(orig_hardware, name, None)
@@ -59,6 +67,7 @@ def buzzer_alert():
             except Exception: continue
 
 def shutdown():
+    orig_hardware = _load("hardware")
     if orig_hardware is None: return
     for name in ('shutdown', 'safe_shutdown', 'stop_all'):
         fn = getattr(orig_hardware, name, None)
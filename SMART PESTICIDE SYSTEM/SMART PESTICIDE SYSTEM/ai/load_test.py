@@ -0,0 +1,289 @@
+"""
+HTTP load test for the robot API (hardware.py, or robot_server.py with --mix robot_server).
+
+N worker threads each loop: pick an endpoint from the weighted mix, send it,
+record latency and status. Any non-2xx status or transport error counts as an
+error. Per endpoint you get request count, throughput, p50 / p90 / p99 / max
+latency and error rate.
+
+Results can be saved as a JSON baseline and later runs compared against it;
+the comparison exits non-zero when throughput, p90 latency or error rate
+regress beyond the tolerance.
+
+Run from the SMART PESTICIDE SYSTEM folder:
+    python -m ai.load_test --spawn --concurrency 8 --duration 20 --save baseline.json
+    python -m ai.load_test --spawn --compare baseline.json
+    python -m ai.load_test --url http://10.0.0.11:5000 --mix "GET /status=80,POST /spray=20"
+
+--spawn starts the simulated hardware API (GPIO mocked) in a child process on a
+free port in a temp directory, so the robot's real DB and status file are untouched.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# "METHOD /path" -> weight; POST bodies below.
+# POST /start is not in the hardware mix: under --spawn the encoder check in
+# MotorController.enable always fails, and each call holds the robot lock for
+# ~1.6 s, which would serialise the other endpoints. Use "hardware_start" on a
+# real robot to load the start path.
+MIXES = {
+    "hardware": {
+        "GET /status": 50,
+        "POST /spray": 20,
+        "GET /report": 15,
+        "POST /motors/forward": 15,
+    },
+    "hardware_start": {
+        "GET /status": 50,
+        "POST /spray": 20,
+        "GET /report": 15,
+        "POST /motors/forward": 10,
+        "POST /start": 5,
+    },
+    "robot_server": {
+        "GET /status": 70,
+        "GET /report": 20,
+        "POST /start": 5,
+        "POST /stop": 5,
+    },
+}
+BODIES = {
+    "POST /spray": {"duration_s": 0.05},
+}
+DEFAULT_TOLERANCE = 0.2
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """ "GET /status=60,POST /spray=40" or a named mix. """
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for item in spec.split(","):
+        route, _, weight = item.strip().rpartition("=")
+        method, _, path = route.partition(" ")
+        if method not in ("GET", "POST") or not path.startswith("/"):
+            raise argparse.ArgumentTypeError(f"bad mix entry {item!r} (expected 'GET /path=weight')")
+        mix[f"{method} {path}"] = float(weight)
+    return mix
+
+
+# -------------------------
+# Load generation
+# -------------------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, endpoint: str, latency: float, status: str, ok: bool) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def _request(base: str, endpoint: str, timeout: float) -> Tuple[str, bool]:
+    method, path = endpoint.split(" ", 1)
+    body = BODIES.get(endpoint)
+    data = json.dumps(body).encode() if body is not None else (b"{}" if method == "POST" else None)
+    req = urllib.request.Request(base + path, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return str(resp.status), 200 <= resp.status < 300
+    except urllib.error.HTTPError as e:
+        e.read()
+        return str(e.code), False
+    except (OSError, urllib.error.URLError) as e:
+        return type(e).__name__, False
+
+
+def run_load(base: str, mix: Dict[str, float], concurrency: int, duration_s: float,
+             think_s: float = 0.0, timeout: float = 10.0, seed: int = 0) -> dict:
+    endpoints, weights = list(mix), list(mix.values())
+    rec = Recorder()
+    deadline = time.perf_counter() + duration_s
+
+    def worker(i: int) -> None:
+        rng = random.Random(seed + i)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            t0 = time.perf_counter()
+            status, ok = _request(base, endpoint, timeout)
+            rec.add(endpoint, time.perf_counter() - t0, status, ok)
+            if think_s:
+                time.sleep(think_s)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return summarize(rec, wall, {"url": base, "concurrency": concurrency, "duration_s": duration_s,
+                                 "think_s": think_s, "mix": mix})
+
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+def summarize(rec: Recorder, wall: float, config: dict) -> dict:
+    endpoints = {}
+    for endpoint, lats in rec.latencies.items():
+        lats = sorted(lats)
+        endpoints[endpoint] = {
+            "requests": len(lats),
+            "rps": round(len(lats) / wall, 2),
+            "p50_ms": round(_pct(lats, 0.50) * 1000, 2),
+            "p90_ms": round(_pct(lats, 0.90) * 1000, 2),
+            "p99_ms": round(_pct(lats, 0.99) * 1000, 2),
+            "max_ms": round(lats[-1] * 1000, 2),
+            "error_rate": round(rec.errors[endpoint] / len(lats), 4),
+            "statuses": dict(rec.statuses[endpoint]),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(rec.errors.values())
+    return {
+        "config": config,
+        "wall_s": round(wall, 2),
+        "total": {"requests": total, "rps": round(total / wall, 2),
+                  "error_rate": round(errors / total, 4) if total else 0.0},
+        "endpoints": dict(sorted(endpoints.items())),
+    }
+
+
+def print_report(res: dict) -> None:
+    print(f"{'endpoint':<24}{'reqs':>7}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'errors':>8}  statuses")
+    for endpoint, e in res["endpoints"].items():
+        print(f"{endpoint:<24}{e['requests']:>7}{e['rps']:>9.1f}{e['p50_ms']:>9.1f}{e['p90_ms']:>9.1f}"
+              f"{e['p99_ms']:>9.1f}{e['max_ms']:>9.1f}{e['error_rate'] * 100:>7.1f}%  {e['statuses']}")
+    t = res["total"]
+    print(f"{'TOTAL':<24}{t['requests']:>7}{t['rps']:>9.1f}{'':>36}{t['error_rate'] * 100:>7.1f}%")
+
+
+# -------------------------
+# Baseline comparison
+# -------------------------
+def compare(res: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Human-readable regressions of `res` against `baseline` (empty list = no regression)."""
+    problems = []
+    for endpoint, old in baseline["endpoints"].items():
+        new = res["endpoints"].get(endpoint)
+        if new is None:
+            continue
+        if new["rps"] < old["rps"] * (1 - tolerance):
+            problems.append(f"{endpoint}: throughput {old['rps']} -> {new['rps']} req/s")
+        if new["p90_ms"] > old["p90_ms"] * (1 + tolerance) and new["p90_ms"] - old["p90_ms"] > 1.0:
+            problems.append(f"{endpoint}: p90 {old['p90_ms']} -> {new['p90_ms']} ms")
+        if new["error_rate"] > old["error_rate"] + 0.01:
+            problems.append(f"{endpoint}: error rate {old['error_rate']:.2%} -> {new['error_rate']:.2%}")
+    return problems
+
+
+# -------------------------
+# Simulated server
+# -------------------------
+_SERVE = """
+from ai import hardware
+hardware.init_robot_async()
+hardware.app.run(host="127.0.0.1", port={port}, threaded=True)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_simulated_server(workdir: str, timeout: float = 60.0) -> Tuple[subprocess.Popen, str]:
+    """Start hardware.py's API (simulation mode) in a child process; returns (process, base URL)."""
+    port = _free_port()
+    pkg_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=pkg_root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen([sys.executable, "-c", _SERVE.format(port=port)], cwd=workdir, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"simulated server exited (see {log.name})")
+        try:
+            with urllib.request.urlopen(base + "/ready", timeout=1.0):
+                return proc, base
+        except (OSError, urllib.error.URLError):
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("simulated server did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load test for the robot API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument("--spawn", action="store_true", help="start the simulated hardware API in a child process")
+    parser.add_argument("--mix", type=parse_mix, default=MIXES["hardware"],
+                        help=f"named mix ({', '.join(MIXES)}) or 'GET /status=60,POST /spray=40'")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause per worker between requests")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions (exit 1 on regression)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    proc, tmp = None, None
+    base = args.url.rstrip("/") if args.url else None
+    try:
+        if args.spawn:
+            tmp = tempfile.TemporaryDirectory()
+            proc, base = spawn_simulated_server(tmp.name)
+            print(f"Simulated hardware API at {base}")
+        res = run_load(base, args.mix, args.concurrency, args.duration, args.think_ms / 1000, args.timeout)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if tmp is not None:
+            tmp.cleanup()
+
+    print_report(res)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(res, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(res, json.load(f), args.tolerance)
+        if problems:
+            print("REGRESSIONS vs baseline:\n  " + "\n  ".join(problems))
+            sys.exit(1)
+        print(f"No regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Season-level aggregates over the Parquet log store written by ai.log_export.
+
+Every query is a polars lazy scan over the hive-partitioned dataset, so:
+- a date range prunes whole date=... directories before any file is opened
+- only the columns a query references are decoded
+- filters and group-bys run multi-threaded on columns, not row by row in Python
+
+CLI (run from the SMART PESTICIDE SYSTEM folder):
+    python -m ai.log_analytics daily [--root logs_parquet] [--start 2025-06-01] [--end 2025-09-30]
+    python -m ai.log_analytics grid [--cell 100]
+    python -m ai.log_analytics durations
+    python -m ai.log_analytics detections
+    python -m ai.log_analytics bench [--rows 3000000]
+"""
+
+import argparse
+import glob
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional, Sequence
+
+import polars as pl
+
+try:
+    from .log_export import DEFAULT_OUT, TABLES, export
+except ImportError:
+    from log_export import DEFAULT_OUT, TABLES, export
+
+DEFAULT_CELL = 100.0  # grid cell edge, in the units of the spray x / y coordinates
+DEFAULT_DURATION_BINS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def scan(root: str, dataset: str, start: Optional[date] = None, end: Optional[date] = None) -> pl.LazyFrame:
+    """Lazy frame over one dataset ("spray" / "detections"), restricted to [start, end] days."""
+    pattern = os.path.join(root, dataset, "**", "*.parquet")
+    if glob.glob(pattern, recursive=True):
+        lf = pl.scan_parquet(pattern, hive_partitioning=True)
+    else:
+        # nothing exported yet: polars refuses to scan an empty glob, so query an empty frame
+        schema = {**TABLES[dataset][1], "ts": pl.Datetime("us"), "date": pl.Date}
+        lf = pl.LazyFrame(schema=schema)
+    if start is not None:
+        lf = lf.filter(pl.col("date") >= start)
+    if end is not None:
+        lf = lf.filter(pl.col("date") <= end)
+    return lf
+
+
+# -------------------------
+# Queries
+# -------------------------
+def daily_dosage(root: str = DEFAULT_OUT, start: Optional[date] = None, end: Optional[date] = None) -> pl.DataFrame:
+    """Per day: spray count, ml, area, ml per m2 and pump-on seconds."""
+    return (
+        scan(root, "spray", start, end)
+        .group_by("date")
+        .agg(pl.len().alias("sprays"),
+             pl.col("ml_used").sum().alias("ml"),
+             pl.col("area_m2").sum().alias("area_m2"),
+             pl.col("duration_s").sum().alias("spray_s"))
+        .with_columns((pl.col("ml") / pl.col("area_m2")).alias("ml_per_m2"))
+        .sort("date")
+        .collect()
+    )
+
+
+def grid_counts(root: str = DEFAULT_OUT, cell: float = DEFAULT_CELL, start: Optional[date] = None,
+                end: Optional[date] = None) -> pl.DataFrame:
+    """Sprays and ml per (cell_x, cell_y) square of the field, busiest first."""
+    return (
+        scan(root, "spray", start, end)
+        .filter(pl.col("x").is_not_null() & pl.col("y").is_not_null())
+        .group_by((pl.col("x") / cell).floor().cast(pl.Int32).alias("cell_x"),
+                  (pl.col("y") / cell).floor().cast(pl.Int32).alias("cell_y"))
+        .agg(pl.len().alias("sprays"), pl.col("ml_used").sum().alias("ml"))
+        .sort(["sprays", "cell_x", "cell_y"], descending=[True, False, False])
+        .collect()
+    )
+
+
+def duration_distribution(root: str = DEFAULT_OUT, bins: Sequence[float] = DEFAULT_DURATION_BINS,
+                          start: Optional[date] = None, end: Optional[date] = None) -> dict:
+    """Quantiles and a bucketed histogram of spray durations (seconds)."""
+    durations = scan(root, "spray", start, end).select("duration_s").drop_nulls()
+    q = durations.select(
+        pl.len().alias("count"),
+        pl.col("duration_s").mean().alias("mean"),
+        *[pl.col("duration_s").quantile(p).alias(f"p{int(p * 100)}") for p in (0.5, 0.9, 0.99)],
+        pl.col("duration_s").max().alias("max"),
+    ).collect().row(0, named=True)
+    labels = [f"<={b:g}" for b in bins] + [f">{bins[-1]:g}"]
+    hist = (
+        durations
+        .select(pl.col("duration_s").cut(list(bins), labels=labels, left_closed=False).alias("bucket"))
+        .group_by("bucket").agg(pl.len().alias("sprays"))
+        .collect()
+    )
+    counts = dict(zip(hist["bucket"].cast(pl.Utf8), hist["sprays"]))
+    return {**q, "histogram": {label: counts.get(label, 0) for label in labels}}
+
+
+def detections_by_day(root: str = DEFAULT_OUT, start: Optional[date] = None, end: Optional[date] = None) -> pl.DataFrame:
+    """Per day and pest class: detection count and mean confidence."""
+    return (
+        scan(root, "detections", start, end)
+        .group_by("date", "pest")
+        .agg(pl.len().alias("detections"), pl.col("conf").mean().alias("mean_conf"))
+        .sort(["date", "detections"], descending=[False, True])
+        .collect()
+    )
+
+
+# -------------------------
+# Benchmark
+# -------------------------
+def _synthetic_db(path: str, rows: int, days: int = 120) -> None:
+    """A season of pesticide_log rows spread over `days`, in id (= time) order."""
+    rng = random.Random(0)
+    season_start = datetime(2025, 5, 1, 6, 0, 0)
+    step = days * 86400 / rows
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE pesticide_log (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, ml_used REAL, "
+                 "area_m2 REAL, x REAL, y REAL, duration_s REAL)")
+    batch = []
+    for i in range(rows):
+        dur = min(rng.expovariate(1.0), 30.0)
+        ts = season_start + timedelta(seconds=i * step)
+        batch.append((ts.isoformat(), dur * 10.0, 0.5, rng.uniform(0, 5000), rng.uniform(0, 2000), dur))
+        if len(batch) == 100_000:
+            conn.executemany("INSERT INTO pesticide_log (ts, ml_used, area_m2, x, y, duration_s) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO pesticide_log (ts, ml_used, area_m2, x, y, duration_s) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def _sqlite_daily_baseline(db_path: str) -> int:
+    """What DBLogger.daily_report does, once per day of the season (rows pulled into Python)."""
+    conn = sqlite3.connect(db_path)
+    first, last = conn.execute("SELECT MIN(ts), MAX(ts) FROM pesticide_log").fetchone()
+    day, end = datetime.fromisoformat(first).date(), datetime.fromisoformat(last).date()
+    n = 0
+    while day <= end:
+        rows = conn.execute("SELECT ts, ml_used, area_m2, x, y, duration_s FROM pesticide_log "
+                            "WHERE ts BETWEEN ? AND ? ORDER BY ts",
+                            (datetime.combine(day, datetime.min.time()).isoformat(),
+                             datetime.combine(day, datetime.max.time()).isoformat())).fetchall()
+        sum(r[1] for r in rows)
+        n += 1
+        day += timedelta(days=1)
+    conn.close()
+    return n
+
+
+def _timed(label: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    print(f"{label:<36}{time.perf_counter() - t0:>8.2f} s")
+    return out
+
+
+def _cmd_bench(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db, root = os.path.join(tmp, "pesticide_log.db"), os.path.join(tmp, "parquet")
+        print(f"Synthetic season: {args.rows:,} sprays over {args.days} days")
+        _synthetic_db(db, args.rows, args.days)
+        _timed("export (first run, all rows)", export, db, root)
+        _timed("export (incremental, no new rows)", export, db, root)
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs)
+        print(f"{'parquet on disk':<36}{size / 1e6:>8.1f} MB (SQLite {os.path.getsize(db) / 1e6:.1f} MB)")
+        _timed("SQLite daily_report x every day", _sqlite_daily_baseline, db)
+        _timed("daily_dosage (season)", daily_dosage, root)
+        _timed("daily_dosage (one month)", daily_dosage, root, date(2025, 6, 1), date(2025, 6, 30))
+        _timed("grid_counts", grid_counts, root, args.cell)
+        _timed("duration_distribution", duration_distribution, root)
+
+
+def _parse_day(s: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(s) if s else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Season aggregates over the Parquet spray / detection logs")
+    parser.add_argument("cmd", choices=["daily", "grid", "durations", "detections", "bench"])
+    parser.add_argument("--root", default=DEFAULT_OUT)
+    parser.add_argument("--start", type=_parse_day)
+    parser.add_argument("--end", type=_parse_day)
+    parser.add_argument("--cell", type=float, default=DEFAULT_CELL)
+    parser.add_argument("--rows", type=int, default=3_000_000, help="bench: synthetic spray rows")
+    parser.add_argument("--days", type=int, default=120, help="bench: season length")
+    args = parser.parse_args()
+
+    pl.Config.set_tbl_rows(50)
+    if args.cmd == "bench":
+        _cmd_bench(args)
+    elif args.cmd == "daily":
+        print(daily_dosage(args.root, args.start, args.end))
+    elif args.cmd == "grid":
+        print(grid_counts(args.root, args.cell, args.start, args.end))
+    elif args.cmd == "durations":
+        print(duration_distribution(args.root, start=args.start, end=args.end))
+    else:
+        print(detections_by_day(args.root, args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
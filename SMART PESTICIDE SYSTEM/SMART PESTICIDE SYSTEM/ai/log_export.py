@@ -0,0 +1,174 @@
+"""
+Incremental export of the robot's SQLite logs to date-partitioned Parquet.
+
+DBLogger writes one row per spray (pesticide_log) and per reported detection
+(detection_log). Reading a season of those row by row is slow, so this job
+appends new rows to a columnar store for ai.log_analytics:
+
+    <out>/spray/date=2025-06-01/part-000000012345.parquet
+    <out>/detections/date=2025-06-01/part-000000012400.parquet
+
+- only rows with id > the table's high-water mark (kept in <out>/_export_state.json)
+  are read, in id order and in chunks, so a run costs O(new rows)
+- every chunk is written as one part file per day, named by its first id; the
+  mark advances only after the parts are on disk, so a crashed run re-exports
+  the same chunk over the same file names instead of duplicating rows
+- `compact` merges each day's parts into a single file (dropping duplicate ids)
+
+Run it from cron / a systemd timer (from the SMART PESTICIDE SYSTEM folder):
+    python -m ai.log_export [--db pesticide_log.db] [--out logs_parquet]
+    python -m ai.log_export compact [--out logs_parquet]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+import polars as pl
+
+DEFAULT_DB = "pesticide_log.db"
+DEFAULT_OUT = "logs_parquet"
+CHUNK_ROWS = 250_000
+STATE_FILE = "_export_state.json"
+
+# parquet dataset name -> (SQLite table, column schema in SELECT order)
+TABLES: Dict[str, tuple] = {
+    "spray": ("pesticide_log", {
+        "id": pl.Int64, "ts": pl.Utf8, "ml_used": pl.Float64, "area_m2": pl.Float64,
+        "x": pl.Float64, "y": pl.Float64, "duration_s": pl.Float64,
+    }),
+    "detections": ("detection_log", {
+        "id": pl.Int64, "ts": pl.Utf8, "pest": pl.Utf8, "conf": pl.Float64,
+        "x": pl.Float64, "y": pl.Float64, "track_id": pl.Int64, "camera": pl.Int64,
+    }),
+}
+
+# hardware.py writes datetime.utcnow().isoformat(); the fraction is omitted when it is zero
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S%.f"
+
+
+# -------------------------
+# State
+# -------------------------
+def load_state(out_dir: str) -> Dict[str, int]:
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(out_dir: str, state: Dict[str, int]) -> None:
+    path = os.path.join(out_dir, STATE_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _write_parquet(df: pl.DataFrame, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.write_parquet(tmp, compression="zstd", statistics=True)
+    os.replace(tmp, path)
+
+
+# -------------------------
+# Export
+# -------------------------
+def _to_frame(rows, schema: dict) -> pl.DataFrame:
+    df = pl.DataFrame(rows, schema=schema, orient="row")
+    return df.with_columns(pl.col("ts").str.to_datetime(TS_FORMAT, time_unit="us"))
+
+
+def export_table(conn: sqlite3.Connection, out_dir: str, name: str, hwm: int,
+                 chunk_rows: int = CHUNK_ROWS, on_chunk=None) -> int:
+    """Append rows with id > hwm to <out>/<name>/date=.../; returns the new high-water mark."""
+    table, schema = TABLES[name]
+    sql = f"SELECT {', '.join(schema)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+    while True:
+        rows = conn.execute(sql, (hwm, chunk_rows)).fetchall()
+        if not rows:
+            return hwm
+        df = _to_frame(rows, schema)
+        for (day,), part in df.group_by(pl.col("ts").dt.date().alias("date")):
+            first_id = part["id"].min()
+            _write_parquet(part.sort("id"), os.path.join(out_dir, name, f"date={day}", f"part-{first_id:012d}.parquet"))
+        hwm = rows[-1][0]
+        if on_chunk:
+            on_chunk(name, hwm, len(rows))
+
+
+def export(db_path: str = DEFAULT_DB, out_dir: str = DEFAULT_OUT, chunk_rows: int = CHUNK_ROWS) -> Dict[str, int]:
+    """Export every table's new rows; returns {dataset: rows exported}."""
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir)
+    exported = {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name, (table, _) in TABLES.items():
+            if table not in existing:
+                continue
+            hwm = state.get(name, 0)
+            max_id = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+            if max_id < hwm:
+                print(f"{table}: max id {max_id} < exported mark {hwm}; database was recreated, "
+                      f"move {os.path.join(out_dir, name)} aside and reset its mark to re-export")
+                continue
+
+            def checkpoint(ds, new_hwm, n):
+                state[ds] = new_hwm
+                exported[ds] = exported.get(ds, 0) + n
+                save_state(out_dir, state)
+
+            export_table(conn, out_dir, name, hwm, chunk_rows, on_chunk=checkpoint)
+    finally:
+        conn.close()
+    return exported
+
+
+# -------------------------
+# Compaction
+# -------------------------
+def compact(out_dir: str = DEFAULT_OUT, name: Optional[str] = None) -> int:
+    """Merge each day partition's part files into one; returns the number of partitions rewritten."""
+    rewritten = 0
+    for ds in ([name] if name else TABLES):
+        for day_dir in sorted(glob.glob(os.path.join(out_dir, ds, "date=*"))):
+            parts = sorted(glob.glob(os.path.join(day_dir, "part-*.parquet")))
+            if len(parts) < 2:
+                continue
+            df = pl.concat([pl.read_parquet(p) for p in parts]).unique("id", keep="last").sort("id")
+            target = parts[0]  # lowest first id, so later exports still sort after it
+            _write_parquet(df, target)
+            for p in parts[1:]:
+                os.remove(p)
+            rewritten += 1
+    return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export robot SQLite logs to date-partitioned Parquet")
+    parser.add_argument("cmd", nargs="?", choices=["export", "compact"], default="export")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.cmd == "compact":
+        n = compact(args.out)
+        print(f"Compacted {n} partitions in {time.perf_counter() - t0:.2f} s")
+        return
+    exported = export(args.db, args.out, args.chunk_rows)
+    summary = ", ".join(f"{ds}: {n} rows" for ds, n in exported.items()) or "nothing new"
+    print(f"Exported {summary} in {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
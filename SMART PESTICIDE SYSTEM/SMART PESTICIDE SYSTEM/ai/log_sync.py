@@ -0,0 +1,305 @@
+"""
+Delta sync of pesticide_log from many robots into one central SQLite store.
+
+Robot side: GET /sync/pesticide_log?after=<id>&limit=<n> (hardware.py) answers
+with encode_batch() of the rows with id > after, in id order:
+
+    b"PLS1" | uint16 robot-id length | uint32 rows | int64 robot max id | robot id
+    | zlib(id deltas, ts as epoch-us deltas, ml, area, x, y, duration)
+
+Columns are little-endian int64 / float64 arrays (NULL -> NaN). Ids and
+timestamps are delta-encoded first so they compress to a few bits per row.
+
+Central side: ingest() keeps each robot's high-water mark implicitly as
+MAX(id) for that robot in the merged table, pulls batches until it is caught
+up, and bulk-loads each batch in one transaction with INSERT OR IGNORE on the
+(robot_id, id) primary key, so a batch that is delivered twice is harmless.
+
+Each --robot name must match the id that robot reports (Config.ROBOT_ID in
+hardware.py): its hostname, unless it was started with PEST_ROBOT_ID set.
+A mismatch is reported as an error for that robot.
+
+CLI (run from the SMART PESTICIDE SYSTEM folder):
+    # on each robot: PEST_ROBOT_ID=r1 python -m ai.hardware   (r2 on the second)
+    python -m ai.log_sync ingest --store fleet.db --robot r1=http://10.0.0.11:5000 --robot r2=http://10.0.0.12:5000
+    python -m ai.log_sync demo [--rows 200000]      # two local stand-in robots over HTTP
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import urllib.request
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+MAGIC = b"PLS1"
+_HEADER = struct.Struct("<4sHIq")
+DEFAULT_BATCH_ROWS = 50_000
+SYNC_PATH = "/sync/pesticide_log"
+COLUMNS = ("id", "ts", "ml_used", "area_m2", "x", "y", "duration_s")
+
+
+# -------------------------
+# Wire format
+# -------------------------
+def encode_batch(robot_id: str, rows, max_id: int, level: int = 6) -> bytes:
+    """rows: (id, ts ISO string, ml, area, x, y, duration) tuples in id order."""
+    rid = robot_id.encode()
+    n = len(rows)
+    if n:
+        ids, ts, *floats = zip(*rows)
+        ids = np.array(ids, np.int64)
+        ts_us = np.array(ts, dtype="datetime64[us]").astype(np.int64)
+        body = [np.diff(ids, prepend=0), np.diff(ts_us, prepend=0)]
+        body += [np.array(col, np.float64) for col in floats]  # None -> nan
+        payload = zlib.compress(b"".join(a.astype("<i8" if a.dtype.kind == "i" else "<f8").tobytes()
+                                         for a in body), level)
+    else:
+        payload = b""
+    return _HEADER.pack(MAGIC, len(rid), n, max_id) + rid + payload
+
+
+def decode_batch(data: bytes) -> Tuple[str, int, Dict[str, np.ndarray]]:
+    """Inverse of encode_batch: (robot_id, robot max id, {column: array})."""
+    magic, rid_len, n, max_id = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a pesticide_log sync batch")
+    off = _HEADER.size
+    robot_id = data[off:off + rid_len].decode()
+    cols: Dict[str, np.ndarray] = {}
+    if n:
+        raw = zlib.decompress(data[off + rid_len:])
+        if len(raw) != n * 8 * len(COLUMNS):
+            raise ValueError(f"batch body is {len(raw)} bytes, expected {n * 8 * len(COLUMNS)}")
+        arrays = [np.frombuffer(raw, "<i8" if i < 2 else "<f8", count=n, offset=i * n * 8)
+                  for i in range(len(COLUMNS))]
+        cols["id"] = np.cumsum(arrays[0])
+        cols["ts"] = np.cumsum(arrays[1]).astype("datetime64[us]")
+        for name, arr in zip(COLUMNS[2:], arrays[2:]):
+            cols[name] = arr
+    return robot_id, max_id, cols
+
+
+def read_batch(db_path: str, robot_id: str, after: int, limit: int = DEFAULT_BATCH_ROWS) -> bytes:
+    """Robot side: the encoded batch of rows with id > after (at most `limit`)."""
+    if not os.path.exists(db_path):  # nothing logged yet: empty batch, max id 0
+        return encode_batch(robot_id, [], 0)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=2.0)
+    try:
+        max_id = conn.execute("SELECT MAX(id) FROM pesticide_log").fetchone()[0] or 0
+        rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM pesticide_log WHERE id > ? ORDER BY id LIMIT ?",
+                            (after, limit)).fetchall()
+    finally:
+        conn.close()
+    return encode_batch(robot_id, rows, max_id)
+
+
+# -------------------------
+# Central store
+# -------------------------
+class FleetStore:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS fleet_pesticide_log (
+                                robot_id TEXT NOT NULL,
+                                id INTEGER NOT NULL,
+                                ts TEXT,
+                                ml_used REAL,
+                                area_m2 REAL,
+                                x REAL,
+                                y REAL,
+                                duration_s REAL,
+                                PRIMARY KEY (robot_id, id)
+                            ) WITHOUT ROWID""")
+        self.conn.commit()
+
+    def high_water_mark(self, robot_id: str) -> int:
+        row = self.conn.execute("SELECT MAX(id) FROM fleet_pesticide_log WHERE robot_id = ?", (robot_id,)).fetchone()
+        return row[0] or 0
+
+    def load(self, robot_id: str, cols: Dict[str, np.ndarray]) -> int:
+        """Bulk insert one decoded batch; returns rows actually added (duplicates are ignored)."""
+        if not cols:
+            return 0
+        ts = np.datetime_as_string(cols["ts"], unit="us")
+        floats = [np.where(np.isnan(cols[c]), None, cols[c]).tolist() for c in COLUMNS[2:]]
+        rows = zip([robot_id] * len(ts), cols["id"].tolist(), ts.tolist(), *floats)
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO fleet_pesticide_log VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return self.conn.total_changes - before
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def sync_robot(store: FleetStore, robot_id: str, url: str, batch_rows: int = DEFAULT_BATCH_ROWS,
+               timeout: float = 30.0) -> Dict[str, int]:
+    """Pull every row newer than the store's mark for one robot; returns counters."""
+    stats = {"batches": 0, "rows": 0, "inserted": 0, "bytes": 0}
+    while True:
+        hwm = store.high_water_mark(robot_id)
+        with urllib.request.urlopen(f"{url.rstrip('/')}{SYNC_PATH}?after={hwm}&limit={batch_rows}",
+                                    timeout=timeout) as resp:
+            data = resp.read()
+        got_id, max_id, cols = decode_batch(data)
+        if got_id != robot_id:
+            raise ValueError(f"{url} identifies as {got_id!r}, expected {robot_id!r}")
+        if max_id < hwm:
+            raise ValueError(f"{robot_id}: robot max id {max_id} < synced mark {hwm}; its database was recreated")
+        n = len(cols.get("id", ()))
+        stats["batches"] += 1
+        stats["bytes"] += len(data)
+        stats["rows"] += n
+        stats["inserted"] += store.load(robot_id, cols)
+        # the robot may cap `limit` below batch_rows, so a short batch doesn't mean caught up
+        if n == 0 or int(cols["id"][-1]) >= max_id:
+            return stats
+
+
+def ingest(store_path: str, robots: Dict[str, str], batch_rows: int = DEFAULT_BATCH_ROWS) -> Dict[str, dict]:
+    """One sync pass over the fleet; a robot that can't be reached is reported and skipped."""
+    store = FleetStore(store_path)
+    out = {}
+    try:
+        for robot_id, url in robots.items():
+            try:
+                out[robot_id] = sync_robot(store, robot_id, url, batch_rows)
+            except (OSError, ValueError) as e:
+                out[robot_id] = {"error": str(e)}
+    finally:
+        store.close()
+    return out
+
+
+# -------------------------
+# Local two-robot stand-in
+# -------------------------
+def _fill_db(path: str, rows: int, start: datetime, seed: int, first_id: int = 1) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS pesticide_log (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, "
+                 "ml_used REAL, area_m2 REAL, x REAL, y REAL, duration_s REAL)")
+    batch = []
+    for i in range(rows):
+        dur = round(rng.uniform(0.2, 3.0), 2)
+        ts = (start + timedelta(seconds=(first_id + i) * 7.3)).isoformat()
+        xy = (None, None) if rng.random() < 0.05 else (round(rng.uniform(0, 5000), 1), round(rng.uniform(0, 2000), 1))
+        batch.append((first_id + i, ts, dur * 10.0, 0.5, *xy, dur))
+    conn.executemany("INSERT INTO pesticide_log VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def _stand_in_robot(robot_id: str, db_path: str) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            q = parse_qs(urlparse(self.path).query)
+            body = read_batch(db_path, robot_id, int(q["after"][0]), int(q["limit"][0]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _report_json_bytes(db_path: str) -> int:
+    """Bytes the same rows cost as /report JSON (one download per day)."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT ts, ml_used, area_m2, x, y, duration_s FROM pesticide_log ORDER BY ts").fetchall()
+    conn.close()
+    days: Dict[str, list] = {}
+    for r in rows:
+        days.setdefault(r[0][:10], []).append(r)
+    return sum(len(json.dumps({"date": d, "total_ml": sum(r[1] for r in rs), "entries": [
+        {"ts": r[0], "ml_used": r[1], "area_m2": r[2], "x": r[3], "y": r[4], "duration_s": r[5]} for r in rs
+    ]}).encode()) for d, rs in days.items())
+
+
+def _cmd_demo(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        dbs = {f"robot-{i}": os.path.join(tmp, f"robot{i}.db") for i in (1, 2)}
+        for i, path in enumerate(dbs.values()):
+            _fill_db(path, args.rows, datetime(2025, 6, 1, 6), seed=i)
+        servers = {rid: _stand_in_robot(rid, path) for rid, path in dbs.items()}
+        robots = {rid: f"http://127.0.0.1:{s.server_address[1]}" for rid, s in servers.items()}
+        store = os.path.join(tmp, "fleet.db")
+
+        def run(label):
+            t0 = time.perf_counter()
+            res = ingest(store, robots, args.batch_rows)
+            dt = time.perf_counter() - t0
+            rows = sum(r["rows"] for r in res.values())
+            wire = sum(r["bytes"] for r in res.values())
+            added = sum(r["inserted"] for r in res.values())
+            rate = f"{rows / dt:>10,.0f} rows/s" if rows else f"{'-':>15}"
+            print(f"{label:<28}{rows:>9,} rows {added:>9,} new {wire / 1e6:>8.2f} MB {dt:>6.2f} s {rate}"
+                  + (f"  {wire / rows:.1f} B/row" if rows else ""))
+
+        print(f"Two stand-in robots x {args.rows:,} rows, batches of {args.batch_rows:,}")
+        run("initial sync")
+        run("no new rows")
+        for i, path in enumerate(dbs.values()):
+            _fill_db(path, args.delta, datetime(2025, 6, 1, 6), seed=10 + i, first_id=args.rows + 1)
+        run(f"delta (+{args.delta:,} per robot)")
+        # replay a batch that was already ingested: dedup keeps the store unchanged
+        fleet = FleetStore(store)
+        _, _, cols = decode_batch(read_batch(dbs["robot-1"], "robot-1", 0, 1000))
+        print(f"{'re-delivered 1,000 rows':<28}{fleet.load('robot-1', cols):>24,} new")
+        total = fleet.conn.execute("SELECT COUNT(*) FROM fleet_pesticide_log").fetchone()[0]
+        fleet.close()
+        raw = sum(os.path.getsize(p) for p in dbs.values())
+        report = sum(_report_json_bytes(p) for p in dbs.values())
+        print(f"\nmerged store: {total:,} rows; same rows as /report JSON: {report / 1e6:.2f} MB, "
+              f"robot DB files: {raw / 1e6:.2f} MB")
+        for s in servers.values():
+            s.shutdown()
+
+
+def _parse_robot(spec: str) -> Tuple[str, str]:
+    robot_id, _, url = spec.partition("=")
+    if not url:
+        raise argparse.ArgumentTypeError("expected ROBOT_ID=URL")
+    return robot_id, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta sync of robot pesticide logs into a central store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="pull new rows from every robot once")
+    ing.add_argument("--store", default="fleet.db")
+    ing.add_argument("--robot", type=_parse_robot, action="append", required=True, metavar="ROBOT_ID=URL")
+    ing.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    demo = sub.add_parser("demo", help="two local stand-in robots: rows/s and bytes on the wire")
+    demo.add_argument("--rows", type=int, default=200_000)
+    demo.add_argument("--delta", type=int, default=5_000)
+    demo.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    args = parser.parse_args()
+    if args.cmd == "demo":
+        _cmd_demo(args)
+        return
+    for robot_id, res in ingest(args.store, dict(args.robot), args.batch_rows).items():
+        print(robot_id, res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Minimal in-process metrics registry (counters, gauges, fixed-bucket histograms)
+rendered in the Prometheus text exposition format.
+
+Hot-path cost is kept well under a microsecond per event:
+- Counter.inc / Histogram.observe are plain attribute/list updates (no locks;
+  under the GIL an occasional lost increment is acceptable for monitoring)
+- Histogram bucket lookup is a C-level bisect over a fixed tuple of bounds
+- Gauges can be backed by a callable (e.g. queue.qsize) evaluated only at scrape time
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Seconds; covers queue hand-offs (~us) up to spray / servo moves (~s)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _label_str(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if v != v:
+        return "NaN"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: float = 1) -> None:
+        self.value += n
+
+
+class Gauge:
+    __slots__ = ("value", "fn")
+
+    def __init__(self):
+        self.value = 0.0
+        self.fn: Optional[Callable[[], float]] = None
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self.fn = fn
+
+    def get(self) -> float:
+        if self.fn is not None:
+            try:
+                return self.fn()
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Approximate percentiles from bucket counts (upper bound of the matching bucket)."""
+        counts, total = list(self.counts), self.count
+        out = {"count": total, "sum": self.sum}
+        for q in (0.5, 0.95, 0.99):
+            target, acc = q * total, 0
+            for i, c in enumerate(counts):
+                acc += c
+                if total and acc >= target:
+                    out[f"p{int(q * 100)}"] = self.bounds[i] if i < len(self.bounds) else float("inf")
+                    break
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (type, help, {labels_tuple: metric})
+        self._families: Dict[str, Tuple[str, str, Dict[Tuple, object]]] = {}
+
+    def _get(self, kind: str, cls, name: str, help_text: str, labels: Optional[Dict[str, str]], **kw):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            fam = self._families.get(name)
+            if fam is None:
+                fam = (kind, help_text, {})
+                self._families[name] = fam
+            elif fam[0] != kind:
+                raise ValueError(f"metric {name} already registered as {fam[0]}")
+            metric = fam[2].get(key)
+            if metric is None:
+                metric = cls(**kw)
+                fam[2][key] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._get("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = "", labels: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._get("gauge", Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str = "", labels: Optional[Dict[str, str]] = None,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get("histogram", Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            families = [(n, f[0], f[1], list(f[2].items())) for n, f in sorted(self._families.items())]
+        for name, kind, help_text, metrics in families:
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, m in metrics:
+                if kind == "counter":
+                    lines.append(f"{name}{_label_str(labels)} {_fmt(m.value)}")
+                elif kind == "gauge":
+                    lines.append(f"{name}{_label_str(labels)} {_fmt(m.get())}")
+                else:
+                    acc = 0
+                    counts = list(m.counts)
+                    for bound, c in zip(m.bounds + (float("inf"),), counts):
+                        acc += c
+                        le = 'le="%s"' % _fmt(bound)
+                        lines.append(f"{name}_bucket{_label_str(labels, le)} {acc}")
+                    lines.append(f"{name}_sum{_label_str(labels)} {_fmt(m.sum)}")
+                    lines.append(f"{name}_count{_label_str(labels)} {m.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default registry
+REGISTRY = Registry()
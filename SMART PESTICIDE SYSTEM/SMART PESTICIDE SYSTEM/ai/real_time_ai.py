@@ -1,11 +1,21 @@
+import os
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
 
 IMG_SIZE = 128
 
-# Load trained model
-model = load_model("armyworm_rgb_thermal.keras")
+# Load trained model: the TFLite conversion (python -m ai.tflite_convert convert) when
+# present, so the robot doesn't import TensorFlow; otherwise the Keras original
+MODEL_PATH = os.environ.get("ARMYWORM_MODEL", "armyworm_rgb_thermal_int8.tflite")
+if MODEL_PATH.endswith(".tflite") and os.path.exists(MODEL_PATH):
+    try:
+        from .armyworm_lite import LiteModel
+    except ImportError:
+        from armyworm_lite import LiteModel
+    model = LiteModel(MODEL_PATH)
+else:
+    from tensorflow.keras.models import load_model
+    model = load_model(MODEL_PATH if MODEL_PATH.endswith(".keras") else "armyworm_rgb_thermal.keras")
 
 # Function to preprocess webcam frame
 def preprocess_frame(frame):
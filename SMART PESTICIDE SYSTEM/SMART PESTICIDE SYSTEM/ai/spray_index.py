@@ -0,0 +1,126 @@
+"""
+In-memory spatial index of recent spray locations (uniform hash grid with time expiry).
+
+Used by Sprayer to skip spots that were already treated within the
+last SPRAY_HISTORY_TTL_S seconds. Cells are twice the exclusion radius. Each
+point is stored in its own cell plus the (up to 3) neighbours on its quadrant
+side, i.e. every cell whose queries it could ever satisfy. A query is then a
+single dict lookup and a short bucket scan; inserts (one per spray) pay the
+fan-out instead.
+
+Run this file directly for a query-cost benchmark.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class SprayIndex:
+    def __init__(self, radius: float, ttl_s: float):
+        if radius <= 0:
+            raise ValueError("radius must be positive")
+        self.radius = radius
+        self.ttl_s = ttl_s
+        self._r2 = radius * radius
+        self._cell = 2.0 * radius
+        self._inv = 1.0 / self._cell
+        self._grid = {}          # (cx, cy) -> list of [x, y, ts]
+        self._fifo = deque()     # (ts, keys, entry) in insertion order, for expiry
+        self._lock = threading.RLock()
+        self.queries = 0
+        self.suppressed = 0
+
+    def _cells_for(self, x: float, y: float):
+        fx, fy = x * self._inv, y * self._inv
+        cx, cy = math.floor(fx), math.floor(fy)
+        # a query within radius of (x, y) can only come from this cell or the
+        # neighbours on the side of the cell (x, y) sits in
+        nx = cx + 1 if fx - cx >= 0.5 else cx - 1
+        ny = cy + 1 if fy - cy >= 0.5 else cy - 1
+        return ((cx, cy), (nx, cy), (cx, ny), (nx, ny))
+
+    def add(self, x: float, y: float, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        keys = self._cells_for(x, y)
+        entry = (x, y, ts)
+        with self._lock:
+            grid = self._grid
+            for key in keys:
+                bucket = grid.get(key)
+                if bucket is None:
+                    grid[key] = [entry]
+                else:
+                    bucket.append(entry)
+            self._fifo.append((ts, keys, entry))
+            self._expire(time.time())
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.ttl_s
+        fifo, grid = self._fifo, self._grid
+        while fifo and fifo[0][0] < cutoff:
+            _, keys, entry = fifo.popleft()
+            for key in keys:
+                bucket = grid.get(key)
+                if bucket is None:
+                    continue
+                try:
+                    bucket.remove(entry)
+                except ValueError:
+                    pass
+                if not bucket:
+                    del grid[key]
+
+    def is_near(self, x: float, y: float, now: Optional[float] = None) -> bool:
+        """True if a non-expired spray lies within radius of (x, y)."""
+        self.queries += 1
+        bucket = self._grid.get((math.floor(x * self._inv), math.floor(y * self._inv)))
+        if not bucket:
+            return False
+        cutoff = (time.time() if now is None else now) - self.ttl_s
+        r2 = self._r2
+        for px, py, ts in bucket:
+            if ts >= cutoff and (px - x) * (px - x) + (py - y) * (py - y) <= r2:
+                return True
+        return False
+
+    def check(self, x: float, y: float) -> bool:
+        """True (and counted as suppressed) if a non-expired spray lies within radius of (x, y)."""
+        with self._lock:
+            if self.is_near(x, y):
+                self.suppressed += 1
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._fifo)
+
+    def stats(self) -> dict:
+        return {"points": len(self), "cells": len(self._grid), "queries": self.queries,
+                "suppressed": self.suppressed, "radius": self.radius, "ttl_s": self.ttl_s}
+
+
+def _benchmark(points: int = 300_000, queries: int = 200_000) -> None:
+    rng = random.Random(0)
+    field = (points ** 0.5) * 100.0  # ~1 point per 100x100 mm^2
+    idx = SprayIndex(radius=30.0, ttl_s=3600)
+    now = time.time()
+    t0 = time.perf_counter()
+    for _ in range(points):
+        idx.add(rng.uniform(0, field), rng.uniform(0, field), now)
+    build = time.perf_counter() - t0
+    qs = [(rng.uniform(0, field), rng.uniform(0, field)) for _ in range(queries)]
+    t0 = time.perf_counter()
+    hits = 0
+    for x, y in qs:
+        hits += idx.is_near(x, y, now)
+    q = time.perf_counter() - t0
+    print(f"SprayIndex: {points} points in {len(idx._grid)} cells, built in {build:.2f} s")
+    print(f"  is_near: {q / queries * 1e9:.0f} ns/query ({hits / queries * 100:.1f}% hits)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,209 @@
+"""
+Convert armyworm_rgb_thermal.keras to TFLite and compare the variants on the robot.
+
+- float:   plain TFLite, float32 weights (conversion baseline)
+- dynamic: dynamic-range quantization, int8 weights and float activations
+- int8:    full integer (weights, activations, int8 input / output), calibrated
+           on a sample of the training set as the representative dataset
+
+`report` measures each model in a fresh child process so the numbers are what
+the robot pays: runtime import + model load time, RSS added by the runtime and
+model, per-frame latency (batch 1, the real_time_ai path) and accuracy. For the
+TFLite models it also gives the accuracy delta and decision agreement against
+Keras. Only `convert` (and the keras row of the report) need TensorFlow.
+
+Run from the SMART PESTICIDE SYSTEM folder:
+    python -m ai.tflite_convert convert --keras armyworm_rgb_thermal.keras
+    python -m ai.tflite_convert report --frames 300 [--json report.json]
+Without held-out folders (--rgb-dir / --th-dir) accuracy is measured on the
+training set, which also supplied the int8 calibration samples.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from .train_model import IMG_SIZE, load_images
+except ImportError:
+    from train_model import IMG_SIZE, load_images
+
+MODES = ("float", "dynamic", "int8")
+DEFAULT_KERAS = "armyworm_rgb_thermal.keras"
+DEFAULT_RGB_DIR, DEFAULT_TH_DIR = "dataset/train", "dataset/thermal"
+CALIBRATION_SAMPLES = 200
+THRESHOLD = 0.5
+
+
+def tflite_path(keras_path: str, mode: str) -> str:
+    return f"{os.path.splitext(keras_path)[0]}_{mode}.tflite"
+
+
+def convert(keras_path: str, mode: str, rgb_dir: str = DEFAULT_RGB_DIR, th_dir: str = DEFAULT_TH_DIR,
+            samples: int = CALIBRATION_SAMPLES, out_path: Optional[str] = None) -> str:
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if mode in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "int8":
+        X_rgb, X_th, _ = load_images(rgb_dir, th_dir)
+        pick = np.random.default_rng(0).permutation(len(X_rgb))[:samples]
+
+        def representative():
+            for i in pick:  # model input order: rgb, thermal
+                yield [X_rgb[i:i + 1].astype(np.float32), X_th[i:i + 1].astype(np.float32)]
+
+        converter.representative_dataset = representative
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    out_path = out_path or tflite_path(keras_path, mode)
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+# -------------------------
+# Measurement (runs in a child process per model)
+# -------------------------
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource  # peak, not current, but the best available off Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _probe(backend: str, model_path: str, rgb_dir: str, th_dir: str, frames: int, threads: Optional[int]) -> dict:
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    if backend == "keras":
+        from tensorflow.keras.models import load_model
+        t1 = time.perf_counter()
+        model = load_model(model_path)
+        run = lambda rgb, th: model.predict([rgb, th], verbose=0)
+    else:
+        try:
+            from .armyworm_lite import LiteModel
+        except ImportError:
+            from armyworm_lite import LiteModel
+        t1 = time.perf_counter()
+        model = LiteModel(model_path, threads)
+        run = model.predict
+    t2 = time.perf_counter()
+    rss1 = _rss_mb()
+
+    X_rgb, X_th, Y = load_images(rgb_dir, th_dir)
+    X_rgb, X_th = X_rgb.astype(np.float32), X_th.astype(np.float32)
+    probs = np.concatenate([run(X_rgb[i:i + 1], X_th[i:i + 1]) for i in range(len(Y))]).reshape(-1)
+    lat = []
+    for k in range(frames):
+        i = k % len(Y)
+        s = time.perf_counter()
+        run(X_rgb[i:i + 1], X_th[i:i + 1])
+        lat.append(time.perf_counter() - s)
+    lat = np.array(lat[min(5, len(lat) - 1):]) * 1000  # drop warm-up calls
+    return {
+        "backend": backend, "model": model_path,
+        "size_kb": round(os.path.getsize(model_path) / 1024, 1) if os.path.isfile(model_path) else None,
+        "import_s": round(t1 - t0, 3), "load_s": round(t2 - t1, 3),
+        "rss_mb": round(rss1 - rss0, 1), "rss_total_mb": round(_rss_mb(), 1),
+        "latency_ms": {"p50": round(float(np.percentile(lat, 50)), 2), "p90": round(float(np.percentile(lat, 90)), 2),
+                       "p99": round(float(np.percentile(lat, 99)), 2), "mean": round(float(lat.mean()), 2)},
+        "accuracy": round(float(((probs > THRESHOLD) == Y).mean()), 4),
+        "probs": probs.round(5).tolist(),
+    }
+
+
+def measure(backend: str, model_path: str, rgb_dir: str, th_dir: str, frames: int,
+            threads: Optional[int] = None) -> dict:
+    """Run _probe in a fresh interpreter so imports and RSS are not shared between models."""
+    cmd = [sys.executable, "-m", "ai.tflite_convert", "_probe", "--backend", backend, "--model", model_path,
+           "--rgb-dir", rgb_dir, "--th-dir", th_dir, "--frames", str(frames)]
+    if threads is not None:
+        cmd += ["--threads", str(threads)]
+    pkg_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=pkg_root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        return {"backend": backend, "model": model_path, "error": out.stderr.strip().splitlines()[-1:]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def report(keras_path: str, rgb_dir: str, th_dir: str, frames: int, threads: Optional[int] = None) -> List[dict]:
+    rows = [measure("keras", keras_path, rgb_dir, th_dir, frames)]
+    for mode in MODES:
+        path = tflite_path(keras_path, mode)
+        if os.path.exists(path):
+            rows.append(measure("tflite", path, rgb_dir, th_dir, frames, threads))
+    ref = rows[0].get("probs")
+    for r in rows:
+        probs = r.pop("probs", None)
+        if ref is not None and probs is not None:
+            a, b = np.array(ref), np.array(probs)
+            r["accuracy_delta"] = round(r["accuracy"] - rows[0]["accuracy"], 4)
+            r["agreement"] = round(float(((a > THRESHOLD) == (b > THRESHOLD)).mean()), 4)
+            r["max_prob_diff"] = round(float(np.abs(a - b).max()), 4)
+    return rows
+
+
+def print_report(rows: List[dict]) -> None:
+    print(f"{'model':<40}{'KB':>8}{'import s':>10}{'load s':>8}{'RSS MB':>8}{'p50 ms':>8}{'p99 ms':>8}"
+          f"{'acc':>8}{'d acc':>8}{'agree':>8}")
+    for r in rows:
+        name = os.path.basename(r["model"])
+        if "error" in r:
+            print(f"{name:<40}  failed: {' '.join(r['error'])}")
+            continue
+        lat = r["latency_ms"]
+        delta = f"{r['accuracy_delta']:+.3f}" if "accuracy_delta" in r else "-"
+        agree = f"{r['agreement']:.3f}" if "agreement" in r else "-"
+        print(f"{name:<40}{r['size_kb'] or 0:>8.0f}{r['import_s']:>10.2f}{r['load_s']:>8.2f}{r['rss_mb']:>8.1f}"
+              f"{lat['p50']:>8.2f}{lat['p99']:>8.2f}{r['accuracy']:>8.3f}{delta:>8}{agree:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keras -> TFLite conversion and comparison for the armyworm model")
+    parser.add_argument("cmd", choices=["convert", "report", "_probe"])
+    parser.add_argument("--keras", default=DEFAULT_KERAS)
+    parser.add_argument("--modes", default=",".join(MODES), help="convert: comma-separated subset of " + ",".join(MODES))
+    parser.add_argument("--rgb-dir", default=DEFAULT_RGB_DIR)
+    parser.add_argument("--th-dir", default=DEFAULT_TH_DIR)
+    parser.add_argument("--samples", type=int, default=CALIBRATION_SAMPLES, help="int8 calibration images")
+    parser.add_argument("--frames", type=int, default=300, help="report: timed single-frame predictions")
+    parser.add_argument("--threads", type=int, help="TFLite interpreter threads")
+    parser.add_argument("--json", help="report: also write the rows here")
+    parser.add_argument("--backend", choices=["keras", "tflite"], help=argparse.SUPPRESS)
+    parser.add_argument("--model", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cmd == "_probe":
+        print(json.dumps(_probe(args.backend, args.model, args.rgb_dir, args.th_dir, args.frames, args.threads)))
+    elif args.cmd == "convert":
+        for mode in args.modes.split(","):
+            t0 = time.perf_counter()
+            path = convert(args.keras, mode, args.rgb_dir, args.th_dir, args.samples)
+            print(f"{mode:<8} -> {path} ({os.path.getsize(path) / 1024:.0f} KB, {time.perf_counter() - t0:.1f} s)")
+    else:
+        rows = report(args.keras, args.rgb_dir, args.th_dir, args.frames, args.threads)
+        print(f"{IMG_SIZE}x{IMG_SIZE} inputs, {args.frames} timed frames per model, threshold {THRESHOLD}")
+        print_report(rows)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,6 @@
 import os
 import cv2
 import numpy as np
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Conv2D, MaxPooling2D, Flatten, Dense, concatenate
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import ModelCheckpoint
 
 IMG_SIZE = 128  # smaller size to save memory
 
@@ -25,28 +21,40 @@ def load_images(rgb_dir, th_dir):
                 Y.append(label)
     return np.array(X_rgb), np.array(X_th), np.array(Y)
 
-# Load dataset
-X_rgb, X_th, Y = load_images("dataset/train", "dataset/thermal")
+def build_model():
+    # TensorFlow is imported here so load_images() can be reused (ai.tflite_convert) without it
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Conv2D, MaxPooling2D, Flatten, Dense, concatenate
+    from tensorflow.keras.optimizers import Adam
 
-# Build model
-input_rgb = Input(shape=(IMG_SIZE, IMG_SIZE, 3))
-x1 = Conv2D(16, 3, activation='relu')(input_rgb)
-x1 = MaxPooling2D()(x1)
-x1 = Flatten()(x1)
+    input_rgb = Input(shape=(IMG_SIZE, IMG_SIZE, 3))
+    x1 = Conv2D(16, 3, activation='relu')(input_rgb)
+    x1 = MaxPooling2D()(x1)
+    x1 = Flatten()(x1)
 
-input_th = Input(shape=(IMG_SIZE, IMG_SIZE, 1))
-x2 = Conv2D(16, 3, activation='relu')(input_th)
-x2 = MaxPooling2D()(x2)
-x2 = Flatten()(x2)
+    input_th = Input(shape=(IMG_SIZE, IMG_SIZE, 1))
+    x2 = Conv2D(16, 3, activation='relu')(input_th)
+    x2 = MaxPooling2D()(x2)
+    x2 = Flatten()(x2)
 
-merged = concatenate([x1, x2])
-output = Dense(1, activation='sigmoid')(merged)
+    merged = concatenate([x1, x2])
+    output = Dense(1, activation='sigmoid')(merged)
 
-model = Model([input_rgb, input_th], output)
-model.compile(optimizer=Adam(0.001), loss='binary_crossentropy', metrics=['accuracy'])
+    model = Model([input_rgb, input_th], output)
+    model.compile(optimizer=Adam(0.001), loss='binary_crossentropy', metrics=['accuracy'])
+    return model
 
-# Save best model
-checkpoint = ModelCheckpoint("armyworm_rgb_thermal.keras", monitor='accuracy', save_best_only=True)
+if __name__ == "__main__":
+    from tensorflow.keras.callbacks import ModelCheckpoint
 
-# Train
-model.fit([X_rgb, X_th], Y, epochs=10, batch_size=8, callbacks=[checkpoint])
\ No newline at end of file
+    # Load dataset
+    X_rgb, X_th, Y = load_images("dataset/train", "dataset/thermal")
+
+    # Build model
+    model = build_model()
+
+    # Save best model
+    checkpoint = ModelCheckpoint("armyworm_rgb_thermal.keras", monitor='accuracy', save_best_only=True)
+
+    # Train
+    model.fit([X_rgb, X_th], Y, epochs=10, batch_size=8, callbacks=[checkpoint])
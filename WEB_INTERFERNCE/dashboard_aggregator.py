@@ -0,0 +1,183 @@
+"""
+Incremental aggregator behind read_dashboard.py and sensorData.py.
+
+server.js runs those scripts once per dashboard poll, so the aggregate state
+lives in a small JSON snapshot file between runs:
+- totals (today + lifetime) are advanced using only pesticide_log rows with
+  id > the stored high-water mark (a primary-key range scan, never a full rescan)
+- within SNAPSHOT_TTL_S of the last refresh the snapshot is served as-is,
+  without opening the database at all
+- if the database was recreated (max id went backwards) the totals are rebuilt
+
+Paths / tuning come from environment variables (defaults match running
+robot_server / hardware.py from the SMART PESTICIDE SYSTEM folder):
+    PESTICIDE_DB_PATH, ROBOT_STATUS_PATH, DASHBOARD_SNAPSHOT_PATH,
+    DASHBOARD_TTL_S, TANK_CAPACITY_ML, BATTERY_EMPTY_V, BATTERY_FULL_V
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ROBOT_DIR = PROJECT_ROOT / 'SMART PESTICIDE SYSTEM' / 'SMART PESTICIDE SYSTEM'
+
+DB_PATH = os.environ.get('PESTICIDE_DB_PATH', str(ROBOT_DIR / 'pesticide_log.db'))
+STATUS_PATH = os.environ.get('ROBOT_STATUS_PATH', str(ROBOT_DIR / 'robot_status.json'))
+SNAPSHOT_PATH = os.environ.get('DASHBOARD_SNAPSHOT_PATH', str(Path(__file__).resolve().parent / 'dashboard_snapshot.json'))
+SNAPSHOT_TTL_S = float(os.environ.get('DASHBOARD_TTL_S', '5'))
+
+TANK_CAPACITY_ML = float(os.environ.get('TANK_CAPACITY_ML', '16000'))
+BATTERY_EMPTY_V = float(os.environ.get('BATTERY_EMPTY_V', '10.5'))   # Config.BATTERY_CRITICAL_VOLTAGE
+BATTERY_FULL_V = float(os.environ.get('BATTERY_FULL_V', '12.6'))
+
+M2_PER_ACRE = 4046.86
+
+_EMPTY_STATE = {
+    'hwm_id': 0,
+    'day': None,                 # UTC date (YYYY-MM-DD) the "today" totals belong to
+    'today_ml': 0.0,
+    'today_area_m2': 0.0,
+    'today_first_ts': None,
+    'today_last_ts': None,
+    'total_ml': 0.0,
+    'refill_ml': 0.0,            # total_ml at the last tank refill
+    'refreshed_at': 0.0,
+}
+
+
+# -------------------------
+# Snapshot persistence
+# -------------------------
+def load_state():
+    try:
+        with open(SNAPSHOT_PATH) as f:
+            state = json.load(f)
+        return {**_EMPTY_STATE, **state}
+    except (OSError, ValueError):
+        return dict(_EMPTY_STATE)
+
+
+def save_state(state):
+    # atomic replace so a concurrent poll never reads a half-written snapshot
+    tmp = f'{SNAPSHOT_PATH}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, SNAPSHOT_PATH)
+
+
+# -------------------------
+# Incremental refresh
+# -------------------------
+def _apply_new_rows(state, conn):
+    max_id = conn.execute('SELECT MAX(id) FROM pesticide_log').fetchone()[0] or 0
+    if max_id < state['hwm_id']:
+        # database was recreated: start over (keep the refill marker relative to zero)
+        state.update({k: v for k, v in _EMPTY_STATE.items() if k != 'refreshed_at'})
+    if max_id == state['hwm_id']:
+        return
+    rows = conn.execute(
+        'SELECT substr(ts, 1, 10), SUM(ml_used), SUM(area_m2), MIN(ts), MAX(ts) '
+        'FROM pesticide_log WHERE id > ? AND id <= ? GROUP BY 1 ORDER BY 1',
+        (state['hwm_id'], max_id)).fetchall()
+    for day, ml, area, first_ts, last_ts in rows:
+        ml, area = ml or 0.0, area or 0.0
+        state['total_ml'] += ml
+        if day != state['day']:
+            if state['day'] is not None and day < state['day']:
+                continue  # late rows for an older day only count towards the lifetime total
+            state.update(day=day, today_ml=0.0, today_area_m2=0.0, today_first_ts=first_ts)
+        state['today_ml'] += ml
+        state['today_area_m2'] += area
+        state['today_last_ts'] = last_ts
+    state['hwm_id'] = max_id
+
+
+def refresh(force=False):
+    """Return the aggregate state, touching the database only when the snapshot is stale."""
+    state = load_state()
+    now = time.time()
+    if not force and now - state['refreshed_at'] < SNAPSHOT_TTL_S:
+        return state
+    if os.path.exists(DB_PATH):
+        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True, timeout=2.0)
+        try:
+            _apply_new_rows(state, conn)
+        finally:
+            conn.close()
+    state['refreshed_at'] = now
+    save_state(state)
+    return state
+
+
+def mark_refill():
+    """Record a full tank at the current cumulative dosage."""
+    state = refresh(force=True)
+    state['refill_ml'] = state['total_ml']
+    save_state(state)
+    return state
+
+
+# -------------------------
+# Derived values
+# -------------------------
+def read_status():
+    try:
+        with open(STATUS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def battery_percent(voltage):
+    if voltage is None:
+        return None
+    frac = (voltage - BATTERY_EMPTY_V) / (BATTERY_FULL_V - BATTERY_EMPTY_V)
+    return int(round(min(max(frac, 0.0), 1.0) * 100))
+
+
+def tank_percent(state):
+    remaining = TANK_CAPACITY_ML - (state['total_ml'] - state['refill_ml'])
+    return int(round(min(max(remaining / TANK_CAPACITY_ML, 0.0), 1.0) * 100))
+
+
+def is_today(state):
+    # pesticide_log timestamps are UTC (hardware.py uses datetime.utcnow())
+    return state['day'] == datetime.utcnow().strftime('%Y-%m-%d')
+
+
+def working_minutes(state):
+    """Minutes between today's first and last spray."""
+    if not is_today(state) or not state['today_first_ts']:
+        return 0
+    first = datetime.fromisoformat(state['today_first_ts'])
+    last = datetime.fromisoformat(state['today_last_ts'])
+    return int((last - first).total_seconds() // 60)
+
+
+def dashboard_payload():
+    state = refresh()
+    today = is_today(state)
+    minutes = working_minutes(state)
+    payload = {
+        'summary_time': f'{minutes // 60} घंटे {minutes % 60} मिनट',
+        'dosage_used': f"{(state['today_ml'] if today else 0.0) / 1000.0:.1f} लीटर",
+        'area_covered': f"{(state['today_area_m2'] if today else 0.0) / M2_PER_ACRE:.1f} एकड़",
+    }
+    battery = battery_percent(read_status().get('battery_v'))
+    payload['battery_level'] = battery if battery is not None else '--'
+    return payload
+
+
+def sensor_payload():
+    state = refresh()
+    status = read_status()
+    weather = status.get('weather') or {}
+    return {
+        'tank_level': f'{tank_percent(state)}%',
+        'weather_value': weather.get('value', 'N/A'),
+        'weather_note': weather.get('note', 'मौसम सेंसर उपलब्ध नहीं'),
+    }
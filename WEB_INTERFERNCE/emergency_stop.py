@@ -0,0 +1,46 @@
+import json
+import os
+import socket
+import time
+import urllib.request
+
+# Sends STOP over the robot's e-stop socket (EStopListener in ai/hardware.py).
+# server.js normally keeps that socket open itself; this script is its fallback
+# and a manual tool. If the socket is unreachable it falls back to the HTTP API.
+ESTOP_HOST = os.environ.get('ESTOP_HOST', '127.0.0.1')
+ESTOP_PORT = int(os.environ.get('ESTOP_PORT', '5001'))
+ROBOT_API = os.environ.get('ROBOT_API', 'http://127.0.0.1:5000')
+TIMEOUT_S = 1.0
+
+
+def stop_via_socket():
+    with socket.create_connection((ESTOP_HOST, ESTOP_PORT), timeout=TIMEOUT_S) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        start = time.perf_counter()
+        sock.sendall(b'STOP\n')
+        reply = sock.makefile('rb').readline()
+        result = json.loads(reply)
+        result['round_trip_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        result['channel'] = 'socket'
+        return result
+
+
+def stop_via_http():
+    req = urllib.request.Request(f'{ROBOT_API}/emergency_stop', data=b'', method='POST')
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=TIMEOUT_S) as resp:
+        result = json.loads(resp.read())
+    result['round_trip_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    result['channel'] = 'http'
+    return result
+
+
+try:
+    try:
+        response = stop_via_socket()
+    except OSError:
+        response = stop_via_http()
+except Exception as e:
+    response = {"success": False, "error": f"Emergency stop could not reach the robot: {e}"}
+
+print(json.dumps(response))
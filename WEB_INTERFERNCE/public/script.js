@@ -172,6 +172,14 @@ function updateDashboardUI(data) {
         }
     }
     
+    // Live camera view (MJPEG from basic_main_program.py, LIVE_STREAM_PORT).
+    // The detector only encodes frames while at least one viewer is connected.
+    const LIVE_STREAM_PORT = 8080;
+    const liveView = document.getElementById('liveView');
+    if (liveView) {
+        liveView.src = `http://${window.location.hostname}:${LIVE_STREAM_PORT}/stream`;
+    }
+
     // Event Listeners
     startBtn.addEventListener('click', () => {
         onsystem();
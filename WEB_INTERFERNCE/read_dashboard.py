@@ -0,0 +1,15 @@
+import json
+import sys
+
+from dashboard_aggregator import dashboard_payload
+
+# Prints the summary panel JSON for GET /dashboard-status (see server.js).
+# Totals are maintained incrementally by dashboard_aggregator; within the
+# snapshot TTL this does not touch the database at all.
+try:
+    response = dashboard_payload()
+except Exception as e:
+    response = {"error": f"Failed to read dashboard data: {e}"}
+
+print(json.dumps(response, ensure_ascii=False))
+sys.stdout.flush()
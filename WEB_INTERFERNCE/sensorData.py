@@ -0,0 +1,16 @@
+import json
+import sys
+
+from dashboard_aggregator import mark_refill, sensor_payload
+
+# Prints the status card JSON for GET /sensor-data (see server.js).
+# Run `python3 sensorData.py --refill` after filling the tank to reset the level.
+try:
+    if '--refill' in sys.argv[1:]:
+        mark_refill()
+    response = sensor_payload()
+except Exception as e:
+    response = {"error": f"Failed to read sensor data: {e}"}
+
+print(json.dumps(response, ensure_ascii=False))
+sys.stdout.flush()
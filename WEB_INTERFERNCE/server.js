@@ -3,6 +3,7 @@ const path = require('path');
 const app = express();
 const PORT = 3000;
 const { exec } = require('child_process');
+const net = require('net');
 
 // Middleware to parse JSON bodies for POST requests
 app.use(express.json());
@@ -17,6 +18,69 @@ app.use(express.static('public'));
 const randomInt = (min, max) => Math.floor(Math.random() * (max - min + 1)) + min;
 
 
+// --- Emergency-Stop Socket ---
+// Pre-opened connection to the robot's e-stop listener (EStopListener in ai/hardware.py),
+// so an e-stop never waits for a Python interpreter to start.
+const ESTOP_HOST = process.env.ESTOP_HOST || '127.0.0.1';
+const ESTOP_PORT = parseInt(process.env.ESTOP_PORT || '5001', 10);
+const ESTOP_TIMEOUT_MS = 500;
+
+let estopSocket = null;
+let estopReady = false;
+let estopBuffer = '';
+const estopWaiters = []; // resolve callbacks, one per line sent
+
+function connectEstop() {
+    const sock = net.createConnection({ host: ESTOP_HOST, port: ESTOP_PORT });
+    sock.setNoDelay(true);
+    sock.on('connect', () => {
+        estopReady = true;
+        console.log(`E-stop channel connected (${ESTOP_HOST}:${ESTOP_PORT})`);
+    });
+    sock.on('data', (chunk) => {
+        estopBuffer += chunk.toString();
+        let idx;
+        while ((idx = estopBuffer.indexOf('\n')) >= 0) {
+            const line = estopBuffer.slice(0, idx);
+            estopBuffer = estopBuffer.slice(idx + 1);
+            const resolve = estopWaiters.shift();
+            if (resolve) resolve(line);
+        }
+    });
+    sock.on('error', () => { /* reconnect on close */ });
+    sock.on('close', () => {
+        estopReady = false;
+        estopBuffer = '';
+        while (estopWaiters.length) estopWaiters.shift()(null);
+        setTimeout(connectEstop, 1000);
+    });
+    estopSocket = sock;
+}
+connectEstop();
+
+// Resolves with the robot's JSON reply, or null if the socket path is unavailable / too slow.
+function sendEstop() {
+    return new Promise((resolve) => {
+        if (!estopReady) return resolve(null);
+        const start = process.hrtime.bigint();
+        const timer = setTimeout(() => resolve(null), ESTOP_TIMEOUT_MS);
+        estopWaiters.push((line) => {
+            clearTimeout(timer);
+            if (line === null) return resolve(null);
+            try {
+                const result = JSON.parse(line);
+                result.round_trip_ms = Number(process.hrtime.bigint() - start) / 1e6;
+                result.channel = 'socket';
+                resolve(result);
+            } catch (e) {
+                resolve(null);
+            }
+        });
+        estopSocket.write('STOP\n');
+    });
+}
+
+
 // --- API Endpoints ---
 
 // 1. GET /dashboard-status (Summary Panel Data)
@@ -171,12 +235,20 @@ app.post('/system-off', (req, res) => {
 
 
 // 5. POST /emergency-stop
-app.post('/emergency-stop', (req, res) => {
+app.post('/emergency-stop', async (req, res) => {
     const fallbackResponse = {
         success: false,
         message: 'आपातकालीन रोक विफल। कृपया तुरंत मैन्युअल रूप से हस्तक्षेप करें।',
     };
 
+    // Fast path: pre-opened socket straight into the hardware process
+    const fastResult = await sendEstop();
+    if (fastResult && fastResult.success) {
+        console.log(`Emergency stop: pins low in ${fastResult.latency_ms} ms, round trip ${fastResult.round_trip_ms.toFixed(2)} ms`);
+        return res.json(fastResult);
+    }
+    console.warn("E-stop socket unavailable. Falling back to emergency_stop.py.");
+
     const pythonCommand = 'python3 emergency_stop.py';
 
     exec(pythonCommand, (error, stdout, stderr) => {
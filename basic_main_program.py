@@ -1,8 +1,18 @@
+import argparse
 import cv2
 import time
 from ultralytics import YOLO
 import sys
 
+from frame_gate import FrameGate
+from frame_ring import FrameRing, detections_from_arrays, fit_frame
+from frame_source import open_source
+from inference_pool import InferencePool
+from live_stream import LiveStream
+from multi_camera import MultiCameraDetector
+from pest_tracker import PestTracker
+from tiled_inference import TiledDetector
+
 # --- Configuration ---
 # 0 usually refers to the default camera (webcam or Pi Camera)
 CAMERA_INDEX = 0 
@@ -15,10 +25,75 @@ MODEL_PATH = 'Pesticide-Detection-AI/FINAL_MODEL/ai.pt'
 # Confidence threshold to filter weak detections (adjust this value)
 CONFIDENCE_THRESHOLD = 0.5
 
+# Tiled mode: split the frame into overlapping imgsz tiles (better recall on tiny
+# aphids / scale insects at higher capture resolutions, at some extra CPU cost)
+TILED_INFERENCE = False
+
+# Multi-process inference: worker processes, each with its own copy of the model
+# (0 = run inference in this process). Uses more RAM, scales across CPU cores.
+INFERENCE_WORKERS = 0
+
+# Tracker: frames a pest must be seen before it is sprayed (once per pest, not per frame)
+TRACK_MIN_HITS = 3
+TRACK_MAX_MISSES = 10
+
+# Motion gate: skip inference on static scenes and cap inference CPU usage
+GATE_CHANGE_THRESHOLD = 4.0  # mean grey-level change that counts as motion
+GATE_KEEPALIVE_S = 2.0       # re-run inference at least this often on static scenes
+GATE_CPU_BUDGET = 0.5        # fraction of wall time inference may use
+
+# Live view for remote operators (MJPEG at http://<robot>:LIVE_STREAM_PORT/stream, None to disable)
+LIVE_STREAM_PORT = 8080
+LIVE_STREAM_MAX_FPS = 10
+LIVE_STREAM_MAX_WIDTH = 640
+
+# Shared-memory ring other processes can attach to for the raw frame + detections (None to disable)
+FRAME_RING_NAME = "pest_frames"
+
+# Local preview window (set False on headless robots; stop with Ctrl+C / SIGTERM)
+SHOW_WINDOW = True
+
+# --- Command line (overrides the camera for repeatable benchmarks) ---
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Real-time pest detection")
+    parser.add_argument("--source", nargs="+", default=[str(CAMERA_INDEX)],
+                        help="camera index, video file, image folder/glob or .pestrec recording; "
+                             "give several to run all cameras on one shared model")
+    parser.add_argument("--realtime", action="store_true",
+                        help="replay files at their recorded pace (default: as fast as possible)")
+    parser.add_argument("--loops", type=int, default=1, help="times to replay a file source (0 = forever)")
+    parser.add_argument("--record", help="also save the raw frames to this .pestrec file (single source only)")
+    parser.add_argument("--no-window", action="store_true", help="disable the local preview window")
+    parser.add_argument("--workers", type=int, default=INFERENCE_WORKERS,
+                        help="inference worker processes (0 = in-process, single camera only)")
+    return parser.parse_args()
+
+def start_live_stream(max_width):
+    """The MJPEG live view, or None if it is disabled or its port can't be bound (detection runs without it)."""
+    if not LIVE_STREAM_PORT:
+        return None
+    try:
+        stream = LiveStream(port=LIVE_STREAM_PORT, max_fps=LIVE_STREAM_MAX_FPS, max_width=max_width).start()
+    except OSError as e:
+        print(f"Warning: live view disabled, could not listen on port {LIVE_STREAM_PORT}: {e}")
+        return None
+    print(f"Live view at http://0.0.0.0:{LIVE_STREAM_PORT}/stream")
+    return stream
+
 # --- Main Logic ---
 
 def main():
     """Initializes YOLO model and runs the real-time camera detection loop."""
+    global SHOW_WINDOW
+    args = parse_args()
+    if args.no_window:
+        SHOW_WINDOW = False
+
+    # --- 0. Multi-process mode: workers load the model themselves ---
+    if args.workers > 0 and len(args.source) == 1:
+        run_pool_detection(args)
+        return
     
     # --- 1. Load YOLO Model ---
     try:
@@ -30,70 +105,309 @@ def main():
         print(f"Details: {e}")
         sys.exit(1)
 
+    # --- 1b. Several cameras: capture threads feeding the one model in batches ---
+    if len(args.source) > 1:
+        run_multi_camera(model, args)
+        return
+
 
-    # --- 2. Initialize Camera ---
-    cap = cv2.VideoCapture(CAMERA_INDEX)
+    # --- 2. Initialize Camera (or a recorded / file source) ---
+    cap = open_source(args.source[0], realtime=args.realtime, loops=args.loops, record=args.record)
 
     if not cap.isOpened():
-        print("Error: Could not open camera. Check CAMERA_INDEX or permissions.")
+        print(f"Error: Could not open frame source '{args.source[0]}'. Check CAMERA_INDEX or permissions.")
         return
 
     # Set frame dimensions (important for stable performance)
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
     
+    # Full-frame model or tiled wrapper; both expose predict(source=..., conf=..., verbose=...)
+    detector = TiledDetector(model) if TILED_INFERENCE else model
+
     print(f"Camera feed started at {FRAME_WIDTH}x{FRAME_HEIGHT}. Press 'q' to exit.")
     
-    frame_count = 0
-    start_time = time.time()
+    tracker = PestTracker(min_hits=TRACK_MIN_HITS, max_misses=TRACK_MAX_MISSES)
+    gate = FrameGate(change_threshold=GATE_CHANGE_THRESHOLD, keepalive_s=GATE_KEEPALIVE_S,
+                     cpu_budget=GATE_CPU_BUDGET)
 
-    while True:
-        # --- 3. Capture Frame ---
-        ret, frame = cap.read()
-        
-        if not ret:
-            print("Error: Could not read frame. Exiting.")
-            break
-            
-        # Optional: Flip frame horizontally for easier webcam use
-        frame = cv2.flip(frame, 1)
-
-        # --- 4. Run YOLO Inference ---
-        # The 'predict' method returns a list of Results objects
-        results = model.predict(
-            source=frame, 
-            conf=CONFIDENCE_THRESHOLD,
-            verbose=False # Keep terminal clean
-        )
-
-        # --- 5. Process and Display Results ---
-        
-        # 'results[0].plot()' uses the framework's built-in drawing function 
-        # to draw the bounding boxes, labels, and confidence scores directly onto the frame.
-        annotated_frame = results[0].plot()
-
-        # --- 6. Display FPS (Optional but helpful) ---
-        frame_count += 1
-        elapsed_time = time.time() - start_time
-        if elapsed_time > 1:
-            fps = frame_count / elapsed_time
-            cv2.putText(annotated_frame, f"FPS: {fps:.1f}", (FRAME_WIDTH - 100, 20), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-            frame_count = 0
-            start_time = time.time()
-
-
-        # --- 7. Show Window and Handle Exit ---
-        cv2.imshow('Real-Time Pest Detection (YOLOv11)', annotated_frame)
-
-        # Exit loop if 'q' is pressed
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+    stream = start_live_stream(LIVE_STREAM_MAX_WIDTH)
+
+    loop_start = time.perf_counter()
+    frames = 0
+    try:
+        frames = run_detection_loop(cap, model, detector, tracker, gate, stream)
+    except KeyboardInterrupt:
+        pass
+    loop_time = time.perf_counter() - loop_start
 
     # Cleanup
     cap.release()
-    cv2.destroyAllWindows()
+    if stream:
+        stream.stop()
+    if SHOW_WINDOW:
+        cv2.destroyAllWindows()
+    print(f"Tracker stats: {tracker.stats()}")
+    print(f"Inference gate stats: {gate.stats()}")
+    if TILED_INFERENCE:
+        print(f"Tiled inference stats: {detector.stats()}")
+    if stream:
+        print(f"Live stream stats: {stream.stats()}")
+    if frames:
+        print(f"Processed {frames} frames in {loop_time:.2f} s ({frames / loop_time:.1f} FPS end to end)")
     print("\nYOLOv11 Detector terminated successfully.")
 
+
+def run_multi_camera(model, args):
+    """Boom rigs: N cameras, one model instance, latest frame of each camera batched per step."""
+    if TILED_INFERENCE:
+        print("Note: tiled inference is single-camera only; multi-camera mode batches full frames.")
+    sources = []
+    for spec in args.source:
+        src = open_source(spec, realtime=args.realtime, loops=args.loops)
+        if not src.isOpened():
+            print(f"Error: Could not open frame source '{spec}'.")
+            for opened in sources:
+                opened.release()
+            return
+        src.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+        src.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        sources.append(src)
+
+    detector = MultiCameraDetector(
+        model, sources, conf=CONFIDENCE_THRESHOLD,
+        gate_kwargs={"change_threshold": GATE_CHANGE_THRESHOLD, "keepalive_s": GATE_KEEPALIVE_S,
+                     "cpu_budget": GATE_CPU_BUDGET},
+        tracker_kwargs={"min_hits": TRACK_MIN_HITS, "max_misses": TRACK_MAX_MISSES},
+    ).start()
+    print(f"{len(sources)} cameras started, sharing one model. Press 'q' to exit.")
+
+    stream = start_live_stream(LIVE_STREAM_MAX_WIDTH * 2)
+
+    tiles = [None] * len(sources)
+    try:
+        while not detector.finished:
+            camera_results = detector.step()
+            if not camera_results:
+                continue
+            for cam in camera_results:
+                for event in cam.spray_events:
+                    cx, cy = event.center
+                    print(f"SPRAY: camera {cam.camera} track #{event.track_id} {model.names[event.cls]} "
+                          f"(conf {event.conf:.2f}) at pixel ({cx:.0f}, {cy:.0f})")
+                annotated = cam.result.plot()
+                cv2.putText(annotated, f"CAM {cam.camera}", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                tiles[cam.camera] = cv2.resize(annotated, (FRAME_WIDTH // 2, FRAME_HEIGHT // 2))
+
+            # side-by-side mosaic of the latest annotated frame from every camera
+            if (stream or SHOW_WINDOW) and all(t is not None for t in tiles):
+                mosaic = cv2.hconcat(tiles)
+                if stream:
+                    stream.publish(mosaic)
+                if SHOW_WINDOW:
+                    cv2.imshow('Real-Time Pest Detection (multi-camera)', mosaic)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+    except KeyboardInterrupt:
+        pass
+
+    detector.stop()
+    if stream:
+        stream.stop()
+    if SHOW_WINDOW:
+        cv2.destroyAllWindows()
+    stats = detector.stats()
+    for cam in stats["cameras"]:
+        print(f"Camera {cam['camera']}: capture {cam['capture_fps']} FPS, inferred {cam['inferred_fps']} FPS, "
+              f"dropped {cam['dropped']}, tracks {cam['tracker']}")
+    print(f"Batches: {stats['steps']} (mean {stats['mean_batch']} frames, {stats['infer_ms_per_step']} ms/step), "
+          f"peak RSS {stats['peak_rss_mb']} MB")
+    print("\nYOLOv11 Detector terminated successfully.")
+
+
+def draw_detections(frame, xyxy, confs, classes, names):
+    """Box + label drawing for results that come back as plain arrays (worker processes)."""
+    for (x1, y1, x2, y2), conf, cls in zip(xyxy.astype(int), confs, classes):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{names[int(cls)]} {conf:.2f}", (x1, max(y1 - 5, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    return frame
+
+
+def run_pool_detection(args):
+    """Capture + gate here; inference in worker processes; results re-ordered by frame before tracking."""
+    cap = open_source(args.source[0], realtime=args.realtime, loops=args.loops, record=args.record)
+    if not cap.isOpened():
+        print(f"Error: Could not open frame source '{args.source[0]}'. Check CAMERA_INDEX or permissions.")
+        return
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+
+    try:
+        pool = InferencePool(MODEL_PATH, workers=args.workers, conf=CONFIDENCE_THRESHOLD,
+                             max_frame_shape=(FRAME_HEIGHT, FRAME_WIDTH, 3)).start()
+    except RuntimeError as e:
+        print(f"FATAL ERROR: {e}")
+        cap.release()
+        sys.exit(1)
+    print(f"{args.workers} inference workers ready (model: {MODEL_PATH}). Press Ctrl+C to exit.")
+
+    tracker = PestTracker(min_hits=TRACK_MIN_HITS, max_misses=TRACK_MAX_MISSES)
+    gate = FrameGate(change_threshold=GATE_CHANGE_THRESHOLD, keepalive_s=GATE_KEEPALIVE_S,
+                     cpu_budget=GATE_CPU_BUDGET)
+    stream = start_live_stream(LIVE_STREAM_MAX_WIDTH)
+
+    def handle(results):
+        for res in results:
+            # workers run in parallel, so each frame costs the CPU budget latency / workers
+            gate.record_latency(res.latency / pool.workers)
+            # in capture order, so the tracker's motion model stays valid
+            for event in tracker.update(res.xyxy, res.cls, res.conf, timestamp=res.timestamp):
+                cx, cy = event.center
+                print(f"SPRAY: track #{event.track_id} {pool.names[event.cls]} "
+                      f"(conf {event.conf:.2f}) at pixel ({cx:.0f}, {cy:.0f})")
+            annotated = draw_detections(res.frame.copy(), res.xyxy, res.conf, res.cls, pool.names)
+            if stream:
+                stream.publish(annotated)
+            if SHOW_WINDOW:
+                cv2.imshow('Real-Time Pest Detection (YOLOv11)', annotated)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    raise KeyboardInterrupt
+
+    loop_start = time.perf_counter()
+    frames = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                print("End of feed (or could not read frame). Exiting.")
+                break
+            frames += 1
+            frame = cv2.flip(frame, 1)
+            # worker frame slots are sized for the capture resolution; shrink larger file frames
+            h, w = frame.shape[:2]
+            if w > FRAME_WIDTH or h > FRAME_HEIGHT:
+                scale = min(FRAME_WIDTH / w, FRAME_HEIGHT / h)
+                frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            if gate.should_infer(frame):
+                pool.submit(frame, getattr(cap, "timestamp", None))
+            handle(pool.results())
+        handle(pool.flush())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+    loop_time = time.perf_counter() - loop_start
+
+    cap.release()
+    if stream:
+        stream.stop()
+    if SHOW_WINDOW:
+        cv2.destroyAllWindows()
+    print(f"Tracker stats: {tracker.stats()}")
+    print(f"Inference gate stats: {gate.stats()}")
+    print(f"Inference pool stats: {pool.stats()}")
+    if frames:
+        print(f"Processed {frames} frames in {loop_time:.2f} s ({frames / loop_time:.1f} FPS end to end)")
+    print("\nYOLOv11 Detector terminated successfully.")
+
+
+def run_detection_loop(cap, model, detector, tracker, gate, stream):
+    """Capture -> (gated) inference -> tracking -> display/stream, until 'q' or end of feed.
+
+    Returns the number of frames processed.
+    """
+    results = None
+    dets = None
+    ring = None  # fixed FRAME_HEIGHT x FRAME_WIDTH slots; other frame sizes are letterboxed
+    frame_count = 0
+    total_frames = 0
+    start_time = time.time()
+
+    try:
+        while True:
+            # --- 3. Capture Frame ---
+            ret, frame = cap.read()
+            
+            if not ret:
+                print("End of feed (or could not read frame). Exiting.")
+                break
+            total_frames += 1
+                
+            # Optional: Flip frame horizontally for easier webcam use
+            frame = cv2.flip(frame, 1)
+
+            # --- 4. Run YOLO Inference (only when the scene changed and the CPU budget allows) ---
+            if gate.should_infer(frame):
+                # The 'predict' method returns a list of Results objects
+                infer_start = time.perf_counter()
+                results = detector.predict(
+                    source=frame, 
+                    conf=CONFIDENCE_THRESHOLD,
+                    verbose=False # Keep terminal clean
+                )
+                gate.record_latency(time.perf_counter() - infer_start)
+
+                # --- 5. Process and Display Results ---
+
+                # 'results[0].plot()' uses the framework's built-in drawing function 
+                # to draw the bounding boxes, labels, and confidence scores directly onto the frame.
+                annotated_frame = results[0].plot()
+
+                # --- 5b. Track pests across frames; spray each confirmed track only once ---
+                boxes = results[0].boxes
+                xyxy = boxes.xyxy.cpu().numpy()
+                classes = boxes.cls.cpu().numpy().astype(int)
+                confs = boxes.conf.cpu().numpy()
+                spray_events = tracker.update(xyxy, classes, confs)
+                dets = detections_from_arrays(xyxy, confs, classes)
+                for event in spray_events:
+                    cx, cy = event.center
+                    print(f"SPRAY: track #{event.track_id} {model.names[event.cls]} "
+                          f"(conf {event.conf:.2f}) at pixel ({cx:.0f}, {cy:.0f})")
+            else:
+                # Static scene or throttled: redraw the last detections on the new frame
+                annotated_frame = results[0].plot(img=frame.copy())
+
+            for track_id, box, _, confirmed in tracker.active_tracks():
+                color = (0, 0, 255) if confirmed else (0, 255, 255)
+                cv2.putText(annotated_frame, f"#{track_id}", (int(box[0]), max(int(box[1]) - 20, 10)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+            # --- 6. Display FPS (Optional but helpful) ---
+            frame_count += 1
+            elapsed_time = time.time() - start_time
+            if elapsed_time > 1:
+                fps = frame_count / elapsed_time
+                cv2.putText(annotated_frame, f"FPS: {fps:.1f}", (FRAME_WIDTH - 100, 20), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                frame_count = 0
+                start_time = time.time()
+
+
+            # --- 7. Publish to remote viewers (no-op while nobody watches) ---
+            if stream:
+                stream.publish(annotated_frame)
+
+            # --- 7b. Share raw frame + latest detections with other processes (zero-copy readers) ---
+            if FRAME_RING_NAME:
+                if ring is None:
+                    ring = FrameRing.create(FRAME_RING_NAME, (FRAME_HEIGHT, FRAME_WIDTH, 3))
+                ring_frame, ring_dets = fit_frame(frame, dets, ring.shape)
+                ring.write(ring_frame, ring_dets, getattr(cap, "timestamp", None))
+
+            # --- 8. Show Window and Handle Exit ---
+            if SHOW_WINDOW:
+                cv2.imshow('Real-Time Pest Detection (YOLOv11)', annotated_frame)
+
+                # Exit loop if 'q' is pressed
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    finally:
+        if ring:
+            ring.close()
+
+    return total_frames
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
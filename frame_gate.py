@@ -0,0 +1,95 @@
+"""
+Motion-gated, latency-adaptive inference gate for the detection loop.
+
+- Cheap change score: mean absolute difference of a tiny grayscale thumbnail
+  against the thumbnail of the last frame that was actually inferred
+- Static scenes are skipped; a keep-alive forces inference every few seconds
+- The minimum interval between inferences adapts to the measured inference
+  latency so the detector stays within a target CPU budget
+- Counters for inferred / skipped frames to estimate power savings
+"""
+
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# --- Configuration ---
+THUMB_SIZE = (32, 24)        # (w, h) of the change-detection thumbnail
+CHANGE_THRESHOLD = 4.0       # mean abs grey-level difference (0-255) that counts as motion
+KEEPALIVE_S = 2.0            # always re-run inference at least this often
+CPU_BUDGET = 0.5             # fraction of wall time inference may use (0-1]
+LATENCY_EWMA_ALPHA = 0.2     # smoothing factor for measured inference latency
+
+
+class FrameGate:
+    """Decides per captured frame whether YOLO inference should run."""
+
+    def __init__(self, change_threshold: float = CHANGE_THRESHOLD, keepalive_s: float = KEEPALIVE_S,
+                 cpu_budget: float = CPU_BUDGET, thumb_size=THUMB_SIZE):
+        if not 0 < cpu_budget <= 1:
+            raise ValueError("cpu_budget must be in (0, 1]")
+        self.change_threshold = change_threshold
+        self.keepalive_s = keepalive_s
+        self.cpu_budget = cpu_budget
+        self.thumb_size = thumb_size
+        self._ref_thumb: Optional[np.ndarray] = None
+        self._last_infer_t: Optional[float] = None
+        self.latency_ewma: Optional[float] = None
+        self.last_score = 0.0
+        # counters
+        self.frames_total = 0
+        self.frames_inferred = 0
+        self.skipped_static = 0
+        self.skipped_throttled = 0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        grey = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(grey, self.thumb_size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def min_interval(self) -> float:
+        """Minimum seconds between inferences to keep latency / interval <= cpu_budget."""
+        if self.latency_ewma is None:
+            return 0.0
+        return self.latency_ewma / self.cpu_budget
+
+    def should_infer(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        self.frames_total += 1
+        thumb = self._thumbnail(frame)
+        # mean absolute thumbnail difference against the last inferred frame
+        score = float("inf") if self._ref_thumb is None else float(np.abs(thumb - self._ref_thumb).mean())
+        self.last_score = score
+
+        since_last = float("inf") if self._last_infer_t is None else now - self._last_infer_t
+        if since_last < self.min_interval():
+            self.skipped_throttled += 1
+            return False
+        if score < self.change_threshold and since_last < self.keepalive_s:
+            self.skipped_static += 1
+            return False
+
+        self._ref_thumb = thumb
+        self._last_infer_t = now
+        self.frames_inferred += 1
+        return True
+
+    def record_latency(self, seconds: float) -> None:
+        """Report how long the inference that was just allowed actually took."""
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += LATENCY_EWMA_ALPHA * (seconds - self.latency_ewma)
+
+    def stats(self) -> dict:
+        skipped = self.skipped_static + self.skipped_throttled
+        return {
+            "frames_total": self.frames_total,
+            "frames_inferred": self.frames_inferred,
+            "skipped_static": self.skipped_static,
+            "skipped_throttled": self.skipped_throttled,
+            "skip_ratio": skipped / self.frames_total if self.frames_total else 0.0,
+            "latency_ms": None if self.latency_ewma is None else self.latency_ewma * 1000,
+            "min_interval_ms": self.min_interval() * 1000,
+        }
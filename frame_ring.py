@@ -0,0 +1,333 @@
+"""
+Shared-memory ring of frame slots + detection records, for handing the
+detector's frames to other processes (live view, logger, robot loop) without
+pickling or re-encoding.
+
+Layout of one multiprocessing.shared_memory block:
+    header   magic, geometry, latest written sequence number
+    slot[i]  seq (seqlock), timestamp, n_dets, dets[max_dets], frame[h, w, c]
+
+Single writer, any number of readers, no locks:
+- the writer bumps a slot's seq to an odd value, fills the slot, then sets it
+  to the next even value and finally publishes the frame number in the header
+- a reader picks the slot of the latest frame, checks its seq is even, and
+  after using the data checks the seq is unchanged (`is_valid`); a changed seq
+  means the writer lapped the ring and the read must be discarded
+- with N slots a zero-copy reader has ~N-1 frame periods to finish before its
+  slot can be overwritten
+
+Run this file directly for a frames/s benchmark against pickle-over-pipe, or
+with --watch to follow a running detector's ring (example consumer):
+    python frame_ring.py --watch pest_frames
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+RING_MAGIC = 0x50455354524E4731  # "PESTRNG1"
+DEFAULT_NAME = "pest_frames"
+DEFAULT_SLOTS = 8
+DEFAULT_MAX_DETS = 128
+
+DET_DTYPE = np.dtype([("x1", "<f4"), ("y1", "<f4"), ("x2", "<f4"), ("y2", "<f4"),
+                      ("conf", "<f4"), ("cls", "<i4"), ("track_id", "<i4")])
+_HEADER_DTYPE = np.dtype([("magic", "<u8"), ("slots", "<u4"), ("height", "<u4"), ("width", "<u4"),
+                          ("channels", "<u4"), ("max_dets", "<u4"), ("_pad", "<u4"), ("latest", "<i8")])
+_SLOT_DTYPE = np.dtype([("seq", "<u8"), ("timestamp", "<f8"), ("n_dets", "<u4"), ("_pad", "<u4")])
+_ALIGN = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def detections_from_arrays(xyxy, conf, cls, track_ids=None) -> np.ndarray:
+    """Pack per-box arrays (e.g. results[0].boxes as numpy) into DET_DTYPE records."""
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    dets = np.empty(len(xyxy), DET_DTYPE)
+    dets["x1"], dets["y1"], dets["x2"], dets["y2"] = xyxy.T
+    dets["conf"] = conf
+    dets["cls"] = cls
+    dets["track_id"] = -1 if track_ids is None else track_ids
+    return dets
+
+
+def fit_frame(frame: np.ndarray, dets: Optional[np.ndarray], shape: Tuple[int, ...]):
+    """
+    Letterbox `frame` into a ring of fixed `shape` (h, w, c): scale to fit, pad
+    with black, and map detection boxes into the same pixel space. Frames that
+    already match are returned untouched, so the camera path stays zero-copy.
+    """
+    h, w = frame.shape[:2]
+    H, W = shape[:2]
+    if (h, w) == (H, W):
+        return frame, dets
+    scale = min(W / w, H / h)
+    nw, nh = max(1, round(w * scale)), max(1, round(h * scale))
+    ox, oy = (W - nw) // 2, (H - nh) // 2
+    out = np.zeros((H, W) + frame.shape[2:], frame.dtype)
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    out[oy:oy + nh, ox:ox + nw] = cv2.resize(frame, (nw, nh), interpolation=interp).reshape((nh, nw) + frame.shape[2:])
+    if dets is not None and len(dets):
+        dets = dets.copy()
+        for x, y in (("x1", "y1"), ("x2", "y2")):
+            dets[x] = dets[x] * scale + ox
+            dets[y] = dets[y] * scale + oy
+    return out, dets
+
+
+@dataclass
+class FrameRecord:
+    """A frame read from the ring. With copy=False, frame/dets are views into shared memory."""
+    frame_no: int
+    seq: int
+    timestamp: float
+    frame: np.ndarray
+    dets: np.ndarray
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self._header = np.ndarray((), _HEADER_DTYPE, buffer=buf, offset=0)
+        if int(self._header["magic"]) != RING_MAGIC:
+            raise ValueError(f"shared memory '{shm.name}' is not a frame ring")
+        self.slots = int(self._header["slots"])
+        self.shape = (int(self._header["height"]), int(self._header["width"]), int(self._header["channels"]))
+        self.max_dets = int(self._header["max_dets"])
+        # per-slot views, created once so the hot paths are plain numpy copies
+        self._slot_meta, self._slot_dets, self._slot_frames = [], [], []
+        offset = _aligned(_HEADER_DTYPE.itemsize)
+        for _ in range(self.slots):
+            self._slot_meta.append(np.ndarray((), _SLOT_DTYPE, buffer=buf, offset=offset))
+            offset += _aligned(_SLOT_DTYPE.itemsize)
+            self._slot_dets.append(np.ndarray((self.max_dets,), DET_DTYPE, buffer=buf, offset=offset))
+            offset += _aligned(DET_DTYPE.itemsize * self.max_dets)
+            self._slot_frames.append(np.ndarray(self.shape, np.uint8, buffer=buf, offset=offset))
+            offset += _aligned(int(np.prod(self.shape)))
+        self._next_frame = int(self._header["latest"]) + 1
+
+    @staticmethod
+    def size_for(shape, slots: int, max_dets: int) -> int:
+        per_slot = (_aligned(_SLOT_DTYPE.itemsize) + _aligned(DET_DTYPE.itemsize * max_dets)
+                    + _aligned(int(np.prod(shape))))
+        return _aligned(_HEADER_DTYPE.itemsize) + slots * per_slot
+
+    @classmethod
+    def create(cls, name: Optional[str] = DEFAULT_NAME, shape=(480, 640, 3), slots: int = DEFAULT_SLOTS,
+               max_dets: int = DEFAULT_MAX_DETS) -> "FrameRing":
+        """Create (replacing a stale ring of the same name) as the single writer."""
+        shape = tuple(shape) if len(shape) == 3 else (shape[0], shape[1], 1)
+        size = cls.size_for(shape, slots, max_dets)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), _HEADER_DTYPE, buffer=shm.buf, offset=0)
+        header[()] = (RING_MAGIC, slots, shape[0], shape[1], shape[2], max_dets, 0, -1)
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = DEFAULT_NAME) -> "FrameRing":
+        """Attach as a reader; the ring stays owned (and unlinked) by the writer."""
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # readers must not unlink the block when they exit (Python < 3.13 tracks attaches too)
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, owner=False)
+
+    # --- writer ---
+    def write(self, frame: np.ndarray, dets: Optional[np.ndarray] = None, timestamp: Optional[float] = None) -> int:
+        """Publish one frame (+ DET_DTYPE detections); returns its frame number."""
+        if frame.shape[:2] != self.shape[:2] or frame.size != int(np.prod(self.shape)):
+            raise ValueError(f"frame shape {frame.shape} does not match ring shape {self.shape}")
+        n = self._next_frame
+        i = n % self.slots
+        meta = self._slot_meta[i]
+        meta["seq"] = 2 * n + 1                      # odd: slot being written
+        self._slot_frames[i][...] = frame.reshape(self.shape)
+        k = 0 if dets is None else min(len(dets), self.max_dets)
+        if k:
+            self._slot_dets[i][:k] = dets[:k]
+        meta["n_dets"] = k
+        meta["timestamp"] = time.time() if timestamp is None else timestamp
+        meta["seq"] = 2 * n + 2                      # even: slot complete
+        self._header["latest"] = n
+        self._next_frame = n + 1
+        return n
+
+    # --- readers ---
+    def latest_frame_no(self) -> int:
+        return int(self._header["latest"])
+
+    def read(self, frame_no: Optional[int] = None, copy: bool = True) -> Optional[FrameRecord]:
+        """
+        Read `frame_no` (default: latest). Returns None if nothing is written yet
+        or the frame was already overwritten / is mid-write. With copy=False the
+        arrays alias shared memory: check is_valid(record) after using them.
+        """
+        n = self.latest_frame_no() if frame_no is None else frame_no
+        if n < 0:
+            return None
+        i = n % self.slots
+        meta = self._slot_meta[i]
+        seq = int(meta["seq"])
+        if seq != 2 * n + 2:
+            return None
+        k = int(meta["n_dets"])
+        ts = float(meta["timestamp"])
+        frame, dets = self._slot_frames[i], self._slot_dets[i][:k]
+        if copy:
+            frame, dets = frame.copy(), dets.copy()
+            if int(meta["seq"]) != seq:
+                return None  # lapped while copying
+        return FrameRecord(n, seq, ts, frame, dets)
+
+    def is_valid(self, record: FrameRecord) -> bool:
+        """True if the record's slot has not been overwritten since it was read."""
+        return int(self._slot_meta[record.frame_no % self.slots]["seq"]) == record.seq
+
+    def close(self) -> None:
+        self._header = None
+        self._slot_meta = self._slot_dets = self._slot_frames = []
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# -------------------------
+# Benchmark: ring vs pickle-over-pipe
+# -------------------------
+def _ring_writer(name, shape, seconds, ready):
+    # child of the creating process shares its resource tracker, so attach without attach()'s unregister
+    ring = FrameRing(shared_memory.SharedMemory(name=name), owner=False)
+    frames = [np.full(shape, v, np.uint8) for v in range(4)]
+    dets = detections_from_arrays(np.zeros((20, 4)), np.ones(20), np.zeros(20))
+    ready.wait()
+    end = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < end:
+        ring.write(frames[i & 3], dets)
+        i += 1
+    ring.close()
+
+
+def _pipe_writer(conn, shape, seconds, ready):
+    frames = [np.full(shape, v, np.uint8) for v in range(4)]
+    dets = detections_from_arrays(np.zeros((20, 4)), np.ones(20), np.zeros(20))
+    ready.wait()
+    end = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < end:
+        conn.send((i, frames[i & 3], dets))
+        i += 1
+    conn.send(None)
+
+
+def _bench_ring(shape, seconds):
+    ring = FrameRing.create(None, shape)
+    ready = mp.Event()
+    proc = mp.Process(target=_ring_writer, args=(ring.shm.name, shape, seconds, ready))
+    proc.start()
+    ready.set()
+    seen, torn, last = 0, 0, -1
+    checksum = 0
+    while proc.is_alive() or ring.latest_frame_no() != last:
+        n = ring.latest_frame_no()
+        if n == last:
+            time.sleep(0)  # yield to the writer (matters on single-core boards)
+            continue
+        rec = ring.read(n, copy=False)
+        if rec is None:
+            torn += 1
+            continue
+        checksum += int(rec.frame[0, 0, 0])  # touch the data like a consumer would
+        if ring.is_valid(rec):
+            seen += 1
+        else:
+            torn += 1
+        last = n
+    proc.join()
+    written = ring.latest_frame_no() + 1
+    ring.close()
+    return written, seen, torn
+
+
+def _bench_pipe(shape, seconds):
+    recv_end, send_end = mp.Pipe(duplex=False)
+    ready = mp.Event()
+    proc = mp.Process(target=_pipe_writer, args=(send_end, shape, seconds, ready))
+    proc.start()
+    ready.set()
+    seen = 0
+    while True:
+        item = recv_end.recv()
+        if item is None:
+            break
+        seen += 1
+    proc.join()
+    return seen, seen, 0
+
+
+def _watch(name: str) -> None:
+    ring = FrameRing.attach(name)
+    print(f"Attached to '{name}': {ring.shape[1]}x{ring.shape[0]}, {ring.slots} slots")
+    last, count, t0 = ring.latest_frame_no(), 0, time.monotonic()
+    try:
+        while True:
+            rec = ring.read(copy=False)
+            if rec is None or rec.frame_no == last:
+                time.sleep(0.005)
+                continue
+            n_dets = len(rec.dets)
+            if not ring.is_valid(rec):
+                continue
+            last, count = rec.frame_no, count + 1
+            now = time.monotonic()
+            if now - t0 >= 1.0:
+                print(f"frame {rec.frame_no}: {count / (now - t0):.1f} FPS, {n_dets} detections, "
+                      f"age {(time.time() - rec.timestamp) * 1000:.0f} ms")
+                count, t0 = 0, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory frame ring vs pickle-over-pipe")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--watch", metavar="NAME", help="follow an existing ring instead of benchmarking")
+    args = parser.parse_args()
+    if args.watch:
+        _watch(args.watch)
+        return
+    print(f"{'frame':>12}{'transport':>11}{'written/s':>11}{'delivered/s':>13}{'MB/s':>9}{'torn':>6}")
+    for shape in ((480, 640, 3), (1080, 1920, 3)):
+        mb = np.prod(shape) / 1e6
+        for label, fn in (("shm ring", _bench_ring), ("pipe", _bench_pipe)):
+            written, seen, torn = fn(shape, args.seconds)
+            print(f"{'%dx%d' % (shape[1], shape[0]):>12}{label:>11}{written / args.seconds:>11.0f}"
+                  f"{seen / args.seconds:>13.0f}{seen * mb / args.seconds:>9.0f}{torn:>6}")
+
+
+if __name__ == "__main__":
+    main()
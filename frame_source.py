@@ -0,0 +1,389 @@
+"""
+Pluggable frame sources for the detection loop (live camera, video file, image
+folder, or a recorded field run), so the whole pipeline can be benchmarked
+repeatably on a headless box.
+
+Every source mimics the cv2.VideoCapture calls the detector already uses
+(read / isOpened / set / release) and also exposes `.timestamp`, the capture
+time (seconds) of the last frame returned.
+
+Recording format (.pestrec): a small header followed by one record per frame
+    <d timestamp> <I jpeg length> <jpeg bytes>
+JPEG keeps a field run compact; the file is append-only, so a run cut short
+by a power loss is still replayable up to the last complete frame.
+
+Replay pacing:
+    realtime=True   sleep so frames come out at the recorded intervals (x speed)
+    realtime=False  as fast as the consumer reads them (benchmarks)
+
+CLI:
+    python frame_source.py record --camera 0 --out field.pestrec [--seconds 60]
+    python frame_source.py info field.pestrec
+    python frame_source.py bench [--source Pesticide-detection-AI/TRAINING_MODEL/test_images] [--loops 50]
+"""
+
+import argparse
+import glob
+import os
+import struct
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+REC_MAGIC = b"PESTREC1"
+_REC_HEADER = struct.Struct("<8sHH")   # magic, width, height (0 if unknown)
+_REC_FRAME = struct.Struct("<dI")      # timestamp, jpeg length
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_CORPUS = os.path.join("Pesticide-detection-AI", "TRAINING_MODEL", "test_images")
+
+
+# -------------------------
+# Sources
+# -------------------------
+class CameraSource:
+    """Live camera; timestamps are wall-clock read times."""
+
+    def __init__(self, index: int = 0):
+        self.cap = cv2.VideoCapture(index)
+        self.timestamp = 0.0
+
+    def read(self):
+        ret, frame = self.cap.read()
+        self.timestamp = time.time()
+        return ret, frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def set(self, prop, value) -> bool:
+        return self.cap.set(prop, value)
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class _PacedSource:
+    """Shared pacing / looping for file-backed sources; subclasses implement _next() -> (frame, ts)."""
+
+    def __init__(self, realtime: bool = False, speed: float = 1.0, loops: int = 1):
+        self.realtime = realtime
+        self.speed = speed
+        self.loops = loops          # 0 = forever
+        self.timestamp = 0.0
+        self._loop = 0
+        self._loop_offset = 0.0     # keeps timestamps increasing across loops
+        self._first_ts: Optional[float] = None
+        self._wall_start = 0.0
+
+    def _next(self):
+        raise NotImplementedError
+
+    def _rewind(self) -> bool:
+        raise NotImplementedError
+
+    def _duration(self) -> float:
+        return 0.0
+
+    def read(self):
+        item = self._next()
+        while item is None:
+            self._loop += 1
+            duration = self._duration()
+            if (self.loops and self._loop >= self.loops) or not self._rewind():
+                return False, None
+            self._loop_offset += duration
+            item = self._next()
+        frame, ts = item
+        ts += self._loop_offset
+        if self._first_ts is None:
+            self._first_ts, self._wall_start = ts, time.monotonic()
+        elif self.realtime:
+            due = self._wall_start + (ts - self._first_ts) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.timestamp = ts
+        return True, frame
+
+    def set(self, prop, value) -> bool:
+        return False  # resolution is whatever was recorded
+
+    def isOpened(self) -> bool:
+        return True
+
+
+class ImageSequenceSource(_PacedSource):
+    """Folder (or glob) of still images played back at a fixed fps; images are decoded once and cached."""
+
+    def __init__(self, pattern: str, fps: float = 10.0, **kw):
+        super().__init__(**kw)
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, p) for p in os.listdir(pattern)]
+        else:
+            paths = glob.glob(pattern)
+        self.paths = sorted(p for p in paths if p.lower().endswith(IMAGE_EXTS))
+        self.fps = fps
+        self._cache: List = [None] * len(self.paths)
+        self._i = 0
+
+    def _next(self):
+        while self._i < len(self.paths):
+            i = self._i
+            self._i += 1
+            if self._cache[i] is None:
+                self._cache[i] = cv2.imread(self.paths[i])
+            if self._cache[i] is not None:
+                # copy so the consumer can draw on it without corrupting the cache
+                return self._cache[i].copy(), i / self.fps
+        return None
+
+    def _rewind(self) -> bool:
+        self._i = 0
+        return bool(self.paths)
+
+    def _duration(self) -> float:
+        return len(self.paths) / self.fps
+
+    def isOpened(self) -> bool:
+        return bool(self.paths)
+
+    def release(self) -> None:
+        self._cache = [None] * len(self.paths)
+
+
+class VideoFileSource(_PacedSource):
+    """Video file; timestamps come from the container (CAP_PROP_POS_MSEC)."""
+
+    def __init__(self, path: str, **kw):
+        super().__init__(**kw)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self._last_ts = 0.0
+        self._frame_s = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+
+    def _next(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._last_ts = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        return frame, self._last_ts
+
+    def _rewind(self) -> bool:
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _duration(self) -> float:
+        return self._last_ts + self._frame_s
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class ReplaySource(_PacedSource):
+    """Plays back a .pestrec recording with its original timestamps."""
+
+    def __init__(self, path: str, **kw):
+        super().__init__(**kw)
+        self.path = path
+        self._f = open(path, "rb")
+        magic, self.width, self.height = _REC_HEADER.unpack(self._f.read(_REC_HEADER.size))
+        if magic != REC_MAGIC:
+            self._f.close()
+            raise ValueError(f"{path} is not a frame recording")
+        self._t0: Optional[float] = None
+        self._last_ts = 0.0
+        self._frames = 0
+
+    def _next(self):
+        head = self._f.read(_REC_FRAME.size)
+        if len(head) < _REC_FRAME.size:
+            return None
+        ts, n = _REC_FRAME.unpack(head)
+        data = self._f.read(n)
+        if len(data) < n:
+            return None  # truncated tail of an interrupted recording
+        if self._t0 is None:
+            self._t0 = ts
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        self._last_ts = ts - self._t0
+        self._frames += 1
+        return frame, self._last_ts
+
+    def _rewind(self) -> bool:
+        self._f.seek(_REC_HEADER.size)
+        self._t0 = None
+        self._frames = 0
+        return True
+
+    def _duration(self) -> float:
+        # one mean frame interval past the last frame, so a loop doesn't repeat a timestamp
+        if self._frames > 1:
+            return self._last_ts * self._frames / (self._frames - 1)
+        return self._last_ts
+
+    def release(self) -> None:
+        self._f.close()
+
+
+# -------------------------
+# Recording
+# -------------------------
+class FrameRecorder:
+    """Appends JPEG frames + timestamps to a .pestrec file."""
+
+    def __init__(self, path: str, width: int = 0, height: int = 0, jpeg_quality: int = 90):
+        self.path = path
+        self.jpeg_quality = jpeg_quality
+        self.frames = 0
+        self.bytes = 0
+        self._f = open(path, "wb")
+        self._f.write(_REC_HEADER.pack(REC_MAGIC, width, height))
+
+    def write(self, frame, timestamp: Optional[float] = None) -> None:
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        data = buf.tobytes()
+        self._f.write(_REC_FRAME.pack(time.time() if timestamp is None else timestamp, len(data)))
+        self._f.write(data)
+        self.frames += 1
+        self.bytes += len(data)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class RecordingSource:
+    """Wraps another source and tees every raw frame it returns into a FrameRecorder."""
+
+    def __init__(self, source, recorder: FrameRecorder):
+        self.source = source
+        self.recorder = recorder
+
+    @property
+    def timestamp(self) -> float:
+        return self.source.timestamp
+
+    def read(self):
+        ret, frame = self.source.read()
+        if ret:
+            self.recorder.write(frame, self.source.timestamp)
+        return ret, frame
+
+    def isOpened(self) -> bool:
+        return self.source.isOpened()
+
+    def set(self, prop, value) -> bool:
+        return self.source.set(prop, value)
+
+    def release(self) -> None:
+        self.source.release()
+        self.recorder.close()
+
+
+def open_source(spec, realtime: bool = False, speed: float = 1.0, loops: int = 1, fps: float = 10.0,
+                record: Optional[str] = None):
+    """
+    Build a frame source from a spec:
+        int or digit string -> camera index
+        *.pestrec           -> ReplaySource
+        directory / glob    -> ImageSequenceSource (at `fps`)
+        anything else       -> VideoFileSource
+    If `record` is given, raw frames are also written to that .pestrec file.
+    """
+    spec_str = str(spec)
+    if isinstance(spec, int) or spec_str.isdigit():
+        source = CameraSource(int(spec_str))
+    elif spec_str.endswith(".pestrec"):
+        source = ReplaySource(spec_str, realtime=realtime, speed=speed, loops=loops)
+    elif os.path.isdir(spec_str) or any(c in spec_str for c in "*?["):
+        source = ImageSequenceSource(spec_str, fps=fps, realtime=realtime, speed=speed, loops=loops)
+    else:
+        source = VideoFileSource(spec_str, realtime=realtime, speed=speed, loops=loops)
+    if record:
+        source = RecordingSource(source, FrameRecorder(record))
+    return source
+
+
+# -------------------------
+# CLI
+# -------------------------
+def _cmd_record(args) -> None:
+    source = open_source(args.camera, record=args.out)
+    if not source.isOpened():
+        raise SystemExit(f"could not open camera {args.camera}")
+    source.set(cv2.CAP_PROP_FRAME_WIDTH, args.width)
+    source.set(cv2.CAP_PROP_FRAME_HEIGHT, args.height)
+    end = time.time() + args.seconds if args.seconds else None
+    try:
+        while end is None or time.time() < end:
+            if not source.read()[0]:
+                break
+    except KeyboardInterrupt:
+        pass
+    rec = source.recorder
+    source.release()
+    print(f"Recorded {rec.frames} frames ({rec.bytes / 1e6:.1f} MB) to {args.out}")
+
+
+def _cmd_info(args) -> None:
+    src = ReplaySource(args.path)
+    n, first, last = 0, None, 0.0
+    while True:  # walk the record headers only, no JPEG decoding
+        head = src._f.read(_REC_FRAME.size)
+        if len(head) < _REC_FRAME.size:
+            break
+        ts, size = _REC_FRAME.unpack(head)
+        if len(src._f.read(size)) < size:
+            break
+        n += 1
+        first = ts if first is None else first
+        last = ts
+    src.release()
+    dur = last - (first if first is not None else last)
+    rate = f", {(n - 1) / dur:.1f} fps" if dur > 0 else ""
+    print(f"{args.path}: {n} frames over {dur:.1f} s{rate} ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+
+
+def _cmd_bench(args) -> None:
+    source = open_source(args.source, realtime=args.realtime, loops=args.loops, fps=args.fps)
+    if not source.isOpened():
+        raise SystemExit(f"could not open {args.source}")
+    n, t0 = 0, time.perf_counter()
+    while source.read()[0]:
+        n += 1
+    dt = time.perf_counter() - t0
+    source.release()
+    print(f"{args.source}: {n} frames in {dt:.2f} s -> {n / dt:.0f} frames/s source throughput")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame source tools (record / inspect / benchmark)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="record a camera to a .pestrec file")
+    rec.add_argument("--camera", type=int, default=0)
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--seconds", type=float, default=0, help="stop after this long (0 = until Ctrl+C)")
+    rec.add_argument("--width", type=int, default=640)
+    rec.add_argument("--height", type=int, default=480)
+    rec.set_defaults(func=_cmd_record)
+    info = sub.add_parser("info", help="summarise a recording")
+    info.add_argument("path")
+    info.set_defaults(func=_cmd_info)
+    bench = sub.add_parser("bench", help="measure raw source throughput")
+    bench.add_argument("--source", default=DEFAULT_CORPUS)
+    bench.add_argument("--loops", type=int, default=50)
+    bench.add_argument("--fps", type=float, default=10.0, help="playback rate for image folders")
+    bench.add_argument("--realtime", action="store_true")
+    bench.set_defaults(func=_cmd_bench)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Multi-process YOLO inference: N worker processes, each loading the model once.
+
+The single-process detector runs inference, post-processing and plotting under
+one GIL, so extra cores sit idle. InferencePool instead:
+
+1. starts N spawned workers (torch threads per worker = cores / N, so workers
+   don't oversubscribe the CPU); each loads the weights once
+2. hands frames out round-robin by sequence number through per-worker
+   shared-memory slots (no pickling of frames); a worker with all its slots
+   busy applies backpressure to submit()
+3. gets compact detection arrays back (xyxy, conf, cls) and re-orders them by
+   sequence number, so tracking and actuation always see frames in capture order
+
+Run this file directly for a throughput-vs-worker-count benchmark and the
+per-worker memory cost.
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from process_memory import peak_rss_mb
+
+DEFAULT_SLOTS_PER_WORKER = 2
+WORKER_START_TIMEOUT_S = 120.0
+DRAIN_POLL_S = 0.1  # result wait between worker liveness checks
+
+
+@dataclass
+class PoolResult:
+    """Detections for one submitted frame, delivered in submission order."""
+    seq: int
+    frame: np.ndarray
+    timestamp: Optional[float]
+    xyxy: np.ndarray      # (N, 4) float32
+    conf: np.ndarray      # (N,) float32
+    cls: np.ndarray       # (N,) int
+    worker: int
+    latency: float        # seconds spent in model.predict inside the worker
+    error: Optional[str] = None
+
+
+def _worker_main(idx, model_path, conf, imgsz, shm_name, slot_bytes, slots, torch_threads, task_q, result_q):
+    # thread caps must be in place before torch is imported
+    os.environ.setdefault("OMP_NUM_THREADS", str(torch_threads))
+    base_rss = peak_rss_mb()
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+        from ultralytics import YOLO
+        model = YOLO(model_path)
+        kwargs = {"conf": conf, "verbose": False}
+        if imgsz:
+            kwargs["imgsz"] = imgsz
+        # warm-up so the first real frame doesn't pay for lazy initialisation
+        model.predict(source=np.zeros((64, 64, 3), np.uint8), **kwargs)
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except Exception as e:
+        result_q.put(("failed", idx, repr(e)))
+        return
+    result_q.put(("ready", idx, model.names, base_rss, peak_rss_mb()))
+    while True:
+        task = task_q.get()
+        if task is None:
+            break
+        seq, slot, shape = task
+        frame = np.ndarray(shape, np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+        t0 = time.perf_counter()
+        try:
+            boxes = model.predict(source=frame, **kwargs)[0].boxes
+            msg = ("result", idx, seq, slot, boxes.xyxy.cpu().numpy().astype(np.float32),
+                   boxes.conf.cpu().numpy().astype(np.float32), boxes.cls.cpu().numpy().astype(int),
+                   time.perf_counter() - t0, None)
+        except Exception as e:
+            empty = np.zeros((0, 4), np.float32)
+            msg = ("result", idx, seq, slot, empty, empty[:, 0], empty[:, 0].astype(int),
+                   time.perf_counter() - t0, repr(e))
+        del frame
+        result_q.put(msg)
+    shm.close()
+    result_q.put(("stopped", idx, peak_rss_mb()))
+
+
+class InferencePool:
+    def __init__(self, model_path: str, workers: int = 2, conf: float = 0.5, imgsz: Optional[int] = None,
+                 max_frame_shape=(1080, 1920, 3), slots_per_worker: int = DEFAULT_SLOTS_PER_WORKER):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.model_path = model_path
+        self.workers = workers
+        self.conf = conf
+        self.imgsz = imgsz
+        self.slot_bytes = int(np.prod(max_frame_shape))
+        self.slots_per_worker = slots_per_worker
+        self.names: Dict[int, str] = {}
+        self.worker_memory: List[dict] = []
+        self._ctx = mp.get_context("spawn")
+        self._procs, self._task_qs, self._shms, self._free = [], [], [], []
+        self._result_q = None
+        self._next_seq = 0
+        self._next_out = 0
+        self._pending: Dict[int, tuple] = {}   # seq -> (frame, timestamp) until its result arrives
+        self._ready: Dict[int, PoolResult] = {}  # reorder buffer
+        # counters
+        self.frames_submitted = 0
+        self.frames_completed = 0
+        self.max_reorder_depth = 0
+        self.per_worker_frames = [0] * workers
+
+    def start(self) -> "InferencePool":
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._result_q = self._ctx.Queue()
+        for i in range(self.workers):
+            shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slots_per_worker)
+            task_q = self._ctx.Queue()
+            proc = self._ctx.Process(
+                target=_worker_main, daemon=True,
+                args=(i, self.model_path, self.conf, self.imgsz, shm.name, self.slot_bytes,
+                      self.slots_per_worker, torch_threads, task_q, self._result_q))
+            proc.start()
+            self._shms.append(shm)
+            self._task_qs.append(task_q)
+            self._procs.append(proc)
+            self._free.append(list(range(self.slots_per_worker)))
+        self.worker_memory = [None] * self.workers
+        started = 0
+        deadline = time.monotonic() + WORKER_START_TIMEOUT_S
+        while started < self.workers:
+            try:
+                msg = self._result_q.get(timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Empty:
+                self.close()
+                raise RuntimeError("inference workers did not start in time")
+            if msg[0] == "failed":
+                self.close()
+                raise RuntimeError(f"inference worker {msg[1]} failed to load the model: {msg[2]}")
+            _, idx, names, base_rss, loaded_rss = msg
+            self.names = names
+            self.worker_memory[idx] = {"worker": idx, "base_rss_mb": round(base_rss, 1),
+                                       "loaded_rss_mb": round(loaded_rss, 1),
+                                       "model_cost_mb": round(loaded_rss - base_rss, 1)}
+            started += 1
+        return self
+
+    # --- submission ---
+    def submit(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """Queue a frame for inference (blocks while its worker's slots are all busy); returns its seq."""
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            raise ValueError(f"frame {frame.shape} {frame.dtype} does not fit a {self.slot_bytes}-byte slot")
+        seq = self._next_seq
+        w = seq % self.workers
+        while not self._free[w]:
+            self._drain(block=True)
+        slot = self._free[w].pop()
+        dst = np.ndarray(frame.shape, np.uint8, buffer=self._shms[w].buf, offset=slot * self.slot_bytes)
+        np.copyto(dst, frame)
+        del dst
+        self._pending[seq] = (frame, timestamp)
+        self._task_qs[w].put((seq, slot, frame.shape))
+        self._next_seq += 1
+        self.frames_submitted += 1
+        return seq
+
+    def _drain(self, block: bool = False) -> None:
+        while True:
+            try:
+                msg = self._result_q.get_nowait()
+            except queue.Empty:
+                if not block:
+                    return
+                # check before every short wait so a crashed worker fails fast instead of hanging
+                self._check_alive()
+                try:
+                    msg = self._result_q.get(timeout=DRAIN_POLL_S)
+                except queue.Empty:
+                    continue
+            if msg[0] != "result":
+                continue
+            _, w, seq, slot, xyxy, conf, cls, latency, error = msg
+            self._free[w].append(slot)
+            frame, ts = self._pending.pop(seq)
+            self._ready[seq] = PoolResult(seq, frame, ts, xyxy, conf, cls, w, latency, error)
+            self.per_worker_frames[w] += 1
+            self.max_reorder_depth = max(self.max_reorder_depth, len(self._ready))
+            block = False  # got one; pick up anything else already waiting without blocking
+
+    def _check_alive(self) -> None:
+        dead = [i for i, p in enumerate(self._procs) if not p.is_alive()]
+        if dead:
+            raise RuntimeError(f"inference worker(s) {dead} exited unexpectedly")
+
+    # --- ordered results ---
+    def results(self) -> List[PoolResult]:
+        """All results that are ready in sequence order (never skips a pending frame)."""
+        self._drain()
+        out = []
+        while self._next_out in self._ready:
+            out.append(self._ready.pop(self._next_out))
+            self._next_out += 1
+        self.frames_completed += len(out)
+        return out
+
+    def flush(self) -> List[PoolResult]:
+        """Wait for every submitted frame and return the remaining results in order."""
+        out = []
+        while self._next_out < self._next_seq:
+            if self._next_out not in self._ready:
+                self._drain(block=True)
+            out.extend(self.results())
+        return out
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "submitted": self.frames_submitted,
+            "completed": self.frames_completed,
+            "in_flight": self.in_flight,
+            "per_worker_frames": list(self.per_worker_frames),
+            "max_reorder_depth": self.max_reorder_depth,
+            "worker_memory": self.worker_memory,
+        }
+
+    def close(self) -> None:
+        for q in self._task_qs:
+            try:
+                q.put(None)
+            except Exception:
+                pass
+        for p in self._procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+                p.join(timeout=5)  # reap it, or it stays behind as a zombie
+                if p.is_alive():
+                    p.kill()
+                    p.join()
+        for shm in self._shms:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._procs, self._task_qs, self._shms = [], [], []
+
+
+# -------------------------
+# Benchmark
+# -------------------------
+def _load_corpus(folder: str, shape) -> List[np.ndarray]:
+    import cv2
+    from frame_source import ImageSequenceSource
+    src = ImageSequenceSource(folder)
+    frames = []
+    while True:
+        ok, frame = src.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, (shape[1], shape[0])))
+    return frames
+
+
+def main():
+    from frame_source import DEFAULT_CORPUS
+    parser = argparse.ArgumentParser(description="Throughput vs worker count for multi-process inference")
+    parser.add_argument("--model", default="Pesticide-Detection-AI/FINAL_MODEL/ai.pt")
+    parser.add_argument("--images", default=DEFAULT_CORPUS)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    shape = (args.height, args.width, 3)
+    corpus = _load_corpus(args.images, shape)
+    if not corpus:
+        raise SystemExit(f"no images in {args.images}")
+    frames = [corpus[i % len(corpus)] for i in range(args.frames)]
+
+    # in-process baseline (what basic_main_program does today)
+    from ultralytics import YOLO
+    base_rss = peak_rss_mb()
+    model = YOLO(args.model)
+    model.predict(source=frames[0], verbose=False)
+    t0 = time.perf_counter()
+    for f in frames:
+        model.predict(source=f, verbose=False)
+    single = len(frames) / (time.perf_counter() - t0)
+    print(f"In-process: {single:.2f} frames/s, model cost ~{peak_rss_mb() - base_rss:.0f} MB\n")
+    del model
+
+    print(f"{'workers':>7}{'frames/s':>10}{'speedup':>9}{'reorder max':>13}{'RSS/worker MB':>15}{'model MB':>10}")
+    for n in range(1, args.max_workers + 1):
+        pool = InferencePool(args.model, workers=n, max_frame_shape=shape).start()
+        t0 = time.perf_counter()
+        done = 0
+        for f in frames:
+            pool.submit(f)
+            done += len(pool.results())
+        done += len(pool.flush())
+        fps = done / (time.perf_counter() - t0)
+        s = pool.stats()
+        pool.close()
+        mem = s["worker_memory"]
+        rss = sum(m["loaded_rss_mb"] for m in mem) / n
+        cost = sum(m["model_cost_mb"] for m in mem) / n
+        print(f"{n:>7}{fps:>10.2f}{fps / single:>9.2f}{s['max_reorder_depth']:>13}{rss:>15.0f}{cost:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Shared-encoder MJPEG live view for the annotated detection frames.
+
+- Each published frame is JPEG-encoded at most ONCE, and the same bytes are
+  fanned out to every connected viewer
+- Nothing is encoded while nobody is watching (publish() returns immediately)
+- Encoding is capped at max_fps and frames are downscaled to max_width
+- Slow clients never queue frames: each viewer always sends the newest frame,
+  intermediate frames are simply dropped for that viewer
+
+Endpoints (default http://<robot>:8080):
+    /stream        multipart/x-mixed-replace MJPEG stream
+    /snapshot.jpg  latest encoded frame
+    /stats         JSON counters
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import cv2
+
+BOUNDARY = "pestframe"
+
+
+class LiveStream:
+    def __init__(self, port: int = 8080, max_fps: float = 10.0, max_width: int = 640,
+                 jpeg_quality: int = 75, host: str = "0.0.0.0"):
+        self.port = port
+        self.host = host
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self._cond = threading.Condition()
+        self._jpeg: Optional[bytes] = None
+        self._seq = 0
+        self._last_encode = 0.0
+        self._viewers = 0
+        self._running = False
+        self._server: Optional[ThreadingHTTPServer] = None
+        # counters
+        self.frames_published = 0
+        self.frames_encoded = 0
+        self.frames_sent = 0
+
+    # --- producer side (detection loop) ---
+    def publish(self, frame) -> None:
+        """Offer the latest annotated frame; cheap no-op when idle or above max_fps."""
+        self.frames_published += 1
+        if self._viewers == 0:
+            return
+        now = time.monotonic()
+        if now - self._last_encode < self.min_interval:
+            return
+        self._last_encode = now
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        with self._cond:
+            self._jpeg = buf.tobytes()
+            self._seq += 1
+            self.frames_encoded += 1
+            self._cond.notify_all()
+
+    # --- consumer side (HTTP threads) ---
+    def _wait_frame(self, last_seq: int, timeout: float = 1.0):
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != last_seq or not self._running, timeout)
+            return self._seq, self._jpeg
+
+    def stats(self) -> dict:
+        return {
+            "viewers": self._viewers,
+            "frames_published": self.frames_published,
+            "frames_encoded": self.frames_encoded,
+            "frames_sent": self.frames_sent,
+        }
+
+    def _make_handler(self):
+        stream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass  # keep the detector's terminal clean
+
+            def do_GET(self):
+                if self.path.startswith("/stream"):
+                    self._serve_stream()
+                elif self.path.startswith("/snapshot"):
+                    jpeg = stream._jpeg
+                    if jpeg is None:
+                        self.send_error(503, "no frame yet (snapshots are only encoded while someone streams)")
+                        return
+                    self._send_bytes(jpeg, "image/jpeg")
+                elif self.path.startswith("/stats"):
+                    self._send_bytes(json.dumps(stream.stats()).encode(), "application/json")
+                else:
+                    self.send_error(404)
+
+            def _send_bytes(self, body: bytes, ctype: str):
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                with stream._cond:
+                    stream._viewers += 1
+                seq = 0
+                try:
+                    while stream._running:
+                        new_seq, jpeg = stream._wait_frame(seq)
+                        if new_seq == seq or jpeg is None:
+                            continue  # timed out with no new frame: don't resend the old one
+                        seq = new_seq
+                        self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                        stream.frames_sent += 1
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stream._cond:
+                        stream._viewers -= 1
+
+        return Handler
+
+    def start(self) -> "LiveStream":
+        self._running = True
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
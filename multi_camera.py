@@ -0,0 +1,207 @@
+"""
+Multi-camera detection with ONE shared YOLO model.
+
+Boom-mounted rigs carry several cameras over adjacent rows. Instead of one
+process (and one copy of the weights) per camera:
+
+1. one capture thread per camera keeps only that camera's newest frame
+   (slow inference never builds a backlog; stale frames are dropped)
+2. each inference step gathers the newest unseen frame from every camera
+   whose motion gate allows it and sends them to the model as ONE batch
+3. results come back tagged with the camera index, and each camera keeps its
+   own PestTracker (pixel coordinates are per camera)
+
+Memory is the model once plus a frame slot per camera, so RSS stays roughly
+flat as cameras are added.
+
+Run this file directly to measure throughput and peak RSS for 1..N replayed
+cameras (default corpus: TRAINING_MODEL/test_images).
+"""
+
+import argparse
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from frame_gate import FrameGate
+from frame_source import DEFAULT_CORPUS, open_source
+from pest_tracker import PestTracker, SprayEvent
+from process_memory import peak_rss_mb
+
+
+@dataclass
+class CameraResult:
+    """One camera's frame and detections from a batched inference step."""
+    camera: int
+    frame: object            # BGR frame that was inferred
+    timestamp: float         # capture time from the frame source
+    result: object           # ultralytics Results for this frame
+    spray_events: List[SprayEvent]
+
+
+class CameraWorker(threading.Thread):
+    """Reads one frame source continuously, keeping only the latest frame."""
+
+    def __init__(self, index: int, source):
+        super().__init__(daemon=True)
+        self.index = index
+        self.source = source
+        self._lock = threading.Lock()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._taken_seq = 0
+        self._stop_event = threading.Event()
+        self.ended = False
+        # counters
+        self.frames_captured = 0
+        self.frames_inferred = 0
+        self.frames_dropped = 0      # captured but overwritten before inference took them
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            ok, frame = self.source.read()
+            if not ok:
+                self.ended = True
+                return
+            with self._lock:
+                if self._seq > self._taken_seq:
+                    self.frames_dropped += 1
+                self._frame, self._timestamp = frame, self.source.timestamp
+                self._seq += 1
+                self.frames_captured += 1
+
+    def take(self):
+        """Newest frame not yet handed out, as (frame, timestamp), or None."""
+        with self._lock:
+            if self._seq == self._taken_seq:
+                return None
+            self._taken_seq = self._seq
+            return self._frame, self._timestamp
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop_event.set()
+        # join first so run() is not inside source.read() when the capture is released
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+        self.source.release()
+
+
+class MultiCameraDetector:
+    """
+    N capture threads feeding one model. `model` must accept a list of frames
+    in predict(source=[...]) (a plain ultralytics YOLO does; batch size = number
+    of cameras with a fresh, gated frame).
+    """
+
+    def __init__(self, model, sources, conf: float = 0.5, gate_kwargs: Optional[dict] = None,
+                 tracker_kwargs: Optional[dict] = None):
+        self.model = model
+        self.conf = conf
+        self.workers = [CameraWorker(i, src) for i, src in enumerate(sources)]
+        self.gates = [FrameGate(**(gate_kwargs or {})) for _ in self.workers]
+        self.trackers = [PestTracker(**(tracker_kwargs or {})) for _ in self.workers]
+        self.steps = 0
+        self.batched_frames = 0
+        self.infer_seconds = 0.0
+        self._started = 0.0
+
+    def start(self) -> "MultiCameraDetector":
+        self._started = time.perf_counter()
+        for w in self.workers:
+            w.start()
+        return self
+
+    def stop(self) -> None:
+        for w in self.workers:  # signal all first so the joins overlap
+            w._stop_event.set()
+        for w in self.workers:
+            w.stop()
+
+    @property
+    def finished(self) -> bool:
+        """True once every (file-backed) source has ended and its last frame was consumed."""
+        return all(w.ended and w._seq == w._taken_seq for w in self.workers)
+
+    def step(self, wait_s: float = 0.005) -> List[CameraResult]:
+        """One batched inference over the newest frame of each camera; [] if nothing new yet."""
+        batch = []
+        for w, gate in zip(self.workers, self.gates):
+            item = w.take()
+            if item is not None and gate.should_infer(item[0]):
+                batch.append((w, item[0], item[1]))
+        if not batch:
+            time.sleep(wait_s)
+            return []
+        t0 = time.perf_counter()
+        results = self.model.predict(source=[frame for _, frame, _ in batch], conf=self.conf, verbose=False)
+        elapsed = time.perf_counter() - t0
+        self.steps += 1
+        self.batched_frames += len(batch)
+        self.infer_seconds += elapsed
+        out = []
+        for (w, frame, ts), res in zip(batch, results):
+            # each camera in the batch shared this step's latency
+            self.gates[w.index].record_latency(elapsed / len(batch))
+            w.frames_inferred += 1
+            boxes = res.boxes
+            events = self.trackers[w.index].update(
+                boxes.xyxy.cpu().numpy(),
+                boxes.cls.cpu().numpy().astype(int),
+                boxes.conf.cpu().numpy(),
+                timestamp=ts,
+            )
+            out.append(CameraResult(w.index, frame, ts, res, events))
+        return out
+
+    def stats(self) -> dict:
+        wall = max(time.perf_counter() - self._started, 1e-9)
+        return {
+            "cameras": [
+                {"camera": w.index,
+                 "capture_fps": round(w.frames_captured / wall, 2),
+                 "inferred_fps": round(w.frames_inferred / wall, 2),
+                 "dropped": w.frames_dropped,
+                 "gate": self.gates[w.index].stats(),
+                 "tracker": self.trackers[w.index].stats()}
+                for w in self.workers
+            ],
+            "steps": self.steps,
+            "mean_batch": round(self.batched_frames / max(self.steps, 1), 2),
+            "infer_ms_per_step": round(self.infer_seconds / max(self.steps, 1) * 1000, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput / RSS of shared-model multi-camera detection")
+    parser.add_argument("--model", default="Pesticide-Detection-AI/FINAL_MODEL/ai.pt")
+    parser.add_argument("--source", default=DEFAULT_CORPUS, help="replayed once per virtual camera")
+    parser.add_argument("--max-cameras", type=int, default=4)
+    parser.add_argument("--fps", type=float, default=15.0, help="real-time pacing of each virtual camera")
+    parser.add_argument("--loops", type=int, default=10)
+    parser.add_argument("--conf", type=float, default=0.5)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    model = YOLO(args.model)
+    print(f"Model loaded, RSS {peak_rss_mb():.0f} MB "
+          "(peak RSS below also includes each virtual camera's decoded image cache)")
+    print(f"{'cams':>4}{'offered/s':>11}{'inferred/s':>12}{'mean batch':>12}{'ms/step':>9}{'peak RSS MB':>13}")
+    for n in range(1, args.max_cameras + 1):
+        # gate disabled (threshold 0, no budget) so every frame is inferred
+        sources = [open_source(args.source, realtime=True, fps=args.fps, loops=args.loops) for _ in range(n)]
+        det = MultiCameraDetector(model, sources, conf=args.conf,
+                                  gate_kwargs={"change_threshold": 0.0, "cpu_budget": 1.0}).start()
+        while not det.finished:
+            det.step()
+        s = det.stats()
+        wall = time.perf_counter() - det._started
+        det.stop()
+        print(f"{n:>4}{n * args.fps:>11.1f}{det.batched_frames / wall:>12.1f}{s['mean_batch']:>12}"
+              f"{s['infer_ms_per_step']:>9}{s['peak_rss_mb']:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Lightweight multi-object tracker for the real-time pest detector.
+
+- IoU association (greedy, highest overlap first) with a centroid-distance fallback
+- Constant-velocity Kalman filter on each track's box centre
+- Stable track IDs; a spray event is emitted once, when a track is confirmed
+- Fully vectorised over tracks with NumPy so 50+ boxes per frame stay cheap
+
+Run this file directly for a per-frame overhead benchmark.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+# --- Configuration ---
+IOU_THRESHOLD = 0.3       # minimum IoU for a detection to continue a track
+CENTROID_GATE = 1.0       # fallback match radius, as a multiple of the track's box size
+MIN_HITS = 3              # matched frames before a track is confirmed (and sprayed)
+MAX_MISSES = 10           # frames a track may go unmatched before it is dropped
+PROCESS_NOISE = 50.0      # Kalman process noise (pixels^2 per second^2)
+MEASUREMENT_NOISE = 4.0   # Kalman measurement noise (pixels^2)
+
+
+@dataclass
+class SprayEvent:
+    """A confirmed pest that should be sprayed exactly once."""
+    track_id: int
+    cls: int
+    conf: float
+    box: np.ndarray  # xyxy in pixels
+    center: tuple
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of xyxy boxes, shape (len(a), len(b))."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def _greedy_match(score: np.ndarray, threshold: float, higher_is_better: bool = True):
+    """Greedy one-to-one assignment on a score matrix; returns list of (row, col)."""
+    if score.size == 0:
+        return []
+    valid = score >= threshold if higher_is_better else score <= threshold
+    rows, cols = np.nonzero(valid)
+    if len(rows) == 0:
+        return []
+    vals = score[rows, cols]
+    order = np.argsort(-vals if higher_is_better else vals, kind="stable")
+    used_r, used_c, pairs = set(), set(), []
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+class PestTracker:
+    """
+    Associates per-frame detections into tracks.
+
+    Track state is kept in parallel NumPy arrays (one row per track):
+    centre position/velocity per axis, box size, shared 2x2 covariance
+    (x and y use the same noise model so one covariance serves both axes).
+    """
+
+    def __init__(self, iou_threshold: float = IOU_THRESHOLD, centroid_gate: float = CENTROID_GATE,
+                 min_hits: int = MIN_HITS, max_misses: int = MAX_MISSES,
+                 process_noise: float = PROCESS_NOISE, measurement_noise: float = MEASUREMENT_NOISE):
+        self.iou_threshold = iou_threshold
+        self.centroid_gate = centroid_gate
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.q = process_noise
+        self.r = measurement_noise
+        self._next_id = 1
+        self._last_t: Optional[float] = None
+        # per-track arrays
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.pos = np.zeros((0, 2), dtype=np.float64)   # cx, cy
+        self.vel = np.zeros((0, 2), dtype=np.float64)   # vx, vy (pixels / s)
+        self.size = np.zeros((0, 2), dtype=np.float64)  # w, h
+        self.cov = np.zeros((0, 2, 2), dtype=np.float64)
+        self.cls = np.zeros(0, dtype=np.int64)
+        self.conf = np.zeros(0, dtype=np.float64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+        self.sprayed = np.zeros(0, dtype=bool)
+        # counters
+        self.frames = 0
+        self.detections_seen = 0
+        self.spray_events = 0
+
+    # -- Kalman helpers --
+    def _predict(self, dt: float) -> None:
+        if len(self.ids) == 0:
+            return
+        self.pos += self.vel * dt
+        p00, p01, p11 = self.cov[:, 0, 0], self.cov[:, 0, 1], self.cov[:, 1, 1]
+        # P = F P F^T + Q  with F = [[1, dt], [0, 1]], white-acceleration Q
+        n00 = p00 + 2 * dt * p01 + dt * dt * p11 + self.q * dt ** 4 / 4
+        n01 = p01 + dt * p11 + self.q * dt ** 3 / 2
+        n11 = p11 + self.q * dt * dt
+        self.cov[:, 0, 0], self.cov[:, 0, 1], self.cov[:, 1, 0], self.cov[:, 1, 1] = n00, n01, n01, n11
+
+    def _correct(self, idx: np.ndarray, z_pos: np.ndarray) -> None:
+        p00, p01, p11 = self.cov[idx, 0, 0], self.cov[idx, 0, 1], self.cov[idx, 1, 1]
+        s = p00 + self.r
+        k0, k1 = p00 / s, p01 / s
+        innov = z_pos - self.pos[idx]
+        self.pos[idx] += k0[:, None] * innov
+        self.vel[idx] += k1[:, None] * innov
+        self.cov[idx, 0, 0] = (1 - k0) * p00
+        self.cov[idx, 0, 1] = self.cov[idx, 1, 0] = (1 - k0) * p01
+        self.cov[idx, 1, 1] = p11 - k1 * p01
+
+    def predicted_boxes(self) -> np.ndarray:
+        half = self.size / 2
+        return np.hstack([self.pos - half, self.pos + half])
+
+    # -- main entry point --
+    def update(self, boxes, classes=None, confs=None, timestamp: Optional[float] = None) -> List[SprayEvent]:
+        """
+        Feed one frame of detections (xyxy pixel boxes) and return the spray
+        events for tracks that became confirmed on this frame.
+        """
+        now = time.time() if timestamp is None else timestamp
+        dt = 0.0 if self._last_t is None else max(0.0, now - self._last_t)
+        self._last_t = now
+        self.frames += 1
+
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        n = len(boxes)
+        classes = np.zeros(n, dtype=np.int64) if classes is None else np.asarray(classes, dtype=np.int64).reshape(-1)
+        confs = np.ones(n, dtype=np.float64) if confs is None else np.asarray(confs, dtype=np.float64).reshape(-1)
+        self.detections_seen += n
+
+        self._predict(dt)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        sizes = boxes[:, 2:] - boxes[:, :2]
+
+        # 1) IoU association against predicted boxes
+        pairs = _greedy_match(iou_matrix(self.predicted_boxes(), boxes), self.iou_threshold)
+        matched_t = {t for t, _ in pairs}
+        matched_d = {d for _, d in pairs}
+
+        # 2) centroid fallback for fast movers / tiny boxes with no overlap
+        rem_t = np.array([t for t in range(len(self.ids)) if t not in matched_t], dtype=np.int64)
+        rem_d = np.array([d for d in range(n) if d not in matched_d], dtype=np.int64)
+        if len(rem_t) and len(rem_d):
+            dist = np.linalg.norm(self.pos[rem_t][:, None, :] - centers[rem_d][None, :, :], axis=2)
+            gate = self.centroid_gate * self.size[rem_t].max(axis=1)
+            dist = np.where(dist <= gate[:, None], dist, np.inf)
+            for r, c in _greedy_match(dist, np.inf, higher_is_better=False):
+                if np.isfinite(dist[r, c]):
+                    pairs.append((int(rem_t[r]), int(rem_d[c])))
+
+        t_idx = np.array([t for t, _ in pairs], dtype=np.int64)
+        d_idx = np.array([d for _, d in pairs], dtype=np.int64)
+
+        # update matched tracks
+        self.misses += 1
+        if len(t_idx):
+            self._correct(t_idx, centers[d_idx])
+            self.size[t_idx] = sizes[d_idx]
+            self.cls[t_idx] = classes[d_idx]
+            self.conf[t_idx] = confs[d_idx]
+            self.hits[t_idx] += 1
+            self.misses[t_idx] = 0
+
+        # spawn tracks for unmatched detections
+        new_d = np.setdiff1d(np.arange(n), d_idx, assume_unique=True)
+        if len(new_d):
+            k = len(new_d)
+            self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + k)])
+            self._next_id += k
+            self.pos = np.vstack([self.pos, centers[new_d]])
+            self.vel = np.vstack([self.vel, np.zeros((k, 2))])
+            self.size = np.vstack([self.size, sizes[new_d]])
+            init_cov = np.tile(np.array([[self.r, 0.0], [0.0, 1e4]]), (k, 1, 1))
+            self.cov = np.concatenate([self.cov, init_cov])
+            self.cls = np.concatenate([self.cls, classes[new_d]])
+            self.conf = np.concatenate([self.conf, confs[new_d]])
+            self.hits = np.concatenate([self.hits, np.ones(k, dtype=np.int64)])
+            self.misses = np.concatenate([self.misses, np.zeros(k, dtype=np.int64)])
+            self.sprayed = np.concatenate([self.sprayed, np.zeros(k, dtype=bool)])
+
+        # confirmed and not yet sprayed -> one spray event, then suppressed
+        fire = np.nonzero((self.hits >= self.min_hits) & ~self.sprayed & (self.misses == 0))[0]
+        events = []
+        for i in fire:
+            box = self.predicted_boxes()[i]
+            events.append(SprayEvent(int(self.ids[i]), int(self.cls[i]), float(self.conf[i]), box,
+                                     (float(self.pos[i, 0]), float(self.pos[i, 1]))))
+        self.sprayed[fire] = True
+        self.spray_events += len(events)
+
+        # drop stale tracks
+        keep = self.misses <= self.max_misses
+        if not keep.all():
+            for name in ("ids", "pos", "vel", "size", "cov", "cls", "conf", "hits", "misses", "sprayed"):
+                setattr(self, name, getattr(self, name)[keep])
+        return events
+
+    def active_tracks(self):
+        """(track_id, xyxy box, cls, confirmed) for tracks matched on the latest frame."""
+        boxes = self.predicted_boxes()
+        live = np.nonzero(self.misses == 0)[0]
+        return [(int(self.ids[i]), boxes[i], int(self.cls[i]), bool(self.hits[i] >= self.min_hits)) for i in live]
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "detections": self.detections_seen,
+            "active_tracks": int(len(self.ids)),
+            "spray_events": self.spray_events,
+        }
+
+
+# --- Benchmark ---
+
+def _benchmark(num_boxes: int = 60, frames: int = 500, seed: int = 0) -> None:
+    """Simulate num_boxes slowly drifting pests with jitter and time tracker.update()."""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(20, 600, size=(num_boxes, 2))
+    vel = rng.normal(0, 30, size=(num_boxes, 2))
+    size = rng.uniform(8, 40, size=(num_boxes, 2))
+    tracker = PestTracker()
+    dt = 1 / 30
+    times = []
+    for f in range(frames):
+        pos += vel * dt
+        noisy = pos + rng.normal(0, 1.0, size=pos.shape)
+        boxes = np.hstack([noisy - size / 2, noisy + size / 2])
+        t0 = time.perf_counter()
+        tracker.update(boxes, timestamp=f * dt)
+        times.append(time.perf_counter() - t0)
+    times_ms = np.array(times[10:]) * 1000
+    print(f"Tracker benchmark: {num_boxes} boxes/frame, {frames} frames")
+    print(f"  mean {times_ms.mean():.3f} ms  p50 {np.percentile(times_ms, 50):.3f} ms  "
+          f"p95 {np.percentile(times_ms, 95):.3f} ms  max {times_ms.max():.3f} ms")
+    print(f"  spray events: {tracker.spray_events} (naive per-frame spraying: {num_boxes * frames})")
+
+
+if __name__ == '__main__':
+    for n in (10, 50, 100):
+        _benchmark(num_boxes=n)
@@ -0,0 +1,10 @@
+"""Peak resident memory of the current process, shared by the detector benchmarks."""
+
+import resource
+import sys
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS so far in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024